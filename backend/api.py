@@ -1,12 +1,16 @@
 """
 Bitcoin API 数据获取模块
-支持网络检测和离线降级
+支持网络检测和离线降级（网络状态由 connectivity 模块在后台维护）
 """
 import requests
 import pandas as pd
 import traceback
 from datetime import datetime
 from cache import cache_manager
+from config import COINGECKO_BASE_URL
+from connectivity import connectivity, coingecko_breaker
+from http_client import coingecko_client
+from tick_buffer import tick_buffer
 from database import db_manager
 from utils import calculate_technical_indicators
 
@@ -14,21 +18,34 @@ from utils import calculate_technical_indicators
 class BitcoinAPI:
     """比特币数据API"""
     
-    BASE_URL = "https://api.coingecko.com/api/v3"
+    BASE_URL = COINGECKO_BASE_URL
     
     @staticmethod
     def check_network():
-        """检查网络连接"""
+        """
+        检查是否可以调用 CoinGecko（读取后台探测的网络状态与熔断器状态，不做网络 I/O）
+
+        熔断器 half-open 时返回 True 即占用唯一的试探名额，调用方需随后通过 _request 发起请求。
+        """
+        return connectivity.is_online() and coingecko_breaker.allow_request()
+    
+    @staticmethod
+    def _request(endpoint, params):
+        """通过共享连接池调用 CoinGecko（含重试），并将最终结果反馈给熔断器和网络状态"""
         try:
-            response = requests.get("https://www.google.com", timeout=3)
-            return True
-        except:
-            try:
-                # 备用检测
-                response = requests.get("https://www.baidu.com", timeout=3)
-                return True
-            except:
-                return False
+            response = coingecko_client.get(endpoint, params=params)
+        except requests.RequestException:
+            coingecko_breaker.record_failure()
+            connectivity.report_failure()
+            raise
+        
+        # 限流和服务端错误计入熔断器失败次数
+        if response.status_code == 429 or response.status_code >= 500:
+            coingecko_breaker.record_failure()
+        else:
+            coingecko_breaker.record_success()
+            connectivity.report_success()
+        return response
     
     @staticmethod
     def fetch_realtime_data():
@@ -50,7 +67,7 @@ class BitcoinAPI:
                     }
                 return None
             
-            url = f"{BitcoinAPI.BASE_URL}/simple/price"
+            endpoint = "/simple/price"
             params = {
                 "ids": "bitcoin",
                 "vs_currencies": "usd",
@@ -58,7 +75,7 @@ class BitcoinAPI:
                 "include_24hr_change": "true",
                 "include_market_cap": "true"
             }
-            response = requests.get(url, params=params, timeout=10)
+            response = BitcoinAPI._request(endpoint, params)
             response.raise_for_status()
             data = response.json()
             
@@ -77,13 +94,8 @@ class BitcoinAPI:
                 'offline_mode': False
             }
             
-            # 保存到数据库
-            df = pd.DataFrame([{
-                'datetime': datetime.now(),
-                'price': result['price'],
-                'volume': result['volume_24h']
-            }])
-            db_manager.save_historical_data(df)
+            # 放入写缓冲，由后台线程批量写入数据库（请求路径上不再写库）
+            tick_buffer.put(result['price'], result['volume_24h'])
             
             return result
         except Exception as e:
@@ -103,8 +115,29 @@ class BitcoinAPI:
             traceback.print_exc()
             return None
     
+    @staticmethod
+    def parse_market_chart(data):
+        """将 market_chart / market_chart/range 的响应转换为 timestamp、price、datetime、volume 列的 DataFrame"""
+        df = pd.DataFrame(data['prices'], columns=['timestamp', 'price'])
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+        
+        if 'total_volumes' in data:
+            volumes = pd.DataFrame(data['total_volumes'], columns=['timestamp', 'volume'])
+            df = df.merge(volumes, on='timestamp', how='left')
+        else:
+            df['volume'] = 0
+        return df
+    
     @staticmethod
     def fetch_historical_data(days=7):
+        """获取历史数据（支持离线模式），同一天数的并发调用合并为一次上游请求"""
+        return cache_manager.single_flight(
+            f'fetch_historical_{days}d',
+            lambda: BitcoinAPI._fetch_historical_data(days)
+        )
+    
+    @staticmethod
+    def _fetch_historical_data(days=7):
         """获取历史数据（支持离线模式）"""
         # 检查API请求频率
         if not cache_manager.check_rate_limit():
@@ -125,14 +158,14 @@ class BitcoinAPI:
             return None
         
         try:
-            url = f"{BitcoinAPI.BASE_URL}/coins/bitcoin/market_chart"
+            endpoint = "/coins/bitcoin/market_chart"
             params = {
                 "vs_currency": "usd",
                 "days": days
             }
-            print(f"Fetching data from: {url} with params: {params}")
+            print(f"Fetching data from: {BitcoinAPI.BASE_URL}{endpoint} with params: {params}")
             
-            response = requests.get(url, params=params, timeout=15)
+            response = BitcoinAPI._request(endpoint, params)
             cache_manager.increment_request_count()
             
             response.raise_for_status()
@@ -157,14 +190,7 @@ class BitcoinAPI:
                 return None
             
             # 转换为DataFrame
-            df = pd.DataFrame(data['prices'], columns=['timestamp', 'price'])
-            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            if 'total_volumes' in data:
-                volumes = pd.DataFrame(data['total_volumes'], columns=['timestamp', 'volume'])
-                df = df.merge(volumes, on='timestamp', how='left')
-            else:
-                df['volume'] = 0
+            df = BitcoinAPI.parse_market_chart(data)
             
             print(f"✅ 成功获取 {len(df)} 条数据")
             
@@ -9,26 +9,34 @@ import atexit
 from routes import register_routes
 from database import db_manager
 from cache import cache_manager
+from connectivity import connectivity
+from tick_buffer import tick_buffer
 from scheduler import init_scheduler, get_scheduler
 
 
 def create_app():
     """创建并配置Flask应用"""
     app = Flask(__name__)
-    CORS(app)
+    # 暴露 ETag，前端轮询时可带上 If-None-Match 获取 304
+    CORS(app, expose_headers=['ETag'])
     
     # 注册所有路由
     register_routes(app)
     
+    # 后台探测网络状态，请求处理时不再同步检测
+    connectivity.start()
+    
     # 初始化定时任务调度器
     init_scheduler(db_manager, cache_manager)
     
-    # 注册清理函数，确保应用关闭时停止调度器
+    # 注册清理函数，确保应用关闭时停止调度器并写入缓冲中的实时行情
     @atexit.register
     def shutdown_scheduler():
         scheduler = get_scheduler()
         if scheduler:
             scheduler.stop()
+        connectivity.stop()
+        tick_buffer.stop()
     
     return app
 
@@ -42,6 +50,8 @@ if __name__ == '__main__':
     print("   - GET /api/prediction     - 价格预测")
     print("   - GET /api/risk-alerts    - 风险警报")
     print("   - GET /api/candlestick    - K线数据")
+    print("   - GET /api/dashboard      - 仪表板（各面板数据）")
+    print("   - GET /api/stream         - 实时推送（SSE）")
     print("   - GET /api/health         - 健康检查")
     print("\n⏰ 定时任务: 每小时第5分钟自动更新数据")
     print("✅ Server running on http://localhost:5001")
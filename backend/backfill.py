@@ -0,0 +1,251 @@
+"""
+历史数据回填工具
+按固定长度的区间并发调用 market_chart/range，在频率限制内拉取目标时间范围的小时级数据，
+批量写入 price_history；每完成一个区间即写入检查点，中断后重新运行会跳过已完成的区间。
+
+用法:
+    python backfill.py --days 365 [--chunk-days 30] [--workers 4] [--rate-per-minute 10]
+    python backfill.py --start 2025-01-01 --end 2025-06-30
+
+本地测试（不访问 CoinGecko）:
+    python mock_coingecko.py --port 8765 &
+    DB_BACKEND=sqlite python backfill.py --days 365 --base-url http://127.0.0.1:8765/api/v3
+
+区间长度不超过 90 天时，CoinGecko 返回小时级数据。
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from api import BitcoinAPI
+from config import DATA_RETENTION_DAYS
+from database import db_manager
+from http_client import UpstreamClient
+
+
+RANGE_ENDPOINT = '/coins/bitcoin/market_chart/range'
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'backfill_checkpoint.json')
+
+DAY_SECONDS = 86400
+
+
+class RateLimiter:
+    """按固定间隔放行请求，多个线程共享"""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    回填进度：已完整写入的时间区间 [from, to]（纪元秒）
+
+    区间按 chunk_days 对齐到纪元时间网格，不同日期重新运行时区间边界不变，
+    已覆盖的区间可以直接跳过。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.covered = []
+        self.rows = 0
+        if os.path.exists(path):
+            with open(path) as handle:
+                state = json.load(handle)
+            self.covered = [tuple(interval) for interval in state.get('covered', [])]
+            self.rows = state.get('rows', 0)
+
+    def is_done(self, start, end):
+        return any(done_start <= start and done_end >= end for done_start, done_end in self.covered)
+
+    def mark_done(self, start, end, rows):
+        self.covered = self._merge(self.covered + [(start, end)])
+        self.rows += rows
+        self._save()
+
+    @staticmethod
+    def _merge(intervals):
+        """合并重叠或相邻的区间"""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _save(self):
+        # 先写临时文件再替换，中断时不会留下损坏的检查点
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump({'covered': self.covered, 'rows': self.rows}, handle)
+        os.replace(tmp_path, self.path)
+
+
+def plan_chunks(start, end, chunk_days):
+    """
+    将 [start, end]（纪元秒）切分为对齐到 chunk_days 网格的区间，最新的区间在前
+
+    Returns:
+        list[(from, to)]
+    """
+    width = chunk_days * DAY_SECONDS
+    chunks = []
+    grid = start - start % width
+    while grid < end:
+        chunks.append((max(grid, start), min(grid + width, end)))
+        grid += width
+    return chunks[::-1]
+
+
+def fetch_chunk(client, limiter, start, end):
+    """拉取一个区间的数据，返回 DataFrame"""
+    limiter.acquire()
+    response = client.get(RANGE_ENDPOINT, params={'vs_currency': 'usd', 'from': start, 'to': end})
+    response.raise_for_status()
+    return BitcoinAPI.parse_market_chart(response.json())
+
+
+def run_backfill(start, end, chunk_days=30, workers=4, rate_per_minute=10,
+                 checkpoint_path=DEFAULT_CHECKPOINT, base_url=None):
+    """
+    回填 [start, end] 区间的数据
+
+    Args:
+        start / end: 纪元秒
+        chunk_days: 每个请求覆盖的天数（不超过 90 天时为小时级数据）
+        workers: 并发请求数
+        rate_per_minute: 每分钟最多请求数
+        checkpoint_path: 检查点文件
+        base_url: 接口根地址，默认 COINGECKO_BASE_URL
+
+    Returns:
+        dict: 写入行数、失败区间数与吞吐统计
+    """
+    checkpoint = Checkpoint(checkpoint_path)
+    chunks = plan_chunks(start, end, chunk_days)
+    pending = [chunk for chunk in chunks if not checkpoint.is_done(*chunk)]
+    print(f"📦 共 {len(chunks)} 个区间，已完成 {len(chunks) - len(pending)} 个，待回填 {len(pending)} 个")
+
+    client = UpstreamClient(base_url=base_url, pool_size=workers)
+    limiter = RateLimiter(rate_per_minute)
+
+    rows = 0
+    failed = 0
+    load_seconds = 0.0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_chunk, client, limiter, chunk_start, chunk_end): (chunk_start, chunk_end)
+            for chunk_start, chunk_end in pending
+        }
+        try:
+            # 写入在主线程串行执行，拉取在线程池中并发进行
+            for future in as_completed(futures):
+                chunk_start, chunk_end = futures[future]
+                label = f"{_format(chunk_start)} ~ {_format(chunk_end)}"
+                try:
+                    df = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ 区间 {label} 拉取失败: {e}")
+                    continue
+
+                load_start = time.perf_counter()
+                saved = db_manager.save_historical_data(df) if not df.empty else 0
+                load_seconds += time.perf_counter() - load_start
+
+                if saved == 0 and not _before_retention(df):
+                    failed += 1
+                    print(f"❌ 区间 {label} 写入失败")
+                    continue
+
+                rows += saved
+                checkpoint.mark_done(chunk_start, chunk_end, saved)
+                print(f"✅ 区间 {label}: {saved} 条")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("⏹️ 已中断，重新运行将从检查点继续")
+            raise
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'chunks': len(pending),
+        'failed': failed,
+        'rows': rows,
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        'load_rows_per_sec': round(rows / load_seconds, 1) if load_seconds > 0 else 0.0,
+        'upstream': client.stats()['endpoints'].get(RANGE_ENDPOINT)
+    }
+    print(f"\n📊 回填完成: {rows} 条，耗时 {elapsed:.2f}s，{summary['rows_per_sec']} rows/s "
+          f"（写入 {summary['load_rows_per_sec']} rows/s），失败 {failed} 个区间")
+    return summary
+
+
+def _before_retention(df):
+    """区间内数据是否全部早于保留期（不会写入数据库）"""
+    cutoff = datetime.now() - timedelta(days=DATA_RETENTION_DAYS)
+    return df.empty or df['datetime'].max() < cutoff
+
+
+def _format(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def _parse_date(value):
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回填 price_history 历史数据')
+    parser.add_argument('--days', type=int, default=DATA_RETENTION_DAYS, help='回填最近 N 天（默认数据保留天数）')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD（UTC），优先于 --days')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD（UTC），默认当前时间')
+    parser.add_argument('--chunk-days', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate-per-minute', type=float, default=10)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--reset', action='store_true', help='忽略并删除已有检查点')
+    parser.add_argument('--base-url', default=None, help='接口根地址，如本地 mock 服务 http://127.0.0.1:8765/api/v3')
+    args = parser.parse_args()
+
+    if args.chunk_days > 90:
+        parser.error('--chunk-days 超过 90 天时 CoinGecko 只返回日级数据')
+
+    end = _parse_date(args.end) if args.end else int(time.time())
+    start = _parse_date(args.start) if args.start else end - min(args.days, DATA_RETENTION_DAYS) * DAY_SECONDS
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    summary = run_backfill(
+        start, end,
+        chunk_days=args.chunk_days,
+        workers=args.workers,
+        rate_per_minute=args.rate_per_minute,
+        checkpoint_path=args.checkpoint,
+        base_url=args.base_url
+    )
+    if summary['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+"""
+性能基准测试脚本
+
+用法:
+    python benchmark.py [--backend sqlite] [--i-know] ingest [--sizes 1000 10000 100000] [--batch-size 1000]
+    python benchmark.py cache [--days 365] [--repeat 20]
+    python benchmark.py upstream [--calls 200] [--latency-ms 5] [--base-url URL]
+    python benchmark.py indicators [--rows 2000]
+    python benchmark.py risk [--days 365] [--repeat 20]
+    python benchmark.py fields [--days 365] [--repeat 10]
+    python benchmark.py memory [--ranges 7 30 90 365] [--repeat 100]
+    python benchmark.py candlestick [--days 90] [--repeat 10]
+    python benchmark.py downsample [--max-points 1000 2000] [--repeat 5]
+    python benchmark.py columnar [--repeat 5]
+
+注意: 基准测试会清空目标库的 price_history 表。
+MySQL 总是使用独立的 bitcoin_bench 数据库（可通过 BENCH_MYSQL_DATABASE 指定，不沿用 MYSQL_DATABASE）；
+SQLite（--backend sqlite 或 DB_BACKEND=sqlite）总是使用临时目录中的独立数据库文件，不沿用 SQLITE_PATH。
+目标与应用数据库（MYSQL_DATABASE / SQLITE_PATH）相同时拒绝运行，除非显式传入 --i-know。
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+# 应用使用的数据库（docker-compose / .env 中的 MYSQL_DATABASE）与基准测试数据库；
+# 后者在导入 database 模块前写入 MYSQL_DATABASE，全局 db_manager 也不会连接应用数据库
+APP_MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'bitcoin_db')
+BENCH_MYSQL_DATABASE = os.getenv('BENCH_MYSQL_DATABASE', 'bitcoin_bench')
+os.environ['MYSQL_DATABASE'] = BENCH_MYSQL_DATABASE
+
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+from sqlalchemy import text
+
+import columnar
+import mock_coingecko
+import serialization
+from config import DB_BACKEND, SQLITE_PATH
+from database import DatabaseManager
+from http_client import UpstreamClient
+from indicators import IndicatorEngine, compute_columns
+from resample import RESAMPLE_INTERVALS, TimeframeSeries
+from series_store import CompactSeriesStore
+from services import (
+    HISTORICAL_FIELDS, aggregate_candlestick, downsample_historical, format_candlestick, format_historical,
+    historical_arrays
+)
+from storage import SQLiteBackend, create_backend
+from utils import calculate_technical_indicators, calculate_risk_alerts
+
+
+def make_price_frame(rows, freq='min'):
+    """生成以当前时间结尾的模拟价格数据"""
+    end = pd.Timestamp(datetime.now()).floor(freq)
+    index = pd.date_range(end=end, periods=rows, freq=freq)
+    rng = np.random.default_rng(42)
+    prices = 60000 + np.cumsum(rng.normal(0, 50, rows))
+    volumes = rng.uniform(1e9, 5e10, rows)
+    return pd.DataFrame({'datetime': index, 'price': prices, 'volume': volumes})
+
+
+def is_app_database(backend):
+    """后端是否指向应用数据库（SQLITE_PATH 或 MYSQL_DATABASE）"""
+    path = getattr(backend, 'path', None)
+    if path is not None:
+        return path != ':memory:' and os.path.abspath(path) == os.path.abspath(SQLITE_PATH)
+    return getattr(backend, 'db_config', {}).get('database') == APP_MYSQL_DATABASE
+
+
+def make_db_manager(backend_name=None, allow_app_database=False):
+    """
+    创建基准测试专用的数据库管理器
+
+    Args:
+        backend_name: 存储后端，默认读取 DB_BACKEND；SQLite 总是使用临时数据库文件
+        allow_app_database: 目标为应用数据库时是否仍然运行（--i-know）
+    """
+    if (backend_name or DB_BACKEND).lower() == 'sqlite':
+        backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix='btc_bench_'), 'bench.db'))
+    else:
+        backend = create_backend(backend_name)
+
+    if is_app_database(backend) and not allow_app_database:
+        raise SystemExit(
+            "❌ 基准测试目标与应用数据库相同，拒绝清空 price_history；"
+            "请通过 BENCH_MYSQL_DATABASE 指定独立的数据库，或确认后传入 --i-know"
+        )
+    return DatabaseManager(backend)
+
+
+def bench_ingest(db, sizes, batch_size):
+    """测量 save_historical_data 的批量写入吞吐（rows/sec）"""
+    print(f"\n后端: {db.backend.label}")
+    print(f"\n{'rows':>8} | {'batch':>6} | {'seconds':>8} | {'rows/sec':>10}")
+    print('-' * 42)
+    for rows in sizes:
+        # 分钟级数据：10 万行约 69 天，不会被一年保留期过滤
+        df = make_price_frame(rows)
+        with db.engine.begin() as conn:
+            conn.execute(text('DELETE FROM price_history'))
+
+        start = time.perf_counter()
+        db.save_historical_data(df, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+
+        print(f"{rows:>8} | {batch_size:>6} | {elapsed:>8.3f} | {rows / elapsed:>10.0f}")
+
+
+def timed(func, repeat):
+    """返回 func 多次执行的平均耗时（毫秒）和最后一次结果"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def bench_cache(days, repeat):
+    """对比 technical_cache 的 JSON 与二进制格式：体积、编码 / 解码耗时"""
+    df = calculate_technical_indicators(make_price_frame(days * 24, freq='h'))
+    print(f"\n{days} 天小时级指标数据: {len(df)} 行 x {len(df.columns)} 列")
+
+    def json_decode(payload):
+        # 与旧版 get_cache 相同：json.loads 后再 pd.read_json
+        json.loads(payload)
+        return pd.read_json(StringIO(payload), orient='split')
+
+    json_encode_ms, json_payload = timed(lambda: df.to_json(orient='split', date_format='iso'), repeat)
+    json_decode_ms, json_frame = timed(lambda: json_decode(json_payload), repeat)
+    bin_encode_ms, bin_payload = timed(lambda: serialization.encode(df), repeat)
+    bin_decode_ms, bin_frame = timed(lambda: serialization.decode(bin_payload), repeat)
+
+    print(f"\n{'format':>8} | {'bytes':>10} | {'encode ms':>10} | {'decode ms':>10} | dtypes kept")
+    print('-' * 62)
+    print(f"{'json':>8} | {len(json_payload.encode()):>10} | {json_encode_ms:>10.2f} | "
+          f"{json_decode_ms:>10.2f} | {json_frame.dtypes.equals(df.dtypes)}")
+    print(f"{'binary':>8} | {len(bin_payload):>10} | {bin_encode_ms:>10.2f} | "
+          f"{bin_decode_ms:>10.2f} | {bin_frame.dtypes.equals(df.dtypes)}")
+
+
+def bench_upstream(calls, latency_ms, base_url=None):
+    """对比每次新建连接的 requests.get 与共享连接池客户端的调用延迟，并验证 429 重试"""
+    server = None
+    if base_url is None:
+        server, base_url = mock_coingecko.start_in_background(latency_ms=latency_ms)
+    endpoint = '/simple/price'
+    params = {'ids': 'bitcoin', 'vs_currencies': 'usd'}
+
+    try:
+        bare_ms, _ = timed(lambda: requests.get(f'{base_url}{endpoint}', params=params, timeout=10), calls)
+        client = UpstreamClient(base_url=base_url, max_retries=0)
+        pooled_ms, _ = timed(lambda: client.get(endpoint, params=params), calls)
+
+        print(f"\n{calls} 次 GET {base_url}{endpoint}")
+        print(f"{'client':>12} | {'avg ms':>8}")
+        print('-' * 24)
+        print(f"{'requests.get':>12} | {bare_ms:>8.2f}")
+        print(f"{'pooled':>12} | {pooled_ms:>8.2f}")
+        print(f"\n连接池客户端延迟统计: {client.stats()['endpoints'][endpoint]}")
+
+        if server is not None:
+            # 每 3 个请求返回一次 429（Retry-After: 0），客户端应全部重试成功
+            server.state.rate_limit_every = 3
+            server.state.retry_after = 0
+            retry_client = UpstreamClient(base_url=base_url, max_retries=2)
+            statuses = [retry_client.get(endpoint, params=params).status_code for _ in range(30)]
+            metrics = retry_client.stats()['endpoints'][endpoint]
+            print(f"\n429 注入: 30 次调用成功 {statuses.count(200)} 次，重试 {metrics['retries']} 次")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+def bench_indicators(rows):
+    """
+    新增一个数据点时全量重算与增量指标引擎单点更新的耗时
+
+    与 calculate_technical_indicators 的一致性由 tests/test_indicators.py 检查（含随机序列）。
+    """
+    frame = make_price_frame(rows, freq='h')
+    full_ms, _ = timed(lambda: calculate_technical_indicators(frame.copy()), 20)
+    engine = IndicatorEngine.from_frame(calculate_technical_indicators(frame.copy()))
+    ticks = frame['price'].to_numpy()[::-1]
+    start = time.perf_counter()
+    for price in ticks:
+        engine.update(price)
+    tick_us = (time.perf_counter() - start) / len(ticks) * 1e6
+    print(f"\n{rows} 行新增一个数据点: 全量重算 {full_ms:.2f} ms，增量更新 {tick_us:.1f} µs")
+
+
+def legacy_risk_alerts(df):
+    """逐行实现的风险警报（向量化之前的版本），作为对照"""
+    alerts = []
+    df['returns'] = df['price'].pct_change() * 100
+    df['volume_ma'] = df['volume'].rolling(window=min(24, len(df))).mean()
+    df['volume_change'] = ((df['volume'] - df['volume_ma']) / (df['volume_ma'] + 1)) * 100
+    recent = df.tail(min(50, len(df)))
+    for i in range(len(recent)):
+        row = recent.iloc[i]
+        if pd.isna(row['returns']):
+            continue
+        if abs(row['returns']) > 3:
+            alerts.append({
+                'type': 'price_volatility',
+                'severity': 'high' if abs(row['returns']) > 5 else 'medium',
+                'message': f"价格波动 {row['returns']:+.2f}%",
+                'timestamp': row['datetime'].strftime('%Y-%m-%d %H:%M'),
+                'value': float(row['returns'])
+            })
+        if not pd.isna(row['volume_change']) and row['volume_change'] > 150:
+            alerts.append({
+                'type': 'volume_surge',
+                'severity': 'medium',
+                'message': f"交易量暴增 {row['volume_change']:.0f}%",
+                'timestamp': row['datetime'].strftime('%Y-%m-%d %H:%M'),
+                'value': float(row['volume_change'])
+            })
+    return sorted(alerts, key=lambda x: x['timestamp'], reverse=True)[:10]
+
+
+def bench_risk(days, repeat):
+    """向量化风险警报：与逐行实现的结果对比，以及最近 50 点 / 整个范围的计算耗时"""
+    df = make_price_frame(days * 24, freq='h')
+    rng = np.random.default_rng(3)
+    # 注入价格跳变与交易量暴增，保证有足够的警报
+    jumps = rng.choice(len(df), size=len(df) // 20, replace=False)
+    df.loc[jumps, 'price'] *= rng.choice([0.94, 0.96, 1.04, 1.06], size=len(jumps))
+    surges = rng.choice(len(df), size=len(df) // 30, replace=False)
+    df.loc[surges, 'volume'] *= 4
+
+    for rows in (50, 200, len(df)):
+        window = df.tail(rows).reset_index(drop=True)
+        expected = legacy_risk_alerts(window.copy())
+        actual = calculate_risk_alerts(window)
+        if actual != expected:
+            raise AssertionError(f"{rows} 行数据的警报与逐行实现不一致")
+    print("\n一致性检查通过（最近 50 点，阈值 3% / 5% / 150%）")
+
+    legacy_ms, _ = timed(lambda: legacy_risk_alerts(df.tail(7 * 24).copy()), repeat)
+    recent_ms, _ = timed(lambda: calculate_risk_alerts(df.tail(7 * 24)), repeat)
+    full_ms, alerts = timed(lambda: calculate_risk_alerts(df, recent=None, limit=None), repeat)
+    print(f"\n{'case':>24} | {'avg ms':>8}")
+    print('-' * 36)
+    print(f"{'7d recent-50 (loop)':>24} | {legacy_ms:>8.2f}")
+    print(f"{'7d recent-50 (vector)':>24} | {recent_ms:>8.2f}")
+    print(f"{f'{days}d full review':>24} | {full_ms:>8.2f}  ({len(df)} 行, {len(alerts)} 条警报)")
+
+
+def bench_fields(days, repeat):
+    """/api/historical 按字段计算：全量指标 + 全部序列与只计算请求字段的耗时、响应体积"""
+    raw = make_price_frame(days * 24, freq='h')
+    cases = [None, ['prices'], ['prices', 'volumes'], ['rsi'], ['macd', 'macd_signal'], ['bb_upper', 'bb_lower']]
+
+    def build(fields):
+        if fields is None:
+            return format_historical(calculate_technical_indicators(raw.copy()))
+        fields = ['timestamps'] + fields
+        names = [HISTORICAL_FIELDS[field][0] for field in fields if field not in ('timestamps', 'prices', 'volumes')]
+        frame = pd.DataFrame({**raw, **compute_columns(names, raw)})
+        return format_historical(frame, fields)
+
+    print(f"\n{days} 天小时级数据: {len(raw)} 行")
+    print(f"\n{'fields':>22} | {'ms':>8} | {'bytes':>10}")
+    print('-' * 46)
+    for fields in cases:
+        elapsed, data = timed(lambda: build(fields), repeat)
+        label = ','.join(fields) if fields else '(all)'
+        print(f"{label:>22} | {elapsed:>8.2f} | {len(json.dumps(data)):>10}")
+
+
+def bench_memory(ranges, repeat):
+    """紧凑序列存储与按范围分别缓存 float64 DataFrame 的内存占用、视图创建耗时及 float32 存储的误差"""
+    raw = make_price_frame(max(ranges) * 24, freq='h')
+
+    per_key = {}
+    for days in ranges:
+        since = pd.Timestamp(datetime.now()) - pd.Timedelta(days=days)
+        frame = calculate_technical_indicators(raw[raw['datetime'] >= since].reset_index(drop=True))
+        frame['timestamp'] = frame['datetime'].astype('int64') // 10**6
+        per_key[days] = frame
+    per_key_bytes = sum(int(frame.memory_usage(deep=True, index=False).sum()) for frame in per_key.values())
+
+    store = CompactSeriesStore()
+    store.load(per_key)
+    report = store.memory_report(ranges)
+    view_ms, _ = timed(lambda: store.frame(min(ranges)), repeat)
+
+    print(f"\n{max(ranges)} 天小时级数据: {len(per_key[max(ranges)])} 行, 范围 {ranges}")
+    print(f"\n{'layout':>24} | {'bytes':>12}")
+    print('-' * 40)
+    print(f"{'per-key float64 frames':>24} | {per_key_bytes:>12}")
+    print(f"{'compact store':>24} | {report['compact_bytes']:>12}  ({report['compact_bytes'] / per_key_bytes:.1%})")
+    print(f"\n{min(ranges)} 天视图创建: {view_ms * 1000:.1f} µs")
+
+    # 各范围中 float32 存储值与 float64 计算结果的最大误差
+    errors = {
+        column: max(
+            float(np.max(np.abs(store.frame(days)[column].to_numpy(dtype=np.float64) - per_key[days][column].to_numpy())))
+            for days in ranges
+        )
+        for column, _ in HISTORICAL_FIELDS.values() if column != 'datetime'
+    }
+    print(f"\n{'column':>14} | {'max abs error':>14}")
+    print('-' * 32)
+    for column, error in errors.items():
+        print(f"{column:>14} | {error:>14.4f}")
+
+
+def legacy_daily_candlestick(df):
+    """原 /api/candlestick 的按日聚合（逐行转换为 Python date 后 groupby），作为对照"""
+    df['date'] = df['datetime'].dt.date
+    daily = df.groupby('date').agg({
+        'price': ['first', 'max', 'min', 'last'],
+        'volume': 'sum'
+    }).reset_index()
+    daily.columns = ['date', 'open', 'high', 'low', 'close', 'volume']
+    return {
+        'dates': daily['date'].astype(str).tolist(),
+        'data': daily[['open', 'close', 'low', 'high']].round(2).values.tolist(),
+        'volumes': daily['volume'].round(0).tolist()
+    }
+
+
+def bench_candlestick(days, repeat):
+    """K 线聚合：整数分桶与按日期 groupby 的对比，以及缓存已收盘 K 线后每次请求的耗时"""
+    raw = make_price_frame(days * 288, freq='5min')
+
+    expected = legacy_daily_candlestick(raw.copy())
+    if format_candlestick(aggregate_candlestick(raw)) != expected:
+        raise AssertionError("整数分桶的日K与按日期 groupby 的结果不一致")
+    print(f"\n{days} 天 5 分钟数据: {len(raw)} 行，日K一致性检查通过")
+
+    legacy_ms, _ = timed(lambda: legacy_daily_candlestick(raw.copy()), repeat)
+    print(f"\n{'case':>22} | {'avg ms':>8}")
+    print('-' * 34)
+    print(f"{'1d groupby(date)':>22} | {legacy_ms:>8.2f}")
+
+    timestamps = raw['datetime'].to_numpy()
+    prices = raw['price'].to_numpy()
+    volumes = raw['volume'].to_numpy()
+    for interval in RESAMPLE_INTERVALS:
+        elapsed, _ = timed(lambda: aggregate_candlestick(raw, interval), repeat)
+        print(f"{f'{interval} epoch buckets':>22} | {elapsed:>8.2f}")
+
+    # 每次请求多一个新数据点：只重新计算最新一根 K 线
+    for interval in RESAMPLE_INTERVALS:
+        series = TimeframeSeries(interval)
+        series.frame(timestamps[:-repeat], prices[:-repeat], volumes[:-repeat])
+        start = time.perf_counter()
+        for end in range(len(raw) - repeat + 1, len(raw) + 1):
+            series.frame(timestamps[:end], prices[:end], volumes[:end])
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f"{f'{interval} cached + live':>22} | {elapsed:>8.2f}  ({series.stats})")
+
+
+def bench_downsample(max_points, repeat):
+    """服务端降采样：不同数据量下完整响应与降采样响应的耗时（降采样 + 格式化 + JSON 编码）和体积"""
+    print(f"\n{'rows':>8} | {'max_points':>10} | {'points':>7} | {'ms':>8} | {'bytes':>10}")
+    print('-' * 56)
+    for days, freq in ((30, 'h'), (365, 'h'), (365, '5min')):
+        rows = days * (24 if freq == 'h' else 288)
+        df = calculate_technical_indicators(make_price_frame(rows, freq=freq))
+        for limit in [None, *max_points]:
+            def build():
+                frame = df if limit is None else downsample_historical(df, limit)
+                return json.dumps(format_historical(frame))
+            elapsed, body = timed(build, repeat)
+            points = len(df) if limit is None else len(downsample_historical(df, limit))
+            print(f"{rows:>8} | {str(limit or '-'):>10} | {points:>7} | {elapsed:>8.2f} | {len(body):>10}")
+
+
+def bench_columnar(repeat):
+    """/api/historical 响应编码：JSON（取整 + 列表 + 文本）与列式二进制（数组直接拼接）的耗时和体积"""
+    encoders = {
+        'json': lambda df: json.dumps(
+            {'success': True, 'data': format_historical(df)}, separators=(',', ':')
+        ).encode('utf-8'),
+        'columnar': lambda df: columnar.encode(historical_arrays(df), {'success': True}),
+    }
+
+    print(f"\n{'rows':>8} | {'format':>9} | {'encode ms':>9} | {'bytes':>10} | {'gzip bytes':>10}")
+    print('-' * 59)
+    for days, freq in ((30, 'h'), (365, 'h'), (365, '5min')):
+        rows = days * (24 if freq == 'h' else 288)
+        df = calculate_technical_indicators(make_price_frame(rows, freq=freq))
+        for name, encode in encoders.items():
+            elapsed, body = timed(lambda: encode(df), repeat)
+            print(f"{rows:>8} | {name:>9} | {elapsed:>9.2f} | {len(body):>10} | {len(gzip.compress(body, 6)):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BTC Analysis Platform 性能基准测试')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default=None,
+                        help='存储后端，默认读取 DB_BACKEND')
+    parser.add_argument('--i-know', action='store_true',
+                        help='目标为应用数据库时仍然运行（会清空 price_history）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='历史数据批量写入吞吐')
+    ingest.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    ingest.add_argument('--batch-size', type=int, default=1000)
+
+    cache = subparsers.add_parser('cache', help='technical_cache 序列化格式对比')
+    cache.add_argument('--days', type=int, default=365)
+    cache.add_argument('--repeat', type=int, default=20)
+
+    upstream = subparsers.add_parser('upstream', help='上游 HTTP 客户端连接复用与重试（默认使用本地 mock 服务）')
+    upstream.add_argument('--calls', type=int, default=200)
+    upstream.add_argument('--latency-ms', type=float, default=5)
+    upstream.add_argument('--base-url', default=None, help='指定已运行的服务地址，如 http://127.0.0.1:8765/api/v3')
+
+    indicators = subparsers.add_parser('indicators', help='增量技术指标与全量计算的耗时')
+    indicators.add_argument('--rows', type=int, default=2000)
+
+    risk = subparsers.add_parser('risk', help='向量化风险警报的一致性与耗时')
+    risk.add_argument('--days', type=int, default=365)
+    risk.add_argument('--repeat', type=int, default=20)
+
+    fields = subparsers.add_parser('fields', help='/api/historical 按字段计算的耗时与体积')
+    fields.add_argument('--days', type=int, default=365)
+    fields.add_argument('--repeat', type=int, default=10)
+
+    memory = subparsers.add_parser('memory', help='紧凑序列存储的内存占用与精度')
+    memory.add_argument('--ranges', type=int, nargs='+', default=[7, 30, 90, 365])
+    memory.add_argument('--repeat', type=int, default=100)
+
+    candlestick = subparsers.add_parser('candlestick', help='K 线聚合与已收盘 K 线缓存的耗时')
+    candlestick.add_argument('--days', type=int, default=90)
+    candlestick.add_argument('--repeat', type=int, default=10)
+
+    downsample = subparsers.add_parser('downsample', help='/api/historical 服务端降采样的耗时与体积')
+    downsample.add_argument('--max-points', type=int, nargs='+', default=[1000, 2000])
+    downsample.add_argument('--repeat', type=int, default=5)
+
+    columnar_parser = subparsers.add_parser('columnar', help='/api/historical JSON 与列式二进制响应的编码耗时与体积')
+    columnar_parser.add_argument('--repeat', type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == 'ingest':
+        bench_ingest(make_db_manager(args.backend, args.i_know), args.sizes, args.batch_size)
+    elif args.command == 'cache':
+        bench_cache(args.days, args.repeat)
+    elif args.command == 'upstream':
+        bench_upstream(args.calls, args.latency_ms, args.base_url)
+    elif args.command == 'indicators':
+        bench_indicators(args.rows)
+    elif args.command == 'risk':
+        bench_risk(args.days, args.repeat)
+    elif args.command == 'fields':
+        bench_fields(args.days, args.repeat)
+    elif args.command == 'memory':
+        bench_memory(args.ranges, args.repeat)
+    elif args.command == 'candlestick':
+        bench_candlestick(args.days, args.repeat)
+    elif args.command == 'downsample':
+        bench_downsample(args.max_points, args.repeat)
+    elif args.command == 'columnar':
+        bench_columnar(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,80 +1,304 @@
 """
 缓存管理模块
+线程安全、按内存预算做 LRU 淘汰的进程内缓存，
+支持请求合并（single-flight）和过期后先返回旧值再后台刷新（stale-while-revalidate）
 """
+import sys
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
+import pandas as pd
+
+from config import CACHE_BACKEND, CACHE_MAX_BYTES
+
+
+def estimate_size(data):
+    """估算缓存数据占用的字节数"""
+    if data is None:
+        return 0
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        usage = data.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(data, dict):
+        return sys.getsizeof(data) + sum(
+            estimate_size(key) + estimate_size(value) for key, value in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        return sys.getsizeof(data) + sum(estimate_size(item) for item in data)
+    return sys.getsizeof(data)
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ('data', 'size', 'created', 'expires_at', 'last_update')
+
+    def __init__(self, data, ttl=None):
+        self.data = data
+        self.size = estimate_size(data)
+        # 过期判断使用单调时钟，不受系统时间调整影响
+        self.created = time.monotonic()
+        self.expires_at = self.created + ttl if ttl is not None else None
+        # 墙上时间仅用于展示
+        self.last_update = datetime.now()
+
+    def age(self):
+        """条目存在的秒数"""
+        return time.monotonic() - self.created
+
+    def is_expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+class Flight:
+    """一次进行中的计算，并发请求等待同一个结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def share(result):
+    """DataFrame 返回浅拷贝：调用方各自增加列时不会互相影响"""
+    if isinstance(result, pd.DataFrame):
+        return result.copy(deep=False)
+    return result
+
 
 class CacheManager:
     """缓存管理器"""
-    
-    def __init__(self):
-        # 全局缓存数据
-        self.cached_data = {
-            'historical_7d': {'last_update': None, 'data': None},
-            'historical_30d': {'last_update': None, 'data': None},
-            'statistics': {'last_update': None, 'data': None},
-            'prediction': {'last_update': None, 'data': None},
-            'candlestick': {'last_update': None, 'data': None}
-        }
-        
-        # API请求计数器
+
+    def __init__(self, max_bytes=None):
+        """
+        Args:
+            max_bytes: 全局内存预算（字节），超出后按 LRU 淘汰，默认 config.CACHE_MAX_BYTES
+        """
+        self.max_bytes = max_bytes or CACHE_MAX_BYTES
+
+        # 按最近使用顺序排列的缓存条目，及其总字节数
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # 命中 / 未命中 / 淘汰 / 合并 / 返回旧值计数
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'coalesced': 0, 'stale_served': 0}
+
+        # 进行中的计算（single-flight），按 key 合并
+        self._flights = {}
+        self._flight_lock = threading.Lock()
+
+        # API请求计数器（单独加锁，不与缓存读写互相阻塞）
+        self._rate_lock = threading.Lock()
         self.request_counter = {
-            'last_reset': datetime.now(),
+            'last_reset': time.monotonic(),
             'count': 0
         }
-    
+
     def get_cache(self, key):
-        """获取缓存数据"""
-        return self.cached_data.get(key, {'last_update': None, 'data': None})
-    
-    def set_cache(self, key, data):
-        """设置缓存数据"""
-        if key not in self.cached_data:
-            self.cached_data[key] = {'last_update': None, 'data': None}
-        
-        self.cached_data[key]['data'] = data
-        self.cached_data[key]['last_update'] = datetime.now()
-    
+        """
+        获取缓存数据（不检查是否过期，可用于降级返回旧数据）
+
+        Returns:
+            dict: {'last_update': datetime, 'data': ...}，不存在时两者均为 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return {'last_update': None, 'data': None}
+            self._entries.move_to_end(key)
+            return {'last_update': entry.last_update, 'data': entry.data}
+
+    def set_cache(self, key, data, ttl=None):
+        """
+        设置缓存数据
+
+        Args:
+            key: 缓存键
+            data: 缓存数据
+            ttl: 条目有效期（秒），为 None 时只按 is_cache_valid 的 max_age_seconds 判断
+        """
+        entry = CacheEntry(data, ttl=ttl)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            self._evict_locked(keep=key)
+
     def is_cache_valid(self, key, max_age_seconds=3600):
         """检查缓存是否有效（默认1小时）"""
-        cache = self.cached_data.get(key)
-        if not cache or cache['last_update'] is None or cache['data'] is None:
-            return False
-        
-        age = (datetime.now() - cache['last_update']).seconds
-        return age < max_age_seconds
-    
+        with self._lock:
+            entry = self._entries.get(key)
+            valid = (
+                entry is not None
+                and entry.data is not None
+                and not entry.is_expired()
+                and entry.age() < max_age_seconds
+            )
+            self._stats['hits' if valid else 'misses'] += 1
+            return valid
+
+    def invalidate(self, key):
+        """标记缓存过期但保留数据，stale-while-revalidate 模式下仍可先返回旧值"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic()
+
+    def single_flight(self, key, compute):
+        """
+        合并同一 key 的并发计算：只有第一个调用方执行 compute，其余调用方等待同一结果
+
+        Raises:
+            compute 抛出的异常会传递给所有等待者
+        """
+        with self._flight_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            with self._lock:
+                self._stats['coalesced'] += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return share(flight.result)
+
+        try:
+            flight.result = compute()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flight_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def get_or_compute(self, key, compute, max_age_seconds=3600, ttl=None,
+                       stale_while_revalidate=False):
+        """
+        读取缓存，失效时合并计算并写回
+
+        Args:
+            key: 缓存键
+            compute: 无参函数，返回 None 表示计算失败（不写缓存）
+            max_age_seconds: 缓存最大有效时间
+            ttl: 写回条目的有效期
+            stale_while_revalidate: 有旧值时立即返回旧值，由一个后台线程刷新
+
+        Returns:
+            缓存数据或新计算的结果，失败且无旧值时返回 None
+        """
+        if self.is_cache_valid(key, max_age_seconds=max_age_seconds):
+            return self.get_cache(key)['data']
+
+        def refresh():
+            # 成为计算者之前，上一次合并计算可能刚完成并写回缓存
+            if self.is_cache_valid(key, max_age_seconds=max_age_seconds):
+                return self.get_cache(key)['data']
+            result = compute()
+            if result is not None:
+                self.set_cache(key, result, ttl=ttl)
+            return result
+
+        stale = self.get_cache(key)['data']
+        if stale_while_revalidate and stale is not None:
+            with self._lock:
+                self._stats['stale_served'] += 1
+            self._revalidate_in_background(key, refresh)
+            return stale
+
+        return self.single_flight(key, refresh)
+
+    def _revalidate_in_background(self, key, refresh):
+        """启动后台刷新；同一 key 已有刷新在进行时不重复启动"""
+        with self._flight_lock:
+            if key in self._flights:
+                return
+
+        def run():
+            try:
+                self.single_flight(key, refresh)
+            except Exception as e:
+                print(f"❌ 后台刷新缓存失败: {key}: {e}")
+
+        threading.Thread(target=run, name=f'cache-refresh-{key}', daemon=True).start()
+
+    def _evict_locked(self, keep=None):
+        """超出内存预算时从最久未使用的条目开始淘汰（调用方需持有锁）"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                # 刚写入的条目最后淘汰
+                self._entries.move_to_end(key)
+                key = next(iter(self._entries))
+            entry = self._entries.pop(key)
+            self._total_bytes -= entry.size
+            self._stats['evictions'] += 1
+            print(f"🗑️ 缓存超出预算，淘汰: {key} ({entry.size / 1024:.0f} KB)")
+
     def check_rate_limit(self, limit=10, window=60):
         """检查API请求频率限制"""
-        now = datetime.now()
-        
-        # 重置计数器
-        if (now - self.request_counter['last_reset']).seconds > window:
-            self.request_counter['last_reset'] = now
-            self.request_counter['count'] = 0
-        
-        # 检查是否超过限制
-        if self.request_counter['count'] >= limit:
-            return False
-        
-        return True
-    
+        with self._rate_lock:
+            now = time.monotonic()
+
+            # 重置计数器
+            if now - self.request_counter['last_reset'] > window:
+                self.request_counter['last_reset'] = now
+                self.request_counter['count'] = 0
+
+            # 检查是否超过限制
+            return self.request_counter['count'] < limit
+
     def increment_request_count(self):
         """增加请求计数"""
-        self.request_counter['count'] += 1
-    
+        with self._rate_lock:
+            self.request_counter['count'] += 1
+
     def clear_cache(self, key):
         """清除指定的缓存"""
-        if key in self.cached_data:
-            self.cached_data[key] = {'last_update': None, 'data': None}
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.size
+        if entry is not None:
             print(f"🗑️ 清除缓存: {key}")
-    
+
     def clear_all_cache(self):
         """清除所有缓存"""
-        for key in self.cached_data.keys():
-            self.cached_data[key] = {'last_update': None, 'data': None}
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
         print("🗑️ 清除所有缓存")
 
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'backend': 'memory'
+            }
+
+
+def create_cache_manager():
+    """根据 config.CACHE_BACKEND 创建缓存管理器（memory：进程内；shared：同主机多进程共享）"""
+    if CACHE_BACKEND == 'shared':
+        from shared_cache import SharedCacheManager
+        return SharedCacheManager()
+    return CacheManager()
+
 
 # 创建全局缓存管理器实例
-cache_manager = CacheManager()
+cache_manager = create_cache_manager()
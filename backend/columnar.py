@@ -0,0 +1,109 @@
+"""
+列式二进制响应格式
+/api/historical 在请求头 Accept 为 MEDIA_TYPE 时返回：各序列为小端定长数组，直接由 NumPy 缓冲区拼接，
+不生成 Python 列表，也不做数值到文本的转换。
+
+格式:
+    MAGIC(4) | VERSION(1) | RESERVED(3) | 清单长度(uint32) | JSON 清单 | 各列数组
+
+清单: {"rows": 行数, "meta": 其余响应字段, "columns": [{"name", "dtype", "offset", "length"}]}
+offset 为从消息开头算起的字节偏移，均按 8 字节对齐，浏览器可直接
+new Float64Array(buffer, offset, length) / new Float32Array(...) 构造视图。
+时间列为纪元毫秒（float64）。
+"""
+import json
+import struct
+
+import numpy as np
+
+
+MEDIA_TYPE = 'application/vnd.btc-analysis.columnar'
+
+MAGIC = b'BTCC'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sB3xI')
+
+ALIGNMENT = 8
+
+# 允许的数组类型（浏览器端均有对应的 TypedArray）
+DTYPES = ('<f8', '<f4', '<i4', '<u4')
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def encode(arrays, meta=None):
+    """
+    将若干等长一维数组编码为列式二进制
+
+    Args:
+        arrays: 列名 -> np.ndarray（float64 / float32 / int32 / uint32）
+        meta: 随清单返回的其他字段（可 JSON 序列化）
+
+    Returns:
+        bytes
+    """
+    columns = []
+    buffers = []
+    rows = None
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+        if array.dtype.str not in DTYPES:
+            raise ValueError(f"Unsupported column dtype: {name} {array.dtype}")
+        if rows is not None and len(array) != rows:
+            raise ValueError(f"Column length mismatch: {name}")
+        rows = len(array)
+        columns.append({'name': name, 'dtype': array.dtype.str, 'length': len(array)})
+        buffers.append(array)
+
+    # 清单中的偏移依赖清单自身长度：先按占位偏移估计长度，再补齐到对齐边界
+    def manifest_bytes(start):
+        offset = start
+        for column, array in zip(columns, buffers):
+            column['offset'] = offset
+            offset += array.nbytes + _padding(array.nbytes)
+        return json.dumps({'rows': rows or 0, 'meta': meta or {}, 'columns': columns},
+                          separators=(',', ':')).encode('utf-8')
+
+    start = 0
+    while True:
+        manifest = manifest_bytes(start)
+        size = HEADER.size + len(manifest)
+        aligned = size + _padding(size)
+        if aligned == start:
+            break
+        start = aligned
+    manifest += b' ' * (start - HEADER.size - len(manifest))
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest)), manifest]
+    for array in buffers:
+        parts.append(memoryview(array).cast('B'))
+        parts.append(b'\0' * _padding(array.nbytes))
+    return b''.join(parts)
+
+
+def decode(body):
+    """
+    解码 encode 生成的数据（数组为 body 上的只读视图）
+
+    Returns:
+        tuple: (meta, 列名 -> np.ndarray)
+
+    Raises:
+        ValueError: 格式头无效或版本不受支持
+    """
+    magic, version, manifest_size = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar payload")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version: {version}")
+
+    manifest = json.loads(bytes(body[HEADER.size:HEADER.size + manifest_size]))
+    arrays = {
+        column['name']: np.frombuffer(body, dtype=column['dtype'], count=column['length'], offset=column['offset'])
+        for column in manifest['columns']
+    }
+    return manifest['meta'], arrays
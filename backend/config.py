@@ -0,0 +1,91 @@
+"""
+配置模块
+集中读取环境变量，避免配置项散落在各个模块中
+"""
+import os
+import tempfile
+
+
+# 批量写入 price_history 时每批的行数（executemany / 多行 VALUES）
+DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', 1000))
+
+# 数据保留策略：price_history 只保留最近 N 天，由定时任务统一清理
+DATA_RETENTION_DAYS = int(os.getenv('DATA_RETENTION_DAYS', 365))
+
+# MySQL 按天分区时提前创建的未来分区天数
+DB_PARTITION_PRECREATE_DAYS = int(os.getenv('DB_PARTITION_PRECREATE_DAYS', 7))
+
+# 存储后端：mysql（默认）或 sqlite（嵌入式，WAL 模式）
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+
+# SQLite 数据库文件路径，':memory:' 表示内存库
+SQLITE_PATH = os.getenv(
+    'SQLITE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bitcoin.db')
+)
+
+# price_history 尾部缓存的全量重载间隔（秒），用于兜底其他进程的乱序写入
+DB_TAIL_RELOAD_INTERVAL = int(os.getenv('DB_TAIL_RELOAD_INTERVAL', 3600))
+
+# 进程内缓存的内存预算（MB），超出后按 LRU 淘汰
+CACHE_MAX_BYTES = int(float(os.getenv('CACHE_MAX_MB', 256)) * 1024 * 1024)
+
+# 缓存后端：memory（进程内，默认）或 shared（同一主机上的多个 worker 进程共享）
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+
+# 共享缓存的文件目录，优先使用内存文件系统 /dev/shm
+CACHE_SHARED_DIR = os.getenv(
+    'CACHE_SHARED_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'btc_analysis_cache')
+)
+
+# 定时更新后预热的历史数据范围（天），按优先级排列
+CACHE_WARM_DAYS = [int(days) for days in os.getenv('CACHE_WARM_DAYS', '7,30,90,365').split(',') if days.strip()]
+
+# 网络连通性探测：探测地址（任一可访问即在线）、探测间隔与超时（秒）
+CONNECTIVITY_PROBE_URLS = [
+    url.strip() for url in os.getenv(
+        'CONNECTIVITY_PROBE_URLS', 'https://www.google.com,https://www.baidu.com'
+    ).split(',') if url.strip()
+]
+CONNECTIVITY_PROBE_INTERVAL = float(os.getenv('CONNECTIVITY_PROBE_INTERVAL', 30))
+CONNECTIVITY_PROBE_TIMEOUT = float(os.getenv('CONNECTIVITY_PROBE_TIMEOUT', 3))
+
+# CoinGecko 熔断器：连续失败次数阈值与打开后的冷却时间（秒）
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))
+CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', 60))
+
+# CoinGecko 接口根地址（可指向本地 mock 服务：python mock_coingecko.py）
+COINGECKO_BASE_URL = os.getenv('COINGECKO_BASE_URL', 'https://api.coingecko.com/api/v3')
+
+# 上游 HTTP 客户端：连接池大小、最多重试次数、指数退避基数与上限（秒）
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', 10))
+UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', 2))
+UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', 0.5))
+UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', 8))
+
+# 各接口的请求超时（秒）
+UPSTREAM_TIMEOUTS = {
+    '/simple/price': float(os.getenv('UPSTREAM_TIMEOUT_PRICE', 10)),
+    '/coins/bitcoin/market_chart': float(os.getenv('UPSTREAM_TIMEOUT_CHART', 15)),
+    '/coins/bitcoin/market_chart/range': float(os.getenv('UPSTREAM_TIMEOUT_CHART', 15)),
+}
+
+# 实时行情写缓冲：最多缓冲的分桶数、达到多少条立即写入、最长写入间隔（秒）、去重分桶宽度（秒）
+TICK_BUFFER_MAX_SIZE = int(os.getenv('TICK_BUFFER_MAX_SIZE', 10000))
+TICK_FLUSH_BATCH_SIZE = int(os.getenv('TICK_FLUSH_BATCH_SIZE', 100))
+TICK_FLUSH_INTERVAL = float(os.getenv('TICK_FLUSH_INTERVAL', 30))
+TICK_BUCKET_SECONDS = int(os.getenv('TICK_BUCKET_SECONDS', 60))
+
+# 实时推送（SSE）：后台轮询间隔、心跳间隔（秒）与每个连接最多积压的消息数
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', 15))
+STREAM_HEARTBEAT = float(os.getenv('STREAM_HEARTBEAT', 20))
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 16))
+
+# 仪表板聚合接口（/api/dashboard）：各面板合并结果的缓存时间（秒）
+DASHBOARD_CACHE_SECONDS = float(os.getenv('DASHBOARD_CACHE_SECONDS', 15))
+
+# 风险警报阈值（%）：单点涨跌幅、高风险涨跌幅、交易量相对最近 24 个点均值的增幅
+RISK_PRICE_MOVE_PCT = float(os.getenv('RISK_PRICE_MOVE_PCT', 3))
+RISK_PRICE_MOVE_HIGH_PCT = float(os.getenv('RISK_PRICE_MOVE_HIGH_PCT', 5))
+RISK_VOLUME_SURGE_PCT = float(os.getenv('RISK_VOLUME_SURGE_PCT', 150))
@@ -0,0 +1,174 @@
+"""
+网络连通性模块
+后台探测线程维护在线/离线状态，CoinGecko 调用外加熔断器（closed / open / half-open），
+请求处理时只读取内存中的状态，不做任何网络 I/O
+"""
+import threading
+import time
+
+import requests
+
+from config import (
+    CONNECTIVITY_PROBE_URLS, CONNECTIVITY_PROBE_INTERVAL, CONNECTIVITY_PROBE_TIMEOUT,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN
+)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed: 正常放行，连续失败达到阈值后进入 open
+    - open: 直接拒绝，冷却时间过后进入 half-open
+    - half-open: 只放行一个试探请求，成功则 closed，失败则重新 open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=None, cooldown=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.cooldown = cooldown or CIRCUIT_COOLDOWN
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state_locked()
+
+    def _current_state_locked(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """是否放行本次调用；half-open 状态下同一时刻只放行一个试探请求"""
+        with self._lock:
+            state = self._current_state_locked()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"✅ 熔断器 {self.name} 恢复")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"⚠️ 熔断器 {self.name} 打开，{self.cooldown}s 内不再调用")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._current_state_locked(),
+                'failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown': self.cooldown
+            }
+
+
+class ConnectivityMonitor:
+    """
+    后台网络探测
+
+    依次请求 CONNECTIVITY_PROBE_URLS，任一成功即视为在线。
+    实际 API 调用的成功 / 网络错误也会即时更新状态。
+    """
+
+    def __init__(self, probe_urls=None, interval=None, timeout=None):
+        self.probe_urls = probe_urls or CONNECTIVITY_PROBE_URLS
+        self.interval = interval or CONNECTIVITY_PROBE_INTERVAL
+        self.timeout = timeout or CONNECTIVITY_PROBE_TIMEOUT
+
+        # 尚未探测时视为在线，由熔断器兜底
+        self._online = True
+        self._checked_at = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def is_online(self):
+        """O(1) 读取缓存的连通状态"""
+        return self._online
+
+    def probe(self):
+        """执行一次探测并更新状态"""
+        online = False
+        for url in self.probe_urls:
+            try:
+                requests.head(url, timeout=self.timeout)
+                online = True
+                break
+            except requests.RequestException:
+                continue
+        self._set_online(online)
+        return online
+
+    def report_success(self):
+        self._set_online(True)
+
+    def report_failure(self):
+        """API 调用出现网络错误时，立即重新探测而不必等到下一个周期"""
+        if self._thread is not None and self._thread.is_alive():
+            self._wake.set()
+
+    def _set_online(self, online):
+        if online != self._online:
+            print("🌐 网络已恢复" if online else "⚠️ 网络不可用，切换到离线模式")
+        self._online = online
+        self._checked_at = time.monotonic()
+
+    def start(self):
+        """启动后台探测线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='connectivity-prober', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"❌ 网络探测失败: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        checked_at = self._checked_at
+        return {
+            'online': self._online,
+            'last_probe_age': round(time.monotonic() - checked_at, 1) if checked_at is not None else None,
+            'probe_interval': self.interval
+        }
+
+
+# 全局实例
+connectivity = ConnectivityMonitor()
+coingecko_breaker = CircuitBreaker('coingecko')
@@ -0,0 +1,142 @@
+"""
+仪表板数据模块
+读取仪表板各面板（统计、预测、风险警报、历史数据、K线）的当前数据，供 /api/dashboard 与实时推送共用。
+
+同一次读取中，各面板需要的 API 数据（每个范围）只加载一次并共享；相互独立的面板在线程池中并行计算。
+各面板仍使用与对应单独接口相同的缓存 key 和有效期。
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import response_cache
+from api import BitcoinAPI
+from cache import cache_manager
+from config import DASHBOARD_CACHE_SECONDS
+from database import db_manager
+from series_store import series_store
+from services import (
+    min_historical_points,
+    load_historical_frame,
+    format_historical,
+    format_candlestick,
+    aggregate_candlestick,
+    compute_statistics,
+    compute_prediction,
+    compute_risk_alerts
+)
+from utils import calculate_technical_indicators
+
+
+PANELS = ('statistics', 'prediction', 'risk_alerts', 'historical', 'candlestick')
+
+# 面板计算线程池（预测需要训练模型，耗时最长，其余面板与之并行）
+_executor = ThreadPoolExecutor(max_workers=len(PANELS), thread_name_prefix='dashboard')
+
+
+class SharedFrames:
+    """一次面板读取中共享的数据：每个范围只在首次使用时加载一次（各面板不得修改）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}
+
+    def api(self, days):
+        """BitcoinAPI.fetch_historical_data(days) 的结果"""
+        with self._lock:
+            if days not in self._frames:
+                self._frames[days] = BitcoinAPI.fetch_historical_data(days)
+            return self._frames[days]
+
+
+def collect_panels():
+    """
+    读取仪表板各面板的当前数据
+
+    Returns:
+        dict: 面板名 -> 数据，读取失败的面板为 None
+    """
+    frames = SharedFrames()
+    loaders = {
+        'statistics': lambda: cache_manager.get_or_compute(
+            'statistics', lambda: compute_statistics(7, df=frames.api(7)),
+            max_age_seconds=600, stale_while_revalidate=True
+        ),
+        'prediction': lambda: cache_manager.get_or_compute(
+            'prediction', lambda: compute_prediction(frames.api(7)),
+            max_age_seconds=600, stale_while_revalidate=True
+        ),
+        'risk_alerts': _load_risk_alerts,
+        'historical': _load_historical,
+        'candlestick': lambda: _load_candlestick(frames),
+    }
+
+    futures = {name: _executor.submit(_load_panel, name, load) for name, load in loaders.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _load_panel(name, load):
+    try:
+        return load()
+    except Exception as e:
+        print(f"❌ 仪表板数据读取失败: {name}: {e}")
+        return None
+
+
+def _load_risk_alerts():
+    version = response_cache.data_version()
+    if version is None:
+        return cache_manager.get_or_compute(
+            'risk_alerts', compute_risk_alerts, max_age_seconds=300, stale_while_revalidate=True
+        ) or []
+    # 警报只依赖数据库数据，按数据版本缓存
+    return cache_manager.get_or_compute(
+        f'risk_alerts:{version}', compute_risk_alerts,
+        max_age_seconds=response_cache.RESPONSE_TTL, ttl=response_cache.RESPONSE_TTL
+    )
+
+
+def _load_historical():
+    df = series_store.frame(7, min_points=min_historical_points(7))
+    if df is None:
+        df = cache_manager.get_or_compute(
+            'historical_7d', lambda: load_historical_frame(7), max_age_seconds=3600, stale_while_revalidate=True
+        )
+    if df is None or df.empty:
+        return None
+    if 'ma_5' not in df.columns:
+        df = calculate_technical_indicators(df)
+    return format_historical(df)
+
+
+def _load_candlestick(frames):
+    bars = db_manager.get_ohlcv('1d', days=30)
+    if bars is None or bars.empty:
+        # 与 /api/candlestick 一致：汇总表为空时退回到原始数据按日聚合
+        df = frames.api(30)
+        if df is None or df.empty:
+            df = db_manager.get_historical_data(days=30)
+        if df is None or df.empty:
+            return None
+        bars = aggregate_candlestick(df)
+    return format_candlestick(bars)
+
+
+def load_dashboard():
+    """
+    仪表板合并数据，缓存 DASHBOARD_CACHE_SECONDS 秒（过期后先返回旧数据，由一个后台线程刷新），
+    同一时间段内的所有仪表板刷新共用一次面板读取
+
+    Returns:
+        dict: panels（面板名 -> 数据）与 version（内容摘要，内容不变时不变，用作 ETag 版本）
+    """
+    return cache_manager.get_or_compute(
+        'dashboard', _compute_dashboard, max_age_seconds=DASHBOARD_CACHE_SECONDS, stale_while_revalidate=True
+    )
+
+
+def _compute_dashboard():
+    panels = collect_panels()
+    digest = hashlib.sha1(json.dumps(panels, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    return {'panels': panels, 'version': digest}
@@ -1,186 +1,406 @@
 """
-数据库管理模块 - MySQL
+数据库管理模块 - MySQL / SQLite
 支持离线模式：无网络时使用历史数据
 """
-import pymysql
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pandas as pd
 import json
+from io import StringIO
 from datetime import datetime, timedelta
-import os
+import threading
+import time
+import numpy as np
+
+from config import (
+    DB_BATCH_SIZE, DB_TAIL_RELOAD_INTERVAL, DATA_RETENTION_DAYS, DB_PARTITION_PRECREATE_DAYS
+)
+from ohlcv import INTERVAL_SECONDS, ROLLUP_INTERVALS, aggregate_ohlcv, bucket_floor
+from storage import create_backend, rollup_table
+import serialization
+
+
+class PriceTailCache:
+    """
+    price_history 的进程内尾部缓存
+
+    按时间升序保存保留窗口内数据的列式副本（datetime64 / float64 数组），
+    追加写入预留容量之后的位置，因此已发出的视图不会被修改。
+    调用方需持有 lock。
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """清空缓存，下次读取时全量加载"""
+        self._timestamps = np.empty(0, dtype='datetime64[ns]')
+        self._prices = np.empty(0, dtype=float)
+        self._volumes = np.empty(0, dtype=float)
+        self._start = 0
+        self._end = 0
+        self.loaded_at = None
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def high_water_mark(self):
+        """缓存中最新一条数据的时间"""
+        if self.loaded_at is None or self._end == self._start:
+            return None
+        return self._timestamps[self._end - 1]
+
+    def load(self, timestamps, prices, volumes):
+        """全量替换缓存内容"""
+        self._timestamps = timestamps
+        self._prices = prices
+        self._volumes = volumes
+        self._start = 0
+        self._end = len(timestamps)
+        self.loaded_at = time.monotonic()
+
+    def append(self, timestamps, prices, volumes):
+        """追加比高水位更新的数据，容量不足时按倍数扩容"""
+        count = len(timestamps)
+        if self._end + count > len(self._timestamps):
+            live = self._end - self._start
+            capacity = max(2 * (live + count), 1024)
+            for name in ('_timestamps', '_prices', '_volumes'):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:live] = old[self._start:self._end]
+                setattr(self, name, new)
+            self._start, self._end = 0, live
+
+        self._timestamps[self._end:self._end + count] = timestamps
+        self._prices[self._end:self._end + count] = prices
+        self._volumes[self._end:self._end + count] = volumes
+        self._end += count
+
+    def replace_range(self, start_time, end_time, timestamps, prices, volumes):
+        """
+        用数据库中 [start_time, end_time] 的数据替换缓存中同一时间段的行（补数据 / 乱序写入后调用）
+
+        生成新的数组，已发出的视图不受影响。
+        """
+        live = slice(self._start, self._end)
+        live_timestamps = self._timestamps[live]
+        lower = int(np.searchsorted(live_timestamps, np.datetime64(start_time, 'ns'), side='left'))
+        upper = int(np.searchsorted(live_timestamps, np.datetime64(end_time, 'ns'), side='right'))
+        for name, values in (('_timestamps', timestamps), ('_prices', prices), ('_volumes', volumes)):
+            old = getattr(self, name)[live]
+            setattr(self, name, np.concatenate((old[:lower], values, old[upper:])))
+        self._start = 0
+        self._end = len(self._timestamps)
+
+    def trim(self, cutoff_time):
+        """丢弃早于 cutoff_time 的数据（只移动起始位置）"""
+        live = self._timestamps[self._start:self._end]
+        self._start += int(np.searchsorted(live, np.datetime64(cutoff_time, 'ns'), side='left'))
+
+    def view(self, start_time):
+        """返回 start_time 之后数据的只读数组视图"""
+        live = slice(self._start, self._end)
+        offset = int(np.searchsorted(self._timestamps[live], np.datetime64(start_time, 'ns'), side='left'))
+        views = []
+        for array in (self._timestamps, self._prices, self._volumes):
+            view = array[live][offset:]
+            view.flags.writeable = False
+            views.append(view)
+        return views
 
 
 class DatabaseManager:
-    """MySQL 数据库管理器"""
+    """数据库管理器（存储后端由 config.DB_BACKEND 决定）"""
     
-    def __init__(self):
-        """初始化数据库连接"""
-        # 数据库连接配置
-        self.db_config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'port': int(os.getenv('MYSQL_PORT', 3306)),
-            'user': os.getenv('MYSQL_USER', 'bitcoin_user'),
-            'password': os.getenv('MYSQL_PASSWORD', 'bitcoin123'),
-            'database': os.getenv('MYSQL_DATABASE', 'bitcoin_db'),
-            'charset': 'utf8mb4'
-        }
+    def __init__(self, backend=None):
+        """
+        初始化数据库连接
+        
+        Args:
+            backend: StorageBackend 实例，默认根据配置创建
+        """
+        self.backend = backend or create_backend()
         
         # 创建 SQLAlchemy 引擎
-        connection_string = (
-            f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}"
-            f"@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
-            f"?charset=utf8mb4"
-        )
-        self.engine = create_engine(connection_string, pool_pre_ping=True)
+        self.engine = self.backend.create_engine()
+
+        # price_history 的进程内尾部缓存
+        self._tail = PriceTailCache()
+
         self.init_database()
     
     def init_database(self):
         """创建数据库表"""
         try:
             with self.engine.connect() as conn:
-                # 历史价格数据表
-                conn.execute(text('''
-                    CREATE TABLE IF NOT EXISTS price_history (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        timestamp DATETIME NOT NULL UNIQUE,
-                        price DECIMAL(20, 8) NOT NULL,
-                        volume DECIMAL(20, 8) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        INDEX idx_timestamp (timestamp)
-                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-                '''))
-                
-                # 技术指标缓存表
-                conn.execute(text('''
-                    CREATE TABLE IF NOT EXISTS technical_cache (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        cache_key VARCHAR(255) UNIQUE NOT NULL,
-                        data LONGTEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                        INDEX idx_cache_key (cache_key)
-                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-                '''))
-                
+                for statement in self.backend.schema_statements():
+                    conn.execute(text(statement))
+                self.backend.upgrade_schema(conn)
                 conn.commit()
-            print(f"✅ MySQL 数据库初始化成功")
+            self.maintain_partitions()
+            self._ensure_ohlcv_rollups()
+            print(f"✅ {self.backend.label} 数据库初始化成功")
         except Exception as e:
             print(f"❌ 数据库初始化失败: {e}")
     
-    def save_historical_data(self, df):
-        """保存历史数据到数据库"""
+    def save_historical_data(self, df, batch_size=None):
+        """
+        批量保存历史数据到数据库
+
+        直接由 DataFrame 列构造参数，按 batch_size 分批执行 executemany
+        （MySQL 下 pymysql 会将其改写为多行 VALUES 的 INSERT），不再逐行插入。
+
+        Args:
+            df: 包含 datetime、price、volume 列的 DataFrame
+            batch_size: 每批写入的行数，默认使用 config.DB_BATCH_SIZE
+
+        Returns:
+            int: 尝试写入的记录数
+        """
         try:
-            # 准备数据
-            # 仅保存最近一年的数据到数据库，避免数据库无限膨胀
-            keep_days = 365
-            cutoff_time = datetime.now() - timedelta(days=keep_days)
+            batch_size = batch_size or DB_BATCH_SIZE
+
+            # 仅保存保留期内的数据到数据库，避免数据库无限膨胀
+            cutoff_time = datetime.now() - timedelta(days=DATA_RETENTION_DAYS)
             if 'datetime' in df.columns:
                 df = df[df['datetime'] >= cutoff_time]
 
-            records = []
-            for _, row in df.iterrows():
-                records.append({
-                    'timestamp': row['datetime'],
-                    'price': float(row['price']),
-                    'volume': float(row['volume'])
-                })
-            
-            if not records:
+            # 价格或交易量缺失的行无法写入 DECIMAL 列，直接跳过
+            df = df.dropna(subset=['datetime', 'price', 'volume'])
+            if df.empty:
                 return 0
-            
-            # 使用 INSERT IGNORE 避免重复键错误
-            from sqlalchemy import text
-            with self.engine.connect() as conn:
-                for record in records:
-                    try:
-                        conn.execute(text('''
-                            INSERT IGNORE INTO price_history (timestamp, price, volume)
-                            VALUES (:timestamp, :price, :volume)
-                        '''), record)
-                    except:
-                        # 忽略个别记录的错误
-                        pass
-                conn.commit()
-            
+
+            records = self._build_records(df)
+
+            # 使用 INSERT IGNORE / INSERT OR IGNORE 避免重复键错误
+            insert_sql = text(self.backend.insert_ignore_sql(
+                'price_history', ['timestamp', 'price', 'volume']
+            ))
+            with self.engine.begin() as conn:
+                for start in range(0, len(records), batch_size):
+                    conn.execute(insert_sql, records[start:start + batch_size])
+
+            # 增量维护 K 线汇总表：只重算本批数据落入的分桶
+            self.update_ohlcv_rollups(df['datetime'].min(), df['datetime'].max())
+
+            # 写入了不晚于高水位的数据（补数据/乱序）时，增量刷新无法覆盖：
+            # 重新读取受影响的时间段替换缓存中对应的行（晚于高水位的部分仍由增量刷新读取）
+            self._merge_into_tail(df['datetime'].min())
+
             count = len(records)
-            if count > 0:
-                print(f"✅ 尝试保存 {count} 条历史数据到 MySQL")
-                # 保存完成后，确保数据库只保留最近一年的数据
-                try:
-                    self.clean_old_data(keep_days=keep_days)
-                except Exception:
-                    pass
+            print(f"✅ 尝试保存 {count} 条历史数据到 {self.backend.label}")
+            # 过期数据清理不在写入路径上执行，由定时任务调用 apply_retention
             return count
         except Exception as e:
             print(f"❌ 保存历史数据失败: {e}")
             return 0
+
+    def _merge_into_tail(self, earliest):
+        with self._tail.lock:
+            high_water_mark = self._tail.high_water_mark
+            if high_water_mark is None or earliest > high_water_mark:
+                return
+            # 数据库中的时间只保留到秒
+            start = pd.Timestamp(earliest).floor('s').to_pydatetime()
+            end = pd.Timestamp(high_water_mark).to_pydatetime()
+            try:
+                rows = self._query_price_history('timestamp >= :start AND timestamp <= :end', start=start, end=end)
+            except Exception as e:
+                print(f"⚠️ 尾部缓存局部刷新失败，下次读取全量重载: {e}")
+                self._tail.reset()
+                return
+            self._tail.replace_range(start, end, *rows)
+
+    @staticmethod
+    def _build_records(df):
+        """将 DataFrame 列整体转换为 executemany 所需的参数列表"""
+        timestamps = pd.DatetimeIndex(df['datetime']).to_pydatetime().tolist()
+        prices = df['price'].astype(float).tolist()
+        volumes = df['volume'].astype(float).tolist()
+        return [
+            {'timestamp': ts, 'price': price, 'volume': volume}
+            for ts, price, volume in zip(timestamps, prices, volumes)
+        ]
     
-    def get_historical_data(self, days=7, max_keep_days=365):
-        """从数据库获取历史数据"""
+    def get_historical_data(self, days=7, max_keep_days=None):
+        """
+        从数据库获取历史数据
+
+        读取经过进程内尾部缓存：每次只增量拉取高水位之后的新数据，
+        返回的 DataFrame 列是缓存数组的只读视图（零拷贝）。
+        """
         try:
             # 限制从数据库返回的数据天数，数据库仅保留最近 max_keep_days 天
+            max_keep_days = max_keep_days or DATA_RETENTION_DAYS
             if days > max_keep_days:
                 print(f"⚠️ 请求 {days} 天，数据库仅保留最近 {max_keep_days} 天，返回最近 {max_keep_days} 天的数据")
                 days = max_keep_days
 
             # 计算时间范围
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=days)
-            
-            # 查询数据 - 使用 text() 来处理参数绑定
+            start_time = datetime.now() - timedelta(days=days)
+
+            with self._tail.lock:
+                self._refresh_tail(max_keep_days)
+                timestamps, prices, volumes = self._tail.view(start_time)
+
+            if len(timestamps) == 0:
+                print(f"⚠️ 数据库中没有 {days} 天的数据")
+                return None
+
             # 升序排列，从旧到新，与API返回的顺序一致
-            from sqlalchemy import text
-            query = text('''
-                SELECT timestamp, price, volume
-                FROM price_history
-                WHERE timestamp >= :start_time
-                ORDER BY timestamp ASC
-            ''')
+            df = pd.DataFrame({
+                'timestamp': timestamps,
+                'price': prices,
+                'volume': volumes,
+                'datetime': timestamps
+            }, copy=False)
+
+            print(f"✅ 从 {self.backend.label} 读取了 {len(df)} 条历史数据（尾部缓存 {len(self._tail)} 条）")
+            return df
             
+        except Exception as e:
+            print(f"❌ 读取历史数据失败: {e}")
+            return None
+
+    def _refresh_tail(self, keep_days):
+        """刷新尾部缓存：首次或超过 DB_TAIL_RELOAD_INTERVAL 时全量加载，否则只拉取新数据"""
+        cutoff_time = datetime.now() - timedelta(days=keep_days)
+        loaded_at = self._tail.loaded_at
+        # 缓存为空（如表中尚无数据）时没有高水位，同样全量加载
+        if (loaded_at is None or self._tail.high_water_mark is None
+                or time.monotonic() - loaded_at > DB_TAIL_RELOAD_INTERVAL):
+            self._tail.load(*self._query_price_history('timestamp >= :since', since=cutoff_time))
+        else:
+            since = pd.Timestamp(self._tail.high_water_mark).to_pydatetime()
+            timestamps, prices, volumes = self._query_price_history('timestamp > :since', since=since)
+            if len(timestamps) > 0:
+                self._tail.append(timestamps, prices, volumes)
+        self._tail.trim(cutoff_time)
+
+    def _query_price_history(self, condition, **params):
+        """按条件查询 price_history，返回按时间升序的 (datetime64, price, volume) 数组"""
+        # 查询数据 - 使用 text() 来处理参数绑定
+        query = text(f'''
+            SELECT timestamp, price, volume
+            FROM price_history
+            WHERE {condition}
+            ORDER BY timestamp ASC
+        ''')
+        df = pd.read_sql_query(query, self.engine, params=params)
+
+        # 转换数据类型（DECIMAL -> float，SQLite 文本时间 -> datetime64）
+        timestamps = pd.to_datetime(df['timestamp'], format='ISO8601').to_numpy(dtype='datetime64[ns]')
+        prices = df['price'].to_numpy(dtype=float)
+        volumes = df['volume'].to_numpy(dtype=float)
+        return timestamps, prices, volumes
+    
+    def update_ohlcv_rollups(self, start_time, end_time):
+        """
+        重新聚合 [start_time, end_time] 所落入分桶的 K 线并写入汇总表
+
+        定时任务和实时数据只会落入最新（未收盘）的分桶，已收盘的分桶不再改写；
+        只有补写历史数据时才会重算对应的旧分桶。
+        """
+        try:
+            widest = ROLLUP_INTERVALS[-1]
+            since = bucket_floor([start_time], widest)[0]
+            until = bucket_floor([end_time], widest)[0] + np.timedelta64(INTERVAL_SECONDS[widest], 's')
+            timestamps, prices, volumes = self._query_price_history(
+                'timestamp >= :since AND timestamp < :until',
+                since=pd.Timestamp(since).to_pydatetime(),
+                until=pd.Timestamp(until).to_pydatetime()
+            )
+
+            with self.engine.begin() as conn:
+                for interval in ROLLUP_INTERVALS:
+                    # 较细周期只重算 start_time 所在分桶及之后的数据
+                    offset = np.searchsorted(timestamps, bucket_floor([start_time], interval)[0])
+                    bars = aggregate_ohlcv(
+                        timestamps[offset:], prices[offset:], volumes[offset:], interval
+                    )
+                    if len(bars['bucket_start']) == 0:
+                        continue
+                    records = [
+                        {
+                            'bucket_start': bucket_start, 'open': o, 'high': h, 'low': l,
+                            'close': c, 'volume': v, 'point_count': n, 'updated_at': datetime.now()
+                        }
+                        for bucket_start, o, h, l, c, v, n in zip(
+                            pd.DatetimeIndex(bars['bucket_start']).to_pydatetime().tolist(),
+                            bars['open'].tolist(), bars['high'].tolist(), bars['low'].tolist(),
+                            bars['close'].tolist(), bars['volume'].tolist(), bars['count'].tolist()
+                        )
+                    ]
+                    conn.execute(text(self.backend.replace_sql(
+                        rollup_table(interval),
+                        ['bucket_start', 'open', 'high', 'low', 'close', 'volume', 'point_count', 'updated_at']
+                    )), records)
+        except Exception as e:
+            print(f"❌ 更新 K 线汇总表失败: {e}")
+
+    def get_ohlcv(self, interval='1d', days=30):
+        """
+        从 K 线汇总表读取最近 days 天的 K 线
+
+        Returns:
+            DataFrame: datetime / open / high / low / close / volume，无数据时返回 None
+        """
+        try:
+            since = bucket_floor([datetime.now() - timedelta(days=days)], interval)[0]
             df = pd.read_sql_query(
-                query,
+                text(f'''
+                    SELECT bucket_start, open, high, low, close, volume
+                    FROM {rollup_table(interval)}
+                    WHERE bucket_start >= :since
+                    ORDER BY bucket_start ASC
+                '''),
                 self.engine,
-                params={'start_time': start_time}
+                params={'since': pd.Timestamp(since).to_pydatetime()}
             )
-            
             if df.empty:
-                print(f"⚠️ 数据库中没有 {days} 天的数据")
                 return None
-            
-            # 转换数据类型
-            df['datetime'] = pd.to_datetime(df['timestamp'])
-            df['price'] = df['price'].astype(float)
-            df['volume'] = df['volume'].astype(float)
-            
-            print(f"✅ 从 MySQL 读取了 {len(df)} 条历史数据")
+
+            df['datetime'] = pd.to_datetime(df.pop('bucket_start'), format='ISO8601')
+            for col in ['open', 'high', 'low', 'close', 'volume']:
+                df[col] = df[col].astype(float)
             return df
-            
         except Exception as e:
-            print(f"❌ 读取历史数据失败: {e}")
+            print(f"❌ 读取 K 线汇总数据失败: {e}")
             return None
-    
+
+    def _ensure_ohlcv_rollups(self):
+        """K 线汇总表为空而原始数据存在时（升级后首次启动），全量构建一次"""
+        with self.engine.connect() as conn:
+            has_bars = conn.execute(text(
+                f'SELECT COUNT(*) FROM {rollup_table(ROLLUP_INTERVALS[-1])}'
+            )).fetchone()[0]
+            first, last = conn.execute(text(
+                'SELECT MIN(timestamp), MAX(timestamp) FROM price_history'
+            )).fetchone()
+        if has_bars == 0 and first is not None:
+            self.update_ohlcv_rollups(pd.Timestamp(first), pd.Timestamp(last))
+            print("✅ 已根据历史数据构建 K 线汇总表")
+
     def save_cache(self, cache_key, data):
-        """保存计算结果到数据库（JSON格式）"""
+        """保存计算结果到数据库（带版本头的压缩二进制格式，见 serialization.py）"""
         try:
             # 序列化数据
-            if isinstance(data, pd.DataFrame):
-                json_data = data.to_json(orient='split', date_format='iso')
-            else:
-                json_data = json.dumps(data, default=str)
+            blob = serialization.encode(data)
             
             # 使用 REPLACE INTO 插入或更新
             with self.engine.connect() as conn:
-                conn.execute(text('''
-                    REPLACE INTO technical_cache (cache_key, data, updated_at)
-                    VALUES (:cache_key, :data, :updated_at)
-                '''), {
+                conn.execute(text(self.backend.replace_sql(
+                    'technical_cache', ['cache_key', 'data', 'updated_at']
+                )), {
                     'cache_key': cache_key,
-                    'data': json_data,
+                    'data': blob,
                     'updated_at': datetime.now()
                 })
                 conn.commit()
             
-            print(f"✅ 缓存已保存到 MySQL: {cache_key}")
+            print(f"✅ 缓存已保存到 {self.backend.label}: {cache_key}")
             return True
         except Exception as e:
             print(f"❌ 保存缓存失败: {e}")
@@ -202,7 +422,9 @@ class DatabaseManager:
             if not row:
                 return None
             
-            data_json, updated_at = row
+            raw_data, updated_at = row
+            # SQLite 以文本形式返回时间
+            updated_at = pd.Timestamp(updated_at).to_pydatetime()
             
             # 检查是否过期
             age_hours = (datetime.now() - updated_at).total_seconds() / 3600
@@ -212,15 +434,23 @@ class DatabaseManager:
                 return None
             
             # 反序列化
+            if serialization.is_binary_payload(raw_data):
+                data = serialization.decode(raw_data)
+                print(f"✅ 从 {self.backend.label} 读取缓存: {cache_key}")
+                return data
+            
+            # 兼容旧版本写入的 JSON 文本
+            if isinstance(raw_data, (bytes, bytearray)):
+                raw_data = raw_data.decode('utf-8')
             try:
-                data = json.loads(data_json)
+                data = json.loads(raw_data)
                 # 如果是DataFrame格式，转换回来
                 if isinstance(data, dict) and 'columns' in data:
-                    data = pd.read_json(data_json, orient='split')
-                print(f"✅ 从 MySQL 读取缓存: {cache_key}")
+                    data = pd.read_json(StringIO(raw_data), orient='split')
+                print(f"✅ 从 {self.backend.label} 读取缓存: {cache_key}")
                 return data
             except:
-                return data_json
+                return raw_data
                 
         except Exception as e:
             print(f"❌ 读取缓存失败: {e}")
@@ -237,7 +467,8 @@ class DatabaseManager:
                 row = result.fetchone()
             
             if row and row[0]:
-                return row[0]
+                # SQLite 以文本形式返回时间，统一转换为 datetime
+                return pd.Timestamp(row[0]).to_pydatetime()
             return None
         except Exception as e:
             print(f"❌ 获取最新数据时间失败: {e}")
@@ -254,9 +485,10 @@ class DatabaseManager:
             print(f"❌ 获取数据量失败: {e}")
             return 0
     
-    def clean_old_data(self, keep_days=365):
-        """清理旧数据（保留最近N天）"""
+    def clean_old_data(self, keep_days=None):
+        """清理旧数据（保留最近N天），逐行 DELETE，分区表上只会删到边界分区内的少量数据"""
         try:
+            keep_days = keep_days or DATA_RETENTION_DAYS
             cutoff_time = datetime.now() - timedelta(days=keep_days)
             
             with self.engine.connect() as conn:
@@ -266,7 +498,17 @@ class DatabaseManager:
                 '''), {'cutoff_time': cutoff_time})
                 
                 deleted = result.rowcount
+
+                # 同步清理已完全过期的 K 线分桶
+                for interval in ROLLUP_INTERVALS:
+                    conn.execute(text(f'''
+                        DELETE FROM {rollup_table(interval)}
+                        WHERE bucket_start < :cutoff_bucket
+                    '''), {'cutoff_bucket': pd.Timestamp(bucket_floor([cutoff_time], interval)[0]).to_pydatetime()})
                 conn.commit()
+
+            with self._tail.lock:
+                self._tail.trim(cutoff_time)
             
             if deleted > 0:
                 print(f"✅ 清理了 {deleted} 条过期数据（保留 {keep_days} 天）")
@@ -276,5 +518,56 @@ class DatabaseManager:
             return 0
 
 
+    def maintain_partitions(self, keep_days=None):
+        """为 price_history 预建从保留期起点到未来 DB_PARTITION_PRECREATE_DAYS 天的日分区"""
+        try:
+            keep_days = keep_days or DATA_RETENTION_DAYS
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            with self.engine.begin() as conn:
+                self.backend.ensure_partitions(
+                    conn, 'price_history',
+                    today - timedelta(days=keep_days),
+                    today + timedelta(days=DB_PARTITION_PRECREATE_DAYS)
+                )
+        except Exception as e:
+            print(f"❌ 维护分区失败: {e}")
+
+    def apply_retention(self, keep_days=None):
+        """
+        执行数据保留策略（由定时任务调用，不在写入路径上）
+
+        支持分区的后端先整分区删除完全过期的日分区（O(1)），
+        再用 DELETE 清理边界分区中剩余的少量过期数据；
+        不支持分区的后端（SQLite）与迁移失败、仍未分区的旧表直接走 DELETE（后者输出警告）。
+
+        Returns:
+            int: DELETE 删除的记录数（整分区删除的数据不计入）
+        """
+        keep_days = keep_days or DATA_RETENTION_DAYS
+        cutoff_time = datetime.now() - timedelta(days=keep_days)
+
+        self.maintain_partitions(keep_days=keep_days)
+        try:
+            with self.engine.begin() as conn:
+                partitions = self.backend.list_partitions(conn, 'price_history')
+                if partitions is None and self.backend.supports_partitions:
+                    print(
+                        f"⚠️ price_history 未分区，{self.backend.label} 的过期数据只能逐行 DELETE 清理；"
+                        "重启应用时会再次尝试迁移为按天分区"
+                    )
+                if partitions is not None:
+                    expired = [
+                        name for name, upper in partitions
+                        if upper is not None and upper <= cutoff_time
+                    ]
+                    self.backend.drop_partitions(conn, 'price_history', expired)
+                    if expired:
+                        print(f"✅ 删除了 {len(expired)} 个过期分区（保留 {keep_days} 天）")
+        except Exception as e:
+            print(f"❌ 删除过期分区失败: {e}")
+
+        return self.clean_old_data(keep_days=keep_days)
+
+
 # 创建全局数据库管理器实例
 db_manager = DatabaseManager()
@@ -0,0 +1,103 @@
+"""
+序列降采样模块
+长范围图表请求在服务端按形状保留的方式减少数据点：
+价格等折线使用 LTTB（Largest-Triangle-Three-Buckets），交易量、波动率等使用每个分桶的最小 / 最大值。
+所有序列共用一组时间轴，因此各算法选出的是原始数据的行号，最终取它们的并集。
+"""
+import numpy as np
+
+
+def bucket_edges(n, buckets):
+    """
+    将 [1, n-1) 均分为 buckets 个分桶（首尾两个点单独保留）
+
+    Returns:
+        np.ndarray: 长度为 buckets + 1 的分桶边界
+    """
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x, y, edges):
+    """
+    LTTB 降采样：每个分桶选出与上一个选中点、下一个分桶均值点构成三角形面积最大的点
+
+    Args:
+        x: 横坐标（如纪元秒），按升序排列
+        y: 纵坐标
+        edges: bucket_edges 返回的分桶边界
+
+    Returns:
+        np.ndarray: 选中点的行号（含首尾两个点）
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    starts, ends = edges[:-1], edges[1:]
+
+    # 每个分桶的"下一个分桶"均值点；最后一个分桶的下一个点为最后一个数据点
+    counts = ends - starts
+    next_x = np.append(np.add.reduceat(x[:n - 1], starts[1:]) / counts[1:], x[-1]) if len(starts) > 1 else x[-1:]
+    next_y = np.append(np.add.reduceat(y[:n - 1], starts[1:]) / counts[1:], y[-1]) if len(starts) > 1 else y[-1:]
+
+    selected = np.empty(len(starts) + 2, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    # 选中点依赖上一个分桶的结果，分桶之间只能依次计算；分桶内部为向量运算
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        ax, ay = x[anchor], y[anchor]
+        area = np.abs((ax - next_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[i] - ay))
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+    return selected
+
+
+def minmax_indices(values, edges):
+    """
+    每个分桶的最小值与最大值所在的行号
+
+    Args:
+        values: 数值序列
+        edges: bucket_edges 返回的分桶边界
+
+    Returns:
+        np.ndarray: 行号（含首尾两个点，可能重复）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    starts, ends = edges[:-1], edges[1:]
+
+    rows = np.arange(1, n - 1)
+    bucket = np.searchsorted(ends, rows, side='right')
+    # 按 (分桶, 数值) 排序后，每个分桶的第一个 / 最后一个即为最小 / 最大值
+    order = np.lexsort((values[1:n - 1], bucket)) + 1
+    lows = order[starts - 1]
+    highs = order[ends - 2]
+    return np.concatenate(([0], lows, highs, [n - 1]))
+
+
+def downsample_indices(x, lines, envelopes, max_points):
+    """
+    多条序列共用时间轴时的降采样行号
+
+    Args:
+        x: 横坐标
+        lines: 使用 LTTB 的序列（通常只传主序列，如价格）
+        envelopes: 使用最小 / 最大值的序列
+        max_points: 最多返回的点数
+
+    Returns:
+        np.ndarray: 升序、去重的行号；数据点不超过 max_points 时返回全部行号
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    # 每个分桶最多贡献 len(lines) + 2 * len(envelopes) 个点
+    per_bucket = max(len(lines) + 2 * len(envelopes), 1)
+    buckets = max(min((max_points - 2) // per_bucket, n - 2), 1)
+    edges = bucket_edges(n, buckets)
+
+    selected = [np.array([0, n - 1])]
+    selected += [lttb_indices(x, values, edges) for values in lines]
+    selected += [minmax_indices(values, edges) for values in envelopes]
+    return np.unique(np.concatenate(selected))
@@ -0,0 +1,171 @@
+"""
+上游 HTTP 客户端模块
+共享连接池（keep-alive）的 requests.Session，按接口设置超时，
+对网络错误 / 429 / 5xx 做带抖动的指数退避重试（遵循 Retry-After），并记录每次调用的延迟
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    COINGECKO_BASE_URL, UPSTREAM_POOL_SIZE, UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX, UPSTREAM_TIMEOUTS
+)
+
+
+# 需要重试的 HTTP 状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 默认超时（秒），未在 UPSTREAM_TIMEOUTS 中配置的接口使用
+DEFAULT_TIMEOUT = 10
+
+# 每个接口保留最近多少次调用的延迟用于计算分位数
+LATENCY_WINDOW = 200
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒数或 HTTP 日期），返回不小于 0 的有限秒数；无法解析（含 nan / inf）时返回 None"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    if not math.isfinite(seconds):
+        return None
+    return max(seconds, 0.0)
+
+
+class EndpointMetrics:
+    """单个接口的调用统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self):
+        latencies = np.array(self.latencies) if self.latencies else None
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies is not None else None,
+            'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies is not None else None,
+            'max_ms': round(float(latencies.max()) * 1000, 1) if latencies is not None else None
+        }
+
+
+class UpstreamClient:
+    """
+    上游 API 客户端
+
+    Args:
+        base_url: 接口根地址
+        pool_size: 连接池大小（同一主机的最大复用连接数）
+        max_retries: 最多重试次数（不含第一次请求）
+        backoff_base / backoff_max: 指数退避的基数与上限（秒），实际等待为 [0, min(上限, 基数 * 2^n)] 内的随机值
+        timeouts: {接口路径: 超时秒数}
+    """
+
+    def __init__(self, base_url=None, pool_size=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, timeouts=None):
+        self.base_url = (base_url or COINGECKO_BASE_URL).rstrip('/')
+        self.max_retries = UPSTREAM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or UPSTREAM_BACKOFF_BASE
+        self.backoff_max = backoff_max or UPSTREAM_BACKOFF_MAX
+        self.timeouts = timeouts or UPSTREAM_TIMEOUTS
+
+        pool_size = pool_size or UPSTREAM_POOL_SIZE
+        # 重试由本类处理，适配器自身不重试
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def get(self, endpoint, params=None, timeout=None):
+        """
+        GET 请求，网络错误 / 429 / 5xx 时按退避策略重试
+
+        Args:
+            endpoint: 接口路径，如 '/simple/price'
+            params: 查询参数
+            timeout: 超时秒数，默认按 timeouts 配置
+
+        Returns:
+            requests.Response: 最后一次请求的响应（可能仍为 429 / 5xx）
+
+        Raises:
+            requests.RequestException: 重试用尽后仍出现网络错误
+        """
+        url = f'{self.base_url}{endpoint}'
+        timeout = timeout or self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except requests.RequestException:
+                self._record(endpoint, time.perf_counter() - start, error=True, retried=attempt > 0)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                failed = response.status_code in RETRY_STATUS
+                self._record(endpoint, time.perf_counter() - start, error=failed, retried=attempt > 0)
+                if not failed or attempt >= self.max_retries:
+                    return response
+
+                delay = self._backoff(attempt)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    if retry_after > self.backoff_max:
+                        # 等待时间超出预算，直接返回由调用方降级
+                        print(f"⚠️ {endpoint} 要求 {retry_after:.0f}s 后重试，超出退避上限，放弃重试")
+                        return response
+                    delay = retry_after
+
+            attempt += 1
+            print(f"🔁 {endpoint} 第 {attempt} 次重试，等待 {delay:.2f}s")
+            time.sleep(delay)
+
+    def _backoff(self, attempt):
+        """full jitter 指数退避"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, endpoint, latency, error, retried):
+        with self._metrics_lock:
+            metrics = self._metrics.get(endpoint)
+            if metrics is None:
+                metrics = self._metrics[endpoint] = EndpointMetrics()
+            metrics.calls += 1
+            metrics.errors += int(error)
+            metrics.retries += int(retried)
+            metrics.latencies.append(latency)
+
+    def stats(self):
+        """各接口的调用次数、错误、重试与延迟分位数"""
+        with self._metrics_lock:
+            return {
+                'base_url': self.base_url,
+                'endpoints': {endpoint: metrics.to_dict() for endpoint, metrics in self._metrics.items()}
+            }
+
+
+# 全局 CoinGecko 客户端
+coingecko_client = UpstreamClient()
@@ -0,0 +1,369 @@
+"""
+增量技术指标模块
+与 utils.calculate_technical_indicators 相同的指标（窗口数据至少 26 个点时），
+新数据点到达时每个指标以 O(1) 更新：
+
+- MA / 布林带 / 波动率：固定窗口内的累计和与平方和
+- EMA / MACD：pandas ewm(adjust=True) 的递推形式 num / den
+- RSI：涨幅 / 跌幅的滑动窗口均值
+
+状态可导出为 JSON（to_state / from_state），重启后继续增量计算；
+窗口起点后移时由 rebase_frame 修正已有结果与引擎状态。
+
+另有按依赖关系声明的指标注册表（INDICATOR_REGISTRY / compute_columns），
+按请求的字段只计算需要的指标列。
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+# 窗口长度（与 utils.calculate_technical_indicators 一致）
+MA_WINDOWS = (5, 10, 20)
+EMA_SPANS = (12, 26)
+MACD_SIGNAL_SPAN = 9
+RSI_WINDOW = 14
+BB_WINDOW = 20
+VOLATILITY_WINDOW = 24
+
+# 增量计算结果与全量计算结果一致所需的最少数据点（全量计算在更短时会缩小窗口）
+MIN_POINTS = 26
+
+# 依赖窗口内全部数据的指标（EMA 从窗口第一个点开始加权）
+EXPONENTIAL_COLUMNS = ['ema_12', 'ema_26', 'macd', 'macd_signal']
+
+# 滑动窗口类指标只有窗口开头的这些数据点与窗口起点有关（窗口未满时的填充值、RSI 首个涨跌幅）
+WARMUP_POINTS = max(MA_WINDOWS + (BB_WINDOW, VOLATILITY_WINDOW, RSI_WINDOW + 1))
+
+INDICATOR_COLUMNS = [
+    'ma_5', 'ma_10', 'ma_20', 'ema_12', 'ema_26', 'macd', 'macd_signal',
+    'rsi', 'bb_middle', 'bb_upper', 'bb_lower', 'volatility'
+]
+
+class RollingWindow:
+    """
+    固定长度窗口的均值与样本标准差（ddof=1），窗口未满时返回 NaN
+
+    累计和与平方和基于窗口内某个值（shift）的偏移量计算，避免价格量级较大时
+    平方和相减的精度损失；每推入 size 个值按窗口内容重新求和并更新 shift，
+    累计误差不随数据量增长，均摊后仍为 O(1)。
+    """
+
+    __slots__ = ('size', 'values', 'shift', 'total', 'total_sq', 'pushes')
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(values, maxlen=size)
+        self.pushes = 0
+        self._resum()
+
+    def _resum(self):
+        self.shift = self.values[-1] if self.values else 0.0
+        self.total = math.fsum(value - self.shift for value in self.values)
+        self.total_sq = math.fsum((value - self.shift) ** 2 for value in self.values)
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0] - self.shift
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        value -= self.shift
+        self.total += value
+        self.total_sq += value * value
+
+        self.pushes += 1
+        if self.pushes % self.size == 0:
+            self._resum()
+
+    def mean(self):
+        if len(self.values) < self.size:
+            return math.nan
+        return self.shift + self.total / self.size
+
+    def std(self):
+        if len(self.values) < self.size:
+            return math.nan
+        n = self.size
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+class ExponentialMean:
+    """pandas ewm(span, adjust=True).mean() 的递推形式：num_t = x_t + (1-α)·num_{t-1}，den 同理"""
+
+    __slots__ = ('decay', 'num', 'den')
+
+    def __init__(self, span, num=0.0, den=0.0):
+        self.decay = 1 - 2.0 / (span + 1)
+        self.num = num
+        self.den = den
+
+    def update(self, value):
+        self.num = value + self.decay * self.num
+        self.den = 1.0 + self.decay * self.den
+        return self.num / self.den
+
+    @classmethod
+    def from_last(cls, span, last_value, count):
+        """由 count 个数据点后的 EMA 值恢复状态（den 为等比数列求和）"""
+        ema = cls(span)
+        ema.den = (1 - ema.decay ** count) / (1 - ema.decay)
+        ema.num = last_value * ema.den
+        return ema
+
+
+class IndicatorEngine:
+    """按时间顺序逐点更新的技术指标引擎"""
+
+    def __init__(self):
+        self.ma = {window: RollingWindow(window) for window in MA_WINDOWS}
+        self.ema = {span: ExponentialMean(span) for span in EMA_SPANS}
+        self.macd_signal = ExponentialMean(MACD_SIGNAL_SPAN)
+        self.gains = RollingWindow(RSI_WINDOW)
+        self.losses = RollingWindow(RSI_WINDOW)
+        self.volatility = RollingWindow(VOLATILITY_WINDOW)
+        self.last_price = None
+        self.last_timestamp = None
+        self.count = 0
+
+    def update(self, price, timestamp=None):
+        """
+        追加一个价格点，返回该点的各指标值（窗口未满的指标为 NaN）
+
+        Returns:
+            dict: INDICATOR_COLUMNS -> float
+        """
+        price = float(price)
+        for window in self.ma.values():
+            window.push(price)
+        self.volatility.push(price)
+
+        ema_12 = self.ema[12].update(price)
+        ema_26 = self.ema[26].update(price)
+        macd = ema_12 - ema_26
+        signal = self.macd_signal.update(macd)
+
+        # 与全量计算一致：第一个点的涨跌幅记为 0
+        change = price - self.last_price if self.last_price is not None else 0.0
+        self.gains.push(change if change > 0 else 0.0)
+        self.losses.push(-change if change < 0 else 0.0)
+        gain, loss = self.gains.mean(), self.losses.mean()
+        rsi = 100 - (100 / (1 + gain / (loss + 1e-10)))
+
+        self.last_price = price
+        self.last_timestamp = timestamp if timestamp is not None else self.last_timestamp
+        self.count += 1
+
+        bb_middle = self.ma[BB_WINDOW].mean()
+        bb_std = self.ma[BB_WINDOW].std()
+        return {
+            'ma_5': self.ma[5].mean(),
+            'ma_10': self.ma[10].mean(),
+            'ma_20': self.ma[20].mean(),
+            'ema_12': ema_12,
+            'ema_26': ema_26,
+            'macd': macd,
+            'macd_signal': signal,
+            'rsi': rsi,
+            'bb_middle': bb_middle,
+            'bb_upper': bb_middle + bb_std * 2,
+            'bb_lower': bb_middle - bb_std * 2,
+            'volatility': self.volatility.std()
+        }
+
+    def update_many(self, prices, timestamps=None):
+        """
+        依次追加多个价格点
+
+        Returns:
+            DataFrame: 每个点一行，列为 INDICATOR_COLUMNS
+        """
+        prices = np.asarray(prices, dtype=float)
+        rows = []
+        for i, price in enumerate(prices):
+            rows.append(self.update(price, timestamps[i] if timestamps is not None else None))
+        return pd.DataFrame(rows, columns=INDICATOR_COLUMNS, dtype=float)
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        由 calculate_technical_indicators 的结果恢复引擎状态（只读取末尾窗口内的数据）
+
+        Args:
+            df: 含 price、ema_12、ema_26、macd_signal 列，按时间升序，至少 MIN_POINTS 行
+        """
+        if len(df) < MIN_POINTS:
+            raise ValueError(f"At least {MIN_POINTS} rows are required, got {len(df)}")
+
+        engine = cls()
+        prices = df['price'].to_numpy(dtype=float)
+        count = len(prices)
+        for window in MA_WINDOWS:
+            engine.ma[window] = RollingWindow(window, prices[-window:].tolist())
+        engine.volatility = RollingWindow(VOLATILITY_WINDOW, prices[-VOLATILITY_WINDOW:].tolist())
+
+        changes = np.diff(prices[-(RSI_WINDOW + 1):])
+        engine.gains = RollingWindow(RSI_WINDOW, np.where(changes > 0, changes, 0.0).tolist())
+        engine.losses = RollingWindow(RSI_WINDOW, np.where(changes < 0, -changes, 0.0).tolist())
+
+        for span in EMA_SPANS:
+            engine.ema[span] = ExponentialMean.from_last(span, float(df[f'ema_{span}'].iloc[-1]), count)
+        engine.macd_signal = ExponentialMean.from_last(
+            MACD_SIGNAL_SPAN, float(df['macd_signal'].iloc[-1]), count
+        )
+
+        engine.last_price = float(prices[-1])
+        if 'datetime' in df.columns:
+            engine.last_timestamp = pd.Timestamp(df['datetime'].iloc[-1])
+        engine.count = count
+        return engine
+
+    def to_state(self):
+        """导出为可 JSON 序列化的状态"""
+        return {
+            'ma': {str(window): list(rolling.values) for window, rolling in self.ma.items()},
+            'ema': {str(span): [ema.num, ema.den] for span, ema in self.ema.items()},
+            'macd_signal': [self.macd_signal.num, self.macd_signal.den],
+            'gains': list(self.gains.values),
+            'losses': list(self.losses.values),
+            'volatility': list(self.volatility.values),
+            'last_price': self.last_price,
+            'last_timestamp': pd.Timestamp(self.last_timestamp).isoformat() if self.last_timestamp is not None else None,
+            'count': self.count
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """由 to_state 导出的状态恢复引擎"""
+        engine = cls()
+        engine.ma = {int(window): RollingWindow(int(window), values) for window, values in state['ma'].items()}
+        engine.ema = {int(span): ExponentialMean(int(span), *pair) for span, pair in state['ema'].items()}
+        engine.macd_signal = ExponentialMean(MACD_SIGNAL_SPAN, *state['macd_signal'])
+        engine.gains = RollingWindow(RSI_WINDOW, state['gains'])
+        engine.losses = RollingWindow(RSI_WINDOW, state['losses'])
+        engine.volatility = RollingWindow(VOLATILITY_WINDOW, state['volatility'])
+        engine.last_price = state['last_price']
+        engine.last_timestamp = pd.Timestamp(state['last_timestamp']) if state['last_timestamp'] else None
+        engine.count = state['count']
+        return engine
+
+
+def rebase_frame(df, engine):
+    """
+    窗口起点后移（开头的数据点被移出）后，使剩余的指标帧与对其全量计算的结果一致，
+    并同步引擎的 EMA / MACD 状态；滑动窗口类指标的状态与窗口起点无关，不需要修改
+
+    EMA / MACD 整列重新计算（向量化），滑动窗口类指标只重新计算开头 WARMUP_POINTS 个点。
+
+    Args:
+        df: 移出开头数据点后的指标帧，按时间升序，至少 MIN_POINTS 行
+        engine: 与 df 末尾对应的 IndicatorEngine
+
+    Returns:
+        DataFrame: 修正后的指标帧（新对象）
+    """
+    if len(df) < MIN_POINTS:
+        raise ValueError(f"At least {MIN_POINTS} rows are required, got {len(df)}")
+
+    df = df.reset_index(drop=True)
+    prices = df['price'].to_numpy(dtype=float)
+    columns = compute_columns(EXPONENTIAL_COLUMNS, {'price': prices})
+    rolling = [name for name in INDICATOR_COLUMNS if name not in EXPONENTIAL_COLUMNS]
+    head = compute_columns(rolling, {'price': prices[:WARMUP_POINTS]})
+    for name in rolling:
+        values = df[name].to_numpy(dtype=float, copy=True)
+        values[:WARMUP_POINTS] = head[name]
+        columns[name] = values
+    df = df.assign(**columns)
+
+    count = len(df)
+    for span in EMA_SPANS:
+        engine.ema[span] = ExponentialMean.from_last(span, float(df[f'ema_{span}'].iloc[-1]), count)
+    engine.macd_signal = ExponentialMean.from_last(MACD_SIGNAL_SPAN, float(df['macd_signal'].iloc[-1]), count)
+    engine.count = count
+    return df
+
+
+def fill_warmup(df):
+    """与全量计算一致：窗口未满的 NaN 用后续第一个有效值填充"""
+    return df.bfill().ffill()
+
+
+# ---------- 按需计算的指标注册表 ----------
+# 与 utils.calculate_technical_indicators 的计算方式完全一致（包括数据不足时缩小窗口、
+# NaN 前后填充），但只计算请求的指标及其依赖。各函数的输入为已填充的依赖列。
+
+def _series(values):
+    return pd.Series(values, copy=False)
+
+
+def _rolling(values, window):
+    return _series(values).rolling(window=min(window, len(values)))
+
+
+def _ewm(values, span):
+    return _series(values).ewm(span=min(span, len(values))).mean()
+
+
+def _rsi(columns):
+    delta = _series(columns['price']).diff()
+    window = min(RSI_WINDOW, len(delta))
+    gain = delta.where(delta > 0, 0).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    return 100 - (100 / (1 + gain / (loss + 1e-10)))
+
+
+# 指标名 -> (依赖列, 计算函数)；price 为原始数据列，bb_std 只作为中间结果
+INDICATOR_REGISTRY = {
+    'ma_5': (('price',), lambda c: _rolling(c['price'], 5).mean()),
+    'ma_10': (('price',), lambda c: _rolling(c['price'], 10).mean()),
+    'ma_20': (('price',), lambda c: _rolling(c['price'], 20).mean()),
+    'ema_12': (('price',), lambda c: _ewm(c['price'], 12)),
+    'ema_26': (('price',), lambda c: _ewm(c['price'], 26)),
+    'macd': (('ema_12', 'ema_26'), lambda c: c['ema_12'] - c['ema_26']),
+    'macd_signal': (('macd',), lambda c: _ewm(c['macd'], MACD_SIGNAL_SPAN)),
+    'rsi': (('price',), _rsi),
+    'bb_middle': (('ma_20',), lambda c: c['ma_20']),
+    'bb_std': (('price',), lambda c: _rolling(c['price'], BB_WINDOW).std()),
+    'bb_upper': (('bb_middle', 'bb_std'), lambda c: c['bb_middle'] + c['bb_std'] * 2),
+    'bb_lower': (('bb_middle', 'bb_std'), lambda c: c['bb_middle'] - c['bb_std'] * 2),
+    'volatility': (('price',), lambda c: _rolling(c['price'], VOLATILITY_WINDOW).std()),
+}
+
+
+def compute_columns(names, base, memo=None):
+    """
+    计算 names 中的指标列，依赖按需递归计算
+
+    Args:
+        names: 需要的指标名（见 INDICATOR_REGISTRY）
+        base: 已有的列（DataFrame 或 dict，至少含 price），其中已有的指标直接复用
+        memo: 可选，memo(name, compute) -> ndarray，用于跨请求缓存单列结果；
+            命中时不再计算该列的依赖
+
+    Returns:
+        dict: 指标名 -> ndarray（NaN 已前后填充）
+
+    Raises:
+        KeyError: 未知的指标名
+    """
+    columns = {}
+
+    def resolve(name):
+        if name not in columns:
+            if name in base:
+                columns[name] = np.asarray(base[name], dtype=float)
+            else:
+                dependencies, func = INDICATOR_REGISTRY[name]
+
+                def compute():
+                    inputs = {dependency: resolve(dependency) for dependency in dependencies}
+                    return fill_warmup(_series(func(inputs))).to_numpy(dtype=float)
+
+                columns[name] = memo(name, compute) if memo is not None else compute()
+        return columns[name]
+
+    return {name: resolve(name) for name in names}
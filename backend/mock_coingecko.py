@@ -0,0 +1,207 @@
+"""
+本地 CoinGecko mock 服务
+生成确定性的模拟价格，用于在无网络 / 不消耗 API 额度时测试上游客户端、回填工具与压测
+
+用法:
+    python mock_coingecko.py --port 8765
+    COINGECKO_BASE_URL=http://127.0.0.1:8765/api/v3 python app.py
+
+可选故障注入:
+    --latency-ms 50          每个请求增加固定延迟
+    --error-rate 0.1         按比例返回 503
+    --rate-limit-every 5     每 N 个请求返回一次 429（带 Retry-After）
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+API_PREFIX = '/api/v3'
+
+# CoinGecko market_chart 的自动粒度：1 天内 5 分钟，90 天内 1 小时，更长为 1 天
+FIVE_MINUTES_MS = 5 * 60 * 1000
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+
+def granularity_ms(span_ms):
+    """按时间跨度返回数据点间隔（毫秒）"""
+    if span_ms <= DAY_MS:
+        return FIVE_MINUTES_MS
+    if span_ms <= 90 * DAY_MS:
+        return HOUR_MS
+    return DAY_MS
+
+
+def synthetic_series(timestamps_ms):
+    """
+    按时间戳生成确定性的价格与交易量（同一时间点总是得到相同的值）
+
+    Returns:
+        (prices, volumes): float64 数组
+    """
+    seconds = np.asarray(timestamps_ms, dtype=np.float64) / 1000.0
+    # 伪随机噪声：只依赖时间戳
+    noise = np.modf(np.abs(np.sin(seconds * 12.9898) * 43758.5453))[0] * 2 - 1
+    prices = (
+        30000
+        + 5000 * np.sin(2 * np.pi * seconds / (90 * 86400))
+        + 800 * np.sin(2 * np.pi * seconds / 86400)
+        + 150 * noise
+    )
+    volumes = 2.5e10 * (1 + 0.3 * np.sin(2 * np.pi * seconds / (7 * 86400))) * (1 + 0.1 * noise)
+    return prices, volumes
+
+
+def market_chart(start_ms, end_ms):
+    """生成 [start_ms, end_ms] 区间的 market_chart 响应"""
+    step = granularity_ms(end_ms - start_ms)
+    timestamps = np.arange(start_ms - start_ms % step + step, end_ms + 1, step, dtype=np.int64)
+    prices, volumes = synthetic_series(timestamps)
+    stamps = timestamps.tolist()
+    return {
+        'prices': [list(pair) for pair in zip(stamps, prices.round(2).tolist())],
+        'market_caps': [list(pair) for pair in zip(stamps, (prices * 19.7e6).round(0).tolist())],
+        'total_volumes': [list(pair) for pair in zip(stamps, volumes.round(0).tolist())]
+    }
+
+
+class MockState:
+    """故障注入参数与请求计数"""
+
+    def __init__(self, latency_ms=0, error_rate=0.0, rate_limit_every=0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class MockCoinGeckoHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 + Content-Length，客户端可复用连接
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出 40ms 延迟
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # 每个 TCP 连接调用一次，用于确认客户端复用了连接
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def do_GET(self):
+        state = self.server.state
+        with state.lock:
+            state.requests += 1
+            count = state.requests
+
+        if state.latency_ms:
+            time.sleep(state.latency_ms / 1000.0)
+
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/_mock/stats':
+            return self._send_json(200, {'requests': count, 'connections': state.connections})
+        if state.rate_limit_every and count % state.rate_limit_every == 0:
+            return self._send_json(429, {'error': 'rate limited'},
+                                   headers={'Retry-After': str(state.retry_after)})
+        if state.error_rate and random.random() < state.error_rate:
+            return self._send_json(503, {'error': 'service unavailable'})
+
+        now_ms = int(time.time() * 1000)
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else None
+
+        if path == '/ping':
+            return self._send_json(200, {'gecko_says': '(V3) To the Moon!'})
+        if path == '/simple/price':
+            prices, volumes = synthetic_series([now_ms, now_ms - DAY_MS])
+            return self._send_json(200, {'bitcoin': {
+                'usd': round(float(prices[0]), 2),
+                'usd_market_cap': round(float(prices[0]) * 19.7e6),
+                'usd_24h_vol': round(float(volumes[0])),
+                'usd_24h_change': float((prices[0] - prices[1]) / prices[1] * 100)
+            }})
+        if path == '/coins/bitcoin/market_chart':
+            days = float(query.get('days', 1))
+            return self._send_json(200, market_chart(now_ms - int(days * DAY_MS), now_ms))
+        if path == '/coins/bitcoin/market_chart/range':
+            try:
+                start_ms = int(float(query['from']) * 1000)
+                end_ms = int(float(query['to']) * 1000)
+            except (KeyError, ValueError):
+                return self._send_json(400, {'error': 'from and to are required'})
+            return self._send_json(200, market_chart(start_ms, min(end_ms, now_ms)))
+
+        return self._send_json(404, {'error': 'not found'})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 压测时不逐条打印请求日志
+        pass
+
+
+def create_server(host='127.0.0.1', port=8765, **options):
+    """创建 mock 服务（port=0 时随机分配端口），options 见 MockState"""
+    server = ThreadingHTTPServer((host, port), MockCoinGeckoHandler)
+    server.daemon_threads = True
+    server.state = MockState(**options)
+    return server
+
+
+def start_in_background(**options):
+    """
+    在后台线程中启动 mock 服务
+
+    Returns:
+        (server, base_url): 调用 server.shutdown() 停止
+    """
+    server = create_server(port=0, **options)
+    threading.Thread(target=server.serve_forever, name='mock-coingecko', daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}{API_PREFIX}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 CoinGecko mock 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host, args.port,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after
+    )
+    print(f"🚀 Mock CoinGecko running on http://{args.host}:{args.port}{API_PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+OHLCV 聚合模块
+基于整数纪元时间分桶，将原始价格点聚合为 K 线
+"""
+import numpy as np
+
+
+# 支持的 K 线周期（秒）
+INTERVAL_SECONDS = {
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400,
+}
+
+# 持久化为汇总表的周期（从细到粗）
+ROLLUP_INTERVALS = ('1h', '1d')
+
+
+def bucket_floor(timestamps, interval):
+    """
+    将时间向下取整到所在分桶的起点
+
+    Args:
+        timestamps: datetime64 数组
+        interval: K 线周期，如 '1h'、'1d'
+
+    Returns:
+        np.ndarray: datetime64[s] 分桶起点数组
+    """
+    width = INTERVAL_SECONDS[interval]
+    seconds = np.asarray(timestamps, dtype='datetime64[s]').astype(np.int64)
+    return ((seconds // width) * width).astype('datetime64[s]')
+
+
+def aggregate_ohlcv(timestamps, prices, volumes, interval):
+    """
+    按周期聚合 OHLCV（输入需按时间升序）
+
+    Args:
+        timestamps: datetime64 数组
+        prices: 价格数组
+        volumes: 交易量数组
+        interval: K 线周期
+
+    Returns:
+        dict: bucket_start / open / high / low / close / volume / count 数组
+    """
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    if len(prices) == 0:
+        empty = np.empty(0, dtype=float)
+        return {
+            'bucket_start': np.empty(0, dtype='datetime64[s]'),
+            'open': empty, 'high': empty, 'low': empty, 'close': empty,
+            'volume': empty, 'count': np.empty(0, dtype=np.int64)
+        }
+
+    buckets = bucket_floor(timestamps, interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(prices)]
+
+    return {
+        'bucket_start': buckets[starts],
+        'open': prices[starts],
+        'high': np.maximum.reduceat(prices, starts),
+        'low': np.minimum.reduceat(prices, starts),
+        'close': prices[ends - 1],
+        'volume': np.add.reduceat(volumes, starts),
+        'count': ends - starts
+    }
+
+
+def fill_empty_buckets(bars, interval, start=None, previous_close=None):
+    """
+    将 aggregate_ohlcv 的结果补齐为连续的分桶网格
+
+    没有数据的分桶 open / high / low / close 取前一根 K 线的收盘价，volume 与 count 为 0。
+
+    Args:
+        bars: aggregate_ohlcv 的结果
+        interval: K 线周期
+        start: 网格起点（分桶起点），默认为第一根 K 线
+        previous_close: start 之前最后一根 K 线的收盘价，用于填充第一根 K 线之前的空分桶
+
+    Returns:
+        dict: 与 aggregate_ohlcv 相同结构的数组
+    """
+    if len(bars['bucket_start']) == 0:
+        return bars
+
+    width = INTERVAL_SECONDS[interval]
+    seconds = bars['bucket_start'].astype('datetime64[s]').astype(np.int64)
+    first = seconds[0] if start is None else int(np.datetime64(start, 's').astype(np.int64))
+    size = (seconds[-1] - first) // width + 1
+    if size == len(seconds):
+        return bars
+
+    positions = (seconds - first) // width
+    close = np.full(size, np.nan if previous_close is None else float(previous_close))
+    present = np.zeros(size, dtype=bool)
+    present[positions] = True
+    # 每个位置取其之前（含自身）最后一根有数据的 K 线的收盘价
+    last = np.maximum.accumulate(np.where(present, np.arange(size), -1))
+    close[last >= 0] = bars['close'][np.searchsorted(positions, last[last >= 0])]
+
+    def spread(values, filled):
+        filled[positions] = values
+        return filled
+
+    return {
+        'bucket_start': (first + np.arange(size, dtype=np.int64) * width).astype('datetime64[s]'),
+        'open': spread(bars['open'], close.copy()),
+        'high': spread(bars['high'], close.copy()),
+        'low': spread(bars['low'], close.copy()),
+        'close': close,
+        'volume': spread(bars['volume'], np.zeros(size)),
+        'count': spread(bars['count'], np.zeros(size, dtype=np.int64))
+    }
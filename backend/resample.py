@@ -0,0 +1,222 @@
+"""
+多周期重采样模块
+由 price_history 生成固定周期（5m / 15m / 1h / 4h / 1d）的 OHLCV K 线，并以收盘价计算技术指标。
+
+原始数据混合了 CoinGecko 短区间的 5 分钟数据、定时任务的小时数据与实时行情，
+直接计算时 "MA20" 的含义随查询范围变化；按固定周期重采样后，指标窗口对应固定的时间长度，
+长范围查询也只需处理 K 线数量的行。没有数据的分桶按前一根 K 线的收盘价补齐（成交量为 0），
+K 线总是连续的时间网格。
+
+每个周期的结果覆盖整个保留期：已收盘 K 线的指标只计算一次，新数据到达时由增量指标引擎扩展；
+最新一根（未收盘）K 线每次基于引擎状态的副本单独计算。各周期的完整结果按数据版本缓存，
+数据未变化时不再读取保留期内的原始数据。
+"""
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_RETENTION_DAYS
+from database import db_manager
+from indicators import MIN_POINTS, IndicatorEngine, fill_warmup
+from ohlcv import INTERVAL_SECONDS, aggregate_ohlcv, bucket_floor, fill_empty_buckets
+from response_cache import data_version
+from utils import calculate_technical_indicators
+
+
+# 支持重采样的周期
+RESAMPLE_INTERVALS = ('5m', '15m', '1h', '4h', '1d')
+
+
+def bars_frame(bars):
+    """aggregate_ohlcv 的结果转换为 DataFrame，price 列为收盘价（供技术指标使用）"""
+    return pd.DataFrame({
+        'datetime': bars['bucket_start'].astype('datetime64[ns]'),
+        'open': bars['open'],
+        'high': bars['high'],
+        'low': bars['low'],
+        'close': bars['close'],
+        'price': bars['close'],
+        'volume': bars['volume'],
+        'count': bars['count']
+    })
+
+
+class TimeframeSeries:
+    """
+    单个周期的 K 线与技术指标
+
+    除最后一根外的 K 线视为已收盘（之后已有数据）：已收盘部分连同指标列保存在 closed 中，
+    engine 为处理完最后一根已收盘 K 线后的指标引擎状态。
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.width = np.timedelta64(INTERVAL_SECONDS[interval], 's')
+        self.lock = threading.Lock()
+        self.closed = None
+        self.engine = None
+        # 已收盘 K 线包含的原始数据点数（从后往前累加），用于检查已收盘区间的数据是否被改写
+        self._suffix_counts = None
+        # 最近一次结果：(原始数据点数, 最新时间, 最新价格) -> DataFrame
+        self._output = (None, None)
+        self.stats = {'rebuilds': 0, 'extends': 0, 'bars_appended': 0}
+
+    def frame(self, timestamps, prices, volumes):
+        """
+        由保留期内的原始数据（按时间升序的数组）返回该周期含技术指标的全部 K 线
+
+        Returns:
+            DataFrame: datetime / open / high / low / close / price / volume / count 及技术指标列，
+            无数据时返回 None（结果为共享对象，调用方不应修改）
+        """
+        if len(timestamps) == 0:
+            return None
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        output_key = (len(timestamps), timestamps[-1], float(prices[-1]))
+
+        with self.lock:
+            key, output = self._output
+            if key == output_key:
+                return output
+
+            if not self._extend(timestamps, prices, volumes):
+                self._rebuild(timestamps, prices, volumes)
+            output = self._with_live_bar(timestamps, prices, volumes)
+            self._output = (output_key, output)
+            return output
+
+    def _closed_until(self):
+        """已收盘部分的结束时间（不含）"""
+        return self.closed['datetime'].to_numpy()[-1] + self.width
+
+    def _rebuild(self, timestamps, prices, volumes):
+        """全量重采样并计算已收盘 K 线的指标"""
+        bars = bars_frame(fill_empty_buckets(
+            aggregate_ohlcv(timestamps, prices, volumes, self.interval), self.interval
+        ))
+        closed = bars.iloc[:-1].reset_index(drop=True)
+
+        if len(closed) >= MIN_POINTS:
+            self.engine = IndicatorEngine()
+            # 预热期的 NaN 用第一个有效值填充，之后追加的 K 线不再有 NaN
+            indicators = fill_warmup(self.engine.update_many(closed['price'].to_numpy()))
+            closed = pd.concat([closed, indicators], axis=1)
+        else:
+            # K 线太少时不使用增量引擎（全量计算会缩小窗口，两者结果不同）
+            self.engine = None
+
+        self.closed = closed if len(closed) else None
+        self._suffix_counts = np.cumsum(closed['count'].to_numpy()[::-1])[::-1] if len(closed) else None
+        self.stats['rebuilds'] += 1
+
+    def _extend(self, timestamps, prices, volumes):
+        """
+        追加已收盘区间之后新收盘的 K 线
+
+        Returns:
+            bool: 无法增量扩展（无已有结果、无引擎或已收盘区间的数据点数变化）时返回 False
+        """
+        if self.closed is None or self.engine is None:
+            return False
+
+        closed_until = self._closed_until()
+        end = int(np.searchsorted(timestamps, closed_until, side='left'))
+
+        # 保留期起点之前的 K 线可能只剩部分数据点，从第一根完整保留的 K 线开始核对
+        starts = self.closed['datetime'].to_numpy()
+        if bucket_floor(timestamps[:1], self.interval)[0] < starts[0]:
+            # 补写了更早的数据
+            return False
+        first = int(np.searchsorted(starts, timestamps[0], side='left'))
+        if first >= len(starts):
+            return False
+        begin = int(np.searchsorted(timestamps, starts[first], side='left'))
+        if end - begin != self._suffix_counts[first]:
+            return False
+
+        # 与已收盘部分之间没有数据的分桶同样补齐
+        bars = bars_frame(fill_empty_buckets(
+            aggregate_ohlcv(timestamps[end:], prices[end:], volumes[end:], self.interval), self.interval,
+            start=closed_until, previous_close=self.closed['close'].iloc[-1]
+        ))
+        new_closed = bars.iloc[:-1].reset_index(drop=True)
+        if len(new_closed):
+            indicators = self.engine.update_many(new_closed['price'].to_numpy())
+            appended = pd.concat([new_closed, indicators], axis=1)
+            # 同时丢弃已完全早于保留期的 K 线
+            expired = int(np.searchsorted(starts, bucket_floor(timestamps[:1], self.interval)[0], side='left'))
+            self.closed = pd.concat([self.closed.iloc[expired:], appended], ignore_index=True)
+            counts = self.closed['count'].to_numpy()
+            self._suffix_counts = np.cumsum(counts[::-1])[::-1]
+            self.stats['bars_appended'] += len(new_closed)
+        self.stats['extends'] += 1
+        return True
+
+    def _with_live_bar(self, timestamps, prices, volumes):
+        """已收盘 K 线 + 最新一根 K 线"""
+        start = int(np.searchsorted(timestamps, self._closed_until(), side='left')) if self.closed is not None else 0
+        live = bars_frame(aggregate_ohlcv(timestamps[start:], prices[start:], volumes[start:], self.interval))
+
+        if self.engine is None:
+            bars = pd.concat([self.closed, live], ignore_index=True) if self.closed is not None else live
+            return calculate_technical_indicators(bars)
+
+        # 未收盘 K 线在引擎副本上计算，不影响已收盘部分的状态
+        engine = IndicatorEngine.from_state(self.engine.to_state())
+        live = pd.concat([live, engine.update_many(live['price'].to_numpy())], axis=1)
+        return pd.concat([self.closed, live], ignore_index=True)
+
+
+class ResampleStore:
+    """各周期的重采样结果，数据来自 price_history 的进程内尾部缓存"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.series = {interval: TimeframeSeries(interval) for interval in RESAMPLE_INTERVALS}
+        # 周期 -> (数据版本, 覆盖保留期的完整结果)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def frame(self, interval, days):
+        """
+        interval 周期最近 days 天的 K 线与技术指标
+
+        Returns:
+            DataFrame，无数据时返回 None
+        """
+        version = data_version()
+        with self._lock:
+            cached_version, full = self._frames.get(interval, (None, None))
+
+        if version is None or cached_version != version:
+            raw = self.db_manager.get_historical_data(days=DATA_RETENTION_DAYS)
+            if raw is None or raw.empty:
+                return None
+
+            full = self.series[interval].frame(
+                raw['datetime'].to_numpy(), raw['price'].to_numpy(), raw['volume'].to_numpy()
+            )
+            if full is None:
+                return None
+            if version is not None:
+                with self._lock:
+                    self._frames[interval] = (version, full)
+
+        since = bucket_floor([datetime.now() - timedelta(days=days)], interval)[0].astype('datetime64[ns]')
+        offset = int(np.searchsorted(full['datetime'].to_numpy(), since, side='left'))
+        return full.iloc[offset:].reset_index(drop=True)
+
+    def stats(self):
+        return {
+            interval: {
+                **series.stats,
+                'closed_bars': len(series.closed) if series.closed is not None else 0
+            }
+            for interval, series in self.series.items()
+        }
+
+
+# 全局重采样结果
+resample_store = ResampleStore(db_manager)
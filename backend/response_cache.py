@@ -0,0 +1,170 @@
+"""
+响应缓存模块
+按 (接口, 参数, 数据版本) 缓存已编码（及 gzip 压缩）的 JSON / 二进制响应体，并提供 ETag / 304 支持
+
+数据版本取 price_history 中最新一条数据的时间：数据未变化时，
+轮询请求带上 If-None-Match 即可直接得到 304，不再重复序列化和传输。
+"""
+import gzip
+import hashlib
+import threading
+import time
+
+import pandas as pd
+from flask import Response, current_app, request
+
+from cache import cache_manager
+from database import db_manager
+
+
+# 已编码响应体的有效期（秒），数据版本变化后旧条目由 LRU / 过期自然淘汰
+RESPONSE_TTL = 3600
+
+# 响应体小于该字节数时不压缩
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+# 数据版本的复用时间（秒），避免每次轮询都查询数据库
+VERSION_CHECK_INTERVAL = 5
+
+_version_lock = threading.Lock()
+_version = {'value': None, 'checked_at': None}
+
+
+def format_version(timestamp):
+    """将时间统一格式化为版本字符串，None 表示无版本"""
+    if timestamp is None or pd.isna(timestamp):
+        return None
+    return pd.Timestamp(timestamp).isoformat()
+
+
+def data_version():
+    """当前数据版本（price_history 最新数据时间），数据库无数据时返回 None"""
+    with _version_lock:
+        checked_at = _version['checked_at']
+        if checked_at is not None and time.monotonic() - checked_at < VERSION_CHECK_INTERVAL:
+            return _version['value']
+
+    value = format_version(db_manager.get_latest_data_time())
+    with _version_lock:
+        _version['value'] = value
+        _version['checked_at'] = time.monotonic()
+    return value
+
+
+def reset_version():
+    """写入新数据后调用，下次请求重新读取数据版本"""
+    with _version_lock:
+        _version['checked_at'] = None
+
+
+def make_etag(key, version):
+    """由响应 key 与数据版本生成 ETag（不含引号）"""
+    return hashlib.sha1(f'{key}|{version}'.encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(key, version):
+    """
+    客户端缓存仍为最新版本时返回 304 响应，否则返回 None
+
+    Args:
+        key: 响应 key（接口 + 参数）
+        version: 当前数据版本，None 时不做条件判断
+    """
+    if version is None:
+        return None
+    etag = make_etag(key, version)
+    if not request.if_none_match.contains_weak(etag):
+        return None
+
+    response = Response(status=304)
+    _set_validators(response, etag)
+    return response
+
+
+def cached_json(key, version, build, vary=('Accept-Encoding',)):
+    """
+    返回带 ETag 的 JSON 响应，相同 (key, version) 只序列化一次
+
+    Args:
+        key: 响应 key（接口 + 参数）
+        version: 响应数据对应的数据版本，None 时不缓存、不带 ETag
+        build: 无参函数，返回可 JSON 序列化的响应内容；返回 None 表示无可用数据
+        vary: Vary 响应头
+
+    Returns:
+        Response，build 返回 None 时返回 None
+    """
+    return cached_body(key, version, lambda: _encode_or_none(build()), vary=vary)
+
+
+def cached_body(key, version, build, mimetype='application/json', vary=('Accept-Encoding',)):
+    """
+    cached_json 的通用版本：build 直接返回已编码的响应体（bytes）
+
+    Args:
+        key: 响应 key（接口 + 参数 + 响应格式）
+        version: 响应数据对应的数据版本，None 时不缓存、不带 ETag
+        build: 无参函数，返回 bytes；返回 None 表示无可用数据
+        mimetype: 响应类型
+        vary: Vary 响应头（按 Accept 协商格式的接口需包含 Accept）
+
+    Returns:
+        Response，build 返回 None 时返回 None
+    """
+    if version is None:
+        body = build()
+        return None if body is None else _make_response(body, None, None, mimetype, vary)
+
+    # 304 判断使用响应数据自身的版本：缓存中的旧数据不会被标记为最新版本
+    response = not_modified(key, version)
+    if response is not None:
+        return response
+
+    encoding = 'gzip' if request.accept_encodings['gzip'] else None
+    body_key = f'response:{key}:{version}'
+
+    body = cache_manager.get_or_compute(
+        body_key,
+        build,
+        max_age_seconds=RESPONSE_TTL,
+        ttl=RESPONSE_TTL
+    )
+    if body is None:
+        return None
+
+    if encoding == 'gzip' and len(body) >= GZIP_MIN_BYTES:
+        body = cache_manager.get_or_compute(
+            f'{body_key}:gzip',
+            lambda: gzip.compress(body, GZIP_LEVEL),
+            max_age_seconds=RESPONSE_TTL,
+            ttl=RESPONSE_TTL
+        )
+    else:
+        encoding = None
+
+    return _make_response(body, make_etag(key, version), encoding, mimetype, vary)
+
+
+def _encode(payload):
+    return current_app.json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _encode_or_none(payload):
+    return None if payload is None else _encode(payload)
+
+
+def _set_validators(response, etag):
+    response.set_etag(etag, weak=True)
+    # 客户端每次使用前都需要向服务器确认（可得到 304）
+    response.headers['Cache-Control'] = 'no-cache'
+
+
+def _make_response(body, etag, encoding, mimetype='application/json', vary=('Accept-Encoding',)):
+    response = Response(body, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = ', '.join(vary)
+    if etag is not None:
+        _set_validators(response, etag)
+    return response
@@ -1,21 +1,188 @@
 """
 API 路由模块
 """
-from flask import jsonify, request
+from flask import Response, jsonify, request, stream_with_context
 from datetime import datetime
 import pandas as pd
 import traceback
-from sklearn.ensemble import RandomForestRegressor
 
 from api import BitcoinAPI
 from cache import cache_manager
+import columnar
+import response_cache
 from database import db_manager
 from backtest import Backtest
-from utils import (
-    calculate_technical_indicators,
-    prepare_prediction_features,
-    calculate_risk_alerts
+from config import DATA_RETENTION_DAYS, CACHE_WARM_DAYS
+from connectivity import connectivity, coingecko_breaker
+from http_client import coingecko_client
+from tick_buffer import tick_buffer
+from scheduler import get_scheduler
+from stream import stream_hub
+from dashboard import load_dashboard
+from indicators import compute_columns
+from ohlcv import ROLLUP_INTERVALS
+from resample import RESAMPLE_INTERVALS, resample_store
+from series_store import series_store
+from services import (
+    HISTORICAL_FIELDS,
+    min_historical_points,
+    load_historical_frame,
+    format_historical,
+    historical_arrays,
+    downsample_historical,
+    MIN_DOWNSAMPLE_POINTS,
+    format_candlestick,
+    aggregate_candlestick,
+    compute_statistics,
+    compute_prediction,
+    compute_risk_alerts
 )
+from utils import calculate_technical_indicators
+
+
+# /api/historical 可协商的响应格式（未指定 Accept 时为 JSON）
+HISTORICAL_MIMETYPES = ['application/json', columnar.MEDIA_TYPE]
+HISTORICAL_VARY = ('Accept', 'Accept-Encoding')
+
+
+def parse_historical_fields(value):
+    """
+    解析 /api/historical 的 fields 参数
+
+    Returns:
+        list: 按 HISTORICAL_FIELDS 顺序排列的字段（含 timestamps），未指定时返回 None
+
+    Raises:
+        ValueError: 包含未知字段
+    """
+    if not value:
+        return None
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(HISTORICAL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add('timestamps')
+    return [field for field in HISTORICAL_FIELDS if field in requested]
+
+
+def parse_max_points(value):
+    """
+    解析 /api/historical 的 max_points 参数
+
+    Returns:
+        int: 最多返回的数据点数，未指定时返回 None
+
+    Raises:
+        ValueError: 不是整数或小于 MIN_DOWNSAMPLE_POINTS
+    """
+    if value is None or value == '':
+        return None
+    try:
+        max_points = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid max_points: {value}")
+    if max_points < MIN_DOWNSAMPLE_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_DOWNSAMPLE_POINTS}")
+    return max_points
+
+
+def historical_response(response_key, version, build, fields=None, binary=False):
+    """
+    返回历史数据响应（JSON 或列式二进制），相同 (key, version) 只编码一次
+
+    Args:
+        response_key: 响应 key（已包含响应格式）
+        version: 数据版本
+        build: 无参函数，返回 (DataFrame, 其余响应字段)；无数据时返回 None
+        fields: 返回的字段，None 表示全部
+        binary: 是否返回列式二进制（由请求头 Accept 协商）
+    """
+    def result(encode):
+        built = build()
+        if built is None:
+            return None
+        frame, extra = built
+        return encode(frame, extra)
+
+    if binary:
+        return response_cache.cached_body(
+            response_key, version,
+            lambda: result(lambda frame, extra: columnar.encode(historical_arrays(frame, fields), {'success': True, **extra})),
+            mimetype=columnar.MEDIA_TYPE,
+            vary=HISTORICAL_VARY
+        )
+    return response_cache.cached_json(
+        response_key, version,
+        lambda: result(lambda frame, extra: {'success': True, 'data': format_historical(frame, fields), **extra}),
+        vary=HISTORICAL_VARY
+    )
+
+
+def historical_fields_response(days, fields, response_key, max_points=None, binary=False):
+    """
+    只计算 fields 需要的技术指标列并返回
+
+    定时任务预热的全量结果（紧凑序列存储）可用时直接复用其中的列；否则只加载原始数据，
+    各指标列（含依赖）按需计算，并按 (范围, 数据版本, 指标) 缓存单列结果。
+    """
+    cache_key = f'historical_{days}d'
+    df = series_store.frame(days, min_points=min_historical_points(days))
+    if df is None and cache_manager.is_cache_valid(cache_key, max_age_seconds=3600):
+        df = cache_manager.get_cache(cache_key)['data']
+    elif df is None:
+        df = cache_manager.get_or_compute(
+            f'{cache_key}:raw',
+            lambda: load_historical_frame(days, with_indicators=False),
+            max_age_seconds=3600,
+            stale_while_revalidate=True
+        )
+    if df is None or df.empty:
+        return jsonify({
+            'success': False,
+            'message': 'No data available (offline mode)',
+            'offline_mode': True
+        }), 200
+
+    version = response_cache.format_version(df['datetime'].iloc[-1])
+
+    def memo(name, compute):
+        column = cache_manager.get_or_compute(
+            f'indicator:{days}d:{version}:{name}',
+            lambda: pd.DataFrame({name: compute()}),
+            max_age_seconds=response_cache.RESPONSE_TTL,
+            ttl=response_cache.RESPONSE_TTL
+        )
+        return column[name].to_numpy()
+
+    def build_frame():
+        names = [HISTORICAL_FIELDS[field][0] for field in fields if field not in ('timestamps', 'prices', 'volumes')]
+        columns = compute_columns(names, df, memo)
+        frame = pd.DataFrame({'datetime': df['datetime'], 'price': df['price'], 'volume': df['volume'], **columns})
+        if max_points is not None:
+            frame = downsample_historical(frame, max_points, fields)
+        return frame, {}
+
+    return historical_response(response_key, version, build_frame, fields, binary)
+
+
+def resampled_historical_response(days, interval, fields, response_key, max_points=None, binary=False):
+    """按 interval 周期重采样的历史数据：价格为收盘价，技术指标基于该周期的 K 线计算"""
+    def build_frame():
+        df = resample_store.frame(interval, days)
+        if df is None or df.empty:
+            return None
+        if max_points is not None:
+            df = downsample_historical(df, max_points, fields)
+        return df, {'interval': interval}
+
+    response = historical_response(response_key, response_cache.data_version(), build_frame, fields, binary)
+    if response is None:
+        return jsonify({
+            'success': False,
+            'message': 'No data available (offline mode)',
+            'offline_mode': True
+        }), 200
+    return response
 
 
 def register_routes(app):
@@ -51,103 +218,100 @@ def register_routes(app):
         """获取历史数据"""
         try:
             days = request.args.get('days', default=7, type=int)
-            cache_key = f'historical_{days}d'
             
-            # 限制最多查询365天
-            if days > 365:
-                days = 365
+            # 限制最多查询数据保留期内的天数
+            if days > DATA_RETENTION_DAYS:
+                days = DATA_RETENTION_DAYS
+            cache_key = f'historical_{days}d'
+            response_key = f'historical:{days}'
             
-            # 检查缓存 - 1小时 (历史数据不需要频繁更新)
+            # interval=1h 等：按固定周期重采样后计算指标（未指定时使用原始数据点）
+            interval = request.args.get('interval')
+            if interval is not None:
+                if interval not in RESAMPLE_INTERVALS:
+                    return jsonify({
+                        'success': False,
+                        'message': f"Unsupported interval: {interval}"
+                    }), 400
+                response_key = f'{response_key}:{interval}'
+            
+            # fields=prices,rsi 时只计算和返回需要的序列（timestamps 总是返回）；
+            # max_points=1000 时在服务端降采样（价格 LTTB，交易量 / 波动率保留每段的最小 / 最大值）
+            try:
+                fields = parse_historical_fields(request.args.get('fields'))
+                max_points = parse_max_points(request.args.get('max_points'))
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            if fields is not None:
+                response_key = f"{response_key}:{','.join(fields)}"
+            if max_points is not None:
+                response_key = f'{response_key}:max{max_points}'
+            
+            # Accept: application/vnd.btc-analysis.columnar 时返回列式二进制（各序列为定长数组）
+            binary = request.accept_mimetypes.best_match(HISTORICAL_MIMETYPES) == columnar.MEDIA_TYPE
+            if binary:
+                response_key = f'{response_key}:columnar'
+            
+            # 数据库未写入新数据时直接返回 304
+            response = response_cache.not_modified(response_key, response_cache.data_version())
+            if response is not None:
+                return response
+            
+            if interval is not None:
+                return resampled_historical_response(days, interval, fields, response_key, max_points, binary)
+            if fields is not None:
+                return historical_fields_response(days, fields, response_key, max_points, binary)
+            
+            # 优先使用定时任务预热的紧凑序列存储（各范围为同一组数组的视图）
             days_requested = days
-            if cache_manager.is_cache_valid(cache_key, max_age_seconds=3600):
-                cache = cache_manager.get_cache(cache_key)
-                df = cache['data']
-                print(f"✅ 使用缓存的{days}天数据")
-            else:
-                # 对于30天以上的查询，优先使用数据库（小时级数据）
-                # 避免使用CoinGecko API返回的日级数据
-                if days >= 30:
-                    print(f"📊 查询{days}天，优先从数据库获取小时级数据")
-                    df = db_manager.get_historical_data(days=days)
-                    
-                    # 如果数据库数据不足，才考虑API（但会得到不同粒度的数据）
-                    if df is None or df.empty:
-                        print(f"⚠️ 数据库无数据，尝试API获取")
-                        df_api = BitcoinAPI.fetch_historical_data(days)
-                        if df_api is not None and not df_api.empty:
-                            df = df_api
-                else:
-                    # 30天以内，优先从数据库获取
-                    print(f"📊 从数据库获取{days}天历史数据")
-                    df = db_manager.get_historical_data(days=days)
-                    
-                    # 如果数据库没有足够数据，再尝试API
-                    if df is None or df.empty or len(df) < days * 12:  # 每天至少12个数据点
-                        print(f"⚠️ 数据库数据不足，尝试API获取")
-                        df_api = BitcoinAPI.fetch_historical_data(days)
-                        if df_api is not None and not df_api.empty:
-                            df = df_api
-                        elif df is not None and not df.empty:
-                            # API失败，使用数据库的数据（即使不足）
-                            print(f"⚠️ API失败，使用数据库现有数据")
-                        else:
-                            # 如果还是失败，尝试返回旧的缓存数据
-                            cache = cache_manager.get_cache(cache_key)
-                            if cache['data'] is not None:
-                                print(f"⚠️ 返回旧缓存数据")
-                                df = cache['data']
-                            else:
-                                return jsonify({
-                                    'success': False,
-                                    'message': 'No data available (offline mode)',
-                                    'offline_mode': True
-                                }), 200  # 返回200而不是500
-                
-                if df is not None and not df.empty:
-                    # 计算技术指标
-                    df = calculate_technical_indicators(df)
-                    cache_manager.set_cache(cache_key, df)
-                    print(f"✅ 缓存{days}天数据（{len(df)}条记录）")
-            
-            # 确保df有所有必要的列
-            required_cols = ['datetime', 'price', 'volume', 'ma_5', 'ma_10', 'ma_20', 
-                            'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower', 'volatility']
-            
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                print(f"⚠️ 缺少列: {missing_cols}，重新计算技术指标")
-                df = calculate_technical_indicators(df)
-                cache_manager.set_cache(cache_key, df)
-            
-            # 转换为JSON格式
-            result = {
-                'timestamps': df['datetime'].dt.strftime('%Y-%m-%d %H:%M').tolist(),
-                'prices': df['price'].round(2).tolist(),
-                'volumes': df['volume'].round(0).tolist(),
-                'ma_5': df['ma_5'].round(2).tolist(),
-                'ma_10': df['ma_10'].round(2).tolist(),
-                'ma_20': df['ma_20'].round(2).tolist(),
-                'rsi': df['rsi'].round(2).tolist(),
-                'macd': df['macd'].round(2).tolist(),
-                'macd_signal': df['macd_signal'].round(2).tolist(),
-                'bb_upper': df['bb_upper'].round(2).tolist(),
-                'bb_middle': df['bb_middle'].round(2).tolist(),
-                'bb_lower': df['bb_lower'].round(2).tolist(),
-                'volatility': df['volatility'].round(2).tolist()
-            }
+            df = series_store.frame(days, min_points=min_historical_points(days))
+            stored = df is not None
+            if df is None:
+                # 检查缓存 - 1小时 (历史数据不需要频繁更新)
+                # 并发未命中只计算一次；已有旧数据时先返回旧数据，由后台刷新
+                df = cache_manager.get_or_compute(
+                    cache_key,
+                    lambda: load_historical_frame(days),
+                    max_age_seconds=3600,
+                    stale_while_revalidate=True
+                )
+            if df is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'No data available (offline mode)',
+                    'offline_mode': True
+                }), 200  # 返回200而不是500
             
-            response_payload = {
-                'success': True,
-                'data': result,
-                'cached': cache_manager.is_cache_valid(cache_key, max_age_seconds=1800)
-            }
+            def build_frame():
+                frame = df
+                # 确保df有所有必要的列
+                required_cols = ['datetime', 'price', 'volume', 'ma_5', 'ma_10', 'ma_20', 
+                                'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_middle', 'bb_lower', 'volatility']
+                
+                missing_cols = [col for col in required_cols if col not in frame.columns]
+                if missing_cols:
+                    print(f"⚠️ 缺少列: {missing_cols}，重新计算技术指标")
+                    frame = calculate_technical_indicators(frame)
+                    cache_manager.set_cache(cache_key, frame)
+                if max_points is not None:
+                    frame = downsample_historical(frame, max_points)
+                
+                extra = {
+                    'cached': stored or cache_manager.is_cache_valid(cache_key, max_age_seconds=1800)
+                }
 
-            # 如果用户请求超过一年，告知前端数据库仅提供最近一年的离线数据
-            if days_requested > 365:
-                response_payload['partial'] = True
-                response_payload['notice'] = 'Database only stores the last 365 days; fetch older data live.'
+                # 如果用户请求超过一年，告知前端数据库仅提供最近一年的离线数据
+                if days_requested > DATA_RETENTION_DAYS:
+                    extra['partial'] = True
+                    extra['notice'] = f'Database only stores the last {DATA_RETENTION_DAYS} days; fetch older data live.'
+                return frame, extra
 
-            return jsonify(response_payload)
+            # 以数据自身的最新时间作为版本：后台刷新完成前返回的旧数据不会被标记为最新
+            version = response_cache.format_version(df['datetime'].iloc[-1]) if len(df) else None
+            return historical_response(response_key, version, build_frame, binary=binary)
         except Exception as e:
             print(f"Error in /api/historical: {e}")
             traceback.print_exc()
@@ -178,60 +342,26 @@ def register_routes(app):
     def get_statistics():
         """获取统计数据"""
         try:
-            # 检查缓存
-            if cache_manager.is_cache_valid('statistics', max_age_seconds=600):
-                cache = cache_manager.get_cache('statistics')
-                print("✅ 使用缓存的统计数据")
-                return jsonify({
-                    'success': True,
-                    'data': cache['data'],
-                    'cached': True
-                })
-            
             days = request.args.get('days', default=7, type=int)
-            df = BitcoinAPI.fetch_historical_data(days)
-            
-            if df is None or df.empty:
-                # 返回缓存的数据
-                cache = cache_manager.get_cache('statistics')
-                if cache['data'] is not None:
-                    print("⚠️ 获取失败，返回缓存统计数据")
-                    return jsonify({
-                        'success': True,
-                        'data': cache['data'],
-                        'cached': True
-                    })
+            # 缓存10分钟；过期后先返回旧数据，由一个后台线程刷新
+            was_cached = cache_manager.is_cache_valid('statistics', max_age_seconds=600)
+            stats = cache_manager.get_or_compute(
+                'statistics',
+                lambda: compute_statistics(days),
+                max_age_seconds=600,
+                stale_while_revalidate=True
+            )
+            
+            if stats is None:
                 return jsonify({
                     'success': False,
                     'message': 'Failed to fetch data'
                 }), 500
             
-            # 计算24小时数据
-            data_24h = df.tail(min(288, len(df)))
-            
-            stats = {
-                'current_price': float(df['price'].iloc[-1]),
-                'high_24h': float(data_24h['price'].max()),
-                'low_24h': float(data_24h['price'].min()),
-                'avg_price': float(df['price'].mean()),
-                'total_volume': float(df['volume'].sum()),
-                'avg_volume': float(df['volume'].mean()),
-                'price_change_24h': float(
-                    ((df['price'].iloc[-1] - data_24h['price'].iloc[0]) / 
-                     data_24h['price'].iloc[0] * 100)
-                ) if len(data_24h) > 0 else 0,
-                'volatility': float(df['price'].std()),
-                'max_price': float(df['price'].max()),
-                'min_price': float(df['price'].min())
-            }
-            
-            # 缓存结果
-            cache_manager.set_cache('statistics', stats)
-            
             return jsonify({
                 'success': True,
                 'data': stats,
-                'cached': False
+                'cached': was_cached
             })
         except Exception as e:
             print(f"Error in /api/statistics: {e}")
@@ -254,78 +384,25 @@ def register_routes(app):
     def get_prediction():
         """价格预测"""
         try:
-            # 检查缓存
-            if cache_manager.is_cache_valid('prediction', max_age_seconds=600):
-                cache = cache_manager.get_cache('prediction')
-                print("✅ 使用缓存的预测数据")
-                return jsonify({
-                    'success': True,
-                    'data': cache['data'],
-                    'cached': True
-                })
+            # 缓存10分钟；过期后先返回旧预测，由一个后台线程重新训练
+            was_cached = cache_manager.is_cache_valid('prediction', max_age_seconds=600)
+            result = cache_manager.get_or_compute(
+                'prediction',
+                compute_prediction,
+                max_age_seconds=600,
+                stale_while_revalidate=True
+            )
             
-            df = BitcoinAPI.fetch_historical_data(days=7)
-            if df is None or df.empty or len(df) < 20:
-                # 返回缓存的预测
-                cache = cache_manager.get_cache('prediction')
-                if cache['data'] is not None:
-                    print("⚠️ 获取失败，返回缓存预测")
-                    return jsonify({
-                        'success': True,
-                        'data': cache['data'],
-                        'cached': True
-                    })
+            if result is None:
                 return jsonify({
                     'success': False,
                     'message': 'Not enough data for prediction'
                 }), 500
             
-            # 特征工程
-            df = prepare_prediction_features(df)
-            
-            # 准备训练数据
-            feature_cols = ['price', 'volume', 'hour', 'day_of_week', 'returns', 'ma_5', 'ma_10']
-            
-            if len(df) < 15:
-                # 数据太少，使用简单预测
-                current_price = float(df['price'].iloc[-1])
-                trend = df['price'].tail(5).pct_change().mean()
-                prediction = current_price * (1 + trend)
-            else:
-                X = df[feature_cols].iloc[:-5]
-                y = df['price'].iloc[5:]
-                
-                if len(X) < 10:
-                    current_price = float(df['price'].iloc[-1])
-                    prediction = current_price
-                else:
-                    # 训练模型
-                    model = RandomForestRegressor(n_estimators=30, max_depth=10, random_state=42)
-                    model.fit(X[:min(len(X), 100)], y[:min(len(y), 100)])
-                    
-                    # 预测 - 保持 DataFrame 格式以避免警告
-                    last_features = df[feature_cols].iloc[-1:]
-                    prediction = float(model.predict(last_features)[0])
-            
-            current_price = float(df['price'].iloc[-1])
-            change_pct = ((prediction - current_price) / current_price) * 100
-            
-            result = {
-                'current_price': round(current_price, 2),
-                'predicted_price': round(prediction, 2),
-                'change_percent': round(change_pct, 2),
-                'direction': 'up' if change_pct > 0 else 'down',
-                'confidence': 'medium',
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # 缓存结果
-            cache_manager.set_cache('prediction', result)
-            
             return jsonify({
                 'success': True,
                 'data': result,
-                'cached': False
+                'cached': was_cached
             })
         except Exception as e:
             print(f"Prediction error: {e}")
@@ -348,19 +425,37 @@ def register_routes(app):
     def get_risk_alerts():
         """风险警报"""
         try:
-            df = BitcoinAPI.fetch_historical_data(days=7)
-            if df is None or df.empty:
+            # 未指定 days 时为仪表板使用的最近警报（最近 50 个数据点）；
+            # 指定 days 时检查整个范围，用于历史警报回顾
+            days = request.args.get('days', type=int)
+            recent = 50 if days is None else None
+            days = min(days or 7, DATA_RETENTION_DAYS)
+            limit = request.args.get('limit', default=10, type=int)
+            limit = limit if limit > 0 else None
+            
+            response_key = f'risk-alerts:{days}:{recent}:{limit}'
+            version = response_cache.data_version()
+            
+            def compute():
+                return compute_risk_alerts(days, recent=recent, limit=limit)
+            
+            if version is None:
+                # 数据库无数据（使用 API 数据），缓存5分钟
+                alerts = cache_manager.get_or_compute(
+                    response_key,
+                    compute,
+                    max_age_seconds=300,
+                    stale_while_revalidate=True
+                )
                 return jsonify({
                     'success': True,
-                    'data': []
+                    'data': alerts or []
                 })
             
-            alerts = calculate_risk_alerts(df)
-            
-            return jsonify({
-                'success': True,
-                'data': alerts
-            })
+            # 同一数据版本只计算和序列化一次，未更新时返回 304
+            return response_cache.cached_json(
+                response_key, version, lambda: {'success': True, 'data': compute()}
+            )
         except Exception as e:
             print(f"Risk alerts error: {e}")
             traceback.print_exc()
@@ -375,6 +470,34 @@ def register_routes(app):
         """获取K线数据"""
         try:
             days = request.args.get('days', default=7, type=int)
+            interval = request.args.get('interval', default='1d')
+            if interval not in RESAMPLE_INTERVALS:
+                return jsonify({
+                    'success': False,
+                    'message': f"Unsupported interval: {interval}"
+                }), 400
+            
+            def build_payload():
+                if interval in ROLLUP_INTERVALS:
+                    # 优先读取增量维护的K线汇总表，只需处理 O(K线数) 行
+                    bars = db_manager.get_ohlcv(interval, days=days)
+                else:
+                    bars = resample_store.frame(interval, days)
+                if bars is None or bars.empty:
+                    return None
+                return {
+                    'success': True,
+                    'data': format_candlestick(bars, interval)
+                }
+            
+            # 汇总表与 price_history 同时写入，数据版本未变化时直接返回 304 或已编码的响应体
+            response = response_cache.cached_json(
+                f'candlestick:{days}:{interval}', response_cache.data_version(), build_payload
+            )
+            if response is not None:
+                return response
+            
+            # 汇总表 / 重采样结果为空时（如尚未写入任何数据），退回到原始数据按周期聚合
             df = BitcoinAPI.fetch_historical_data(days)
             
             if df is None or df.empty:
@@ -389,24 +512,10 @@ def register_routes(app):
                     'offline_mode': True
                 }), 200  # 返回200而不是500,表示这是预期的降级
             
-            # 按日期聚合
-            df['date'] = df['datetime'].dt.date
-            daily = df.groupby('date').agg({
-                'price': ['first', 'max', 'min', 'last'],
-                'volume': 'sum'
-            }).reset_index()
-            
-            daily.columns = ['date', 'open', 'high', 'low', 'close', 'volume']
-            
-            result = {
-                'dates': daily['date'].astype(str).tolist(),
-                'data': daily[['open', 'close', 'low', 'high']].round(2).values.tolist(),
-                'volumes': daily['volume'].round(0).tolist()
-            }
-            
+            # df 可能是缓存中的共享对象，聚合只读取数组
             return jsonify({
                 'success': True,
-                'data': result
+                'data': format_candlestick(aggregate_candlestick(df, interval), interval)
             })
         except Exception as e:
             print(f"Candlestick error: {e}")
@@ -417,13 +526,56 @@ def register_routes(app):
             }), 500
     
     
+    @app.route('/api/dashboard', methods=['GET'])
+    def get_dashboard():
+        """仪表板聚合数据：统计、预测、风险警报、7天历史数据与30天K线一次返回"""
+        try:
+            dashboard = load_dashboard()
+            # 合并结果按内容摘要编码一次，内容未变化时返回 304
+            return response_cache.cached_json(
+                'dashboard', dashboard['version'], lambda: {'success': True, 'data': dashboard['panels']}
+            )
+        except Exception as e:
+            print(f"Dashboard error: {e}")
+            traceback.print_exc()
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 500
+    
+    
+    @app.route('/api/stream', methods=['GET'])
+    def stream():
+        """实时推送（Server-Sent Events）：先发送完整快照，之后只推送变化的数据"""
+        subscriber = stream_hub.subscribe()
+        return Response(
+            stream_with_context(stream_hub.events(subscriber)),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                # 关闭 Nginx 的响应缓冲，消息立即送达
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
+    
     @app.route('/api/health', methods=['GET'])
     def health_check():
         """健康检查"""
+        scheduler = get_scheduler()
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'cache': cache_manager.stats(),
+            'cache_warmup': scheduler.last_warmup if scheduler else None,
+            'network': connectivity.stats(),
+            'coingecko_circuit': coingecko_breaker.stats(),
+            'upstream': coingecko_client.stats(),
+            'tick_buffer': tick_buffer.stats(),
+            'stream': stream_hub.stats(),
+            'resample': resample_store.stats(),
+            'series_store': series_store.memory_report(CACHE_WARM_DAYS)
         })
     
     
@@ -6,12 +6,17 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
 import logging
+import time
 
 # 导入必要的模块
 from api import BitcoinAPI
 from database import DatabaseManager
 from cache import CacheManager
-from utils import calculate_technical_indicators
+from config import DATA_RETENTION_DAYS, CACHE_WARM_DAYS
+from services import refresh_historical_frame
+from resample import RESAMPLE_INTERVALS, resample_store
+from series_store import series_store
+import response_cache
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +38,8 @@ class DataUpdateScheduler:
         self.cache_manager = cache_manager
         self.scheduler = BackgroundScheduler(timezone='Asia/Shanghai')
         self.is_running = False
+        # 最近一次缓存预热的各范围耗时（秒）
+        self.last_warmup = None
         
     def update_historical_data(self):
         """定时更新历史数据"""
@@ -46,11 +53,7 @@ class DataUpdateScheduler:
                 # 过滤：只保存数据库中没有的新数据
                 # 查询数据库中最新的时间戳
                 try:
-                    from sqlalchemy import text
-                    with self.db_manager.engine.connect() as conn:
-                        result = conn.execute(text("SELECT MAX(timestamp) as max_time FROM price_history"))
-                        row = result.fetchone()
-                        latest_db_time = row[0] if row and row[0] else None
+                    latest_db_time = self.db_manager.get_latest_data_time()
                     
                     if latest_db_time:
                         # 只保存比数据库最新时间更新的数据
@@ -63,29 +66,15 @@ class DataUpdateScheduler:
                 except Exception as e:
                     logger.warning(f"⚠️ 查询数据库最新时间失败: {e}，将保存所有数据")
                 
-                # 保存到数据库（会自动清理超过365天的旧数据）
+                # 保存到数据库（批量写入；过期数据由 apply_retention 任务统一清理）
                 saved_count = self.db_manager.save_historical_data(df)
                 logger.info(f"✅ 成功保存 {saved_count} 条数据到数据库")
+                # 数据版本变化，轮询请求将得到新的 ETag
+                response_cache.reset_version()
                 
-                # 额外执行一次数据清理，确保数据库只保留最近365天
-                deleted_count = self.db_manager.clean_old_data(keep_days=365)
-                if deleted_count > 0:
-                    logger.info(f"🗑️ 清理了 {deleted_count} 条过期数据")
-                
-                # 重新获取完整的7天数据用于计算技术指标和缓存
-                df_full = self.db_manager.get_historical_data(days=7)
-                if df_full is not None and not df_full.empty:
-                    # 计算技术指标
-                    from utils import calculate_technical_indicators
-                    df_full = calculate_technical_indicators(df_full)
-                    
-                    # 更新缓存（清除旧缓存，强制下次查询使用新数据）
-                    cache_keys = ['historical_7d', 'historical_30d', 'historical_90d', 'historical_365d']
-                    for key in cache_keys:
-                        self.cache_manager.clear_cache(key)
-                    
-                    logger.info(f"✅ 清除缓存，强制使用新数据")
-                    logger.info(f"✅ 定时更新完成 - 数据时间范围: {df_full['datetime'].min()} 到 {df_full['datetime'].max()}")
+                # 按优先级重建常用范围的缓存，完成前仍返回旧数据
+                self.warm_caches()
+                logger.info(f"✅ 定时更新完成 - 新数据时间范围: {df['datetime'].min()} 到 {df['datetime'].max()}")
             else:
                 logger.warning("⚠️ 获取数据失败，跳过本次更新")
                 
@@ -94,6 +83,64 @@ class DataUpdateScheduler:
             import traceback
             traceback.print_exc()
     
+    def warm_caches(self):
+        """
+        刷新历史数据的紧凑序列存储与各周期的重采样结果
+
+        按 CACHE_WARM_DAYS 的顺序逐个范围计算技术指标（各范围增量计算，结果与单独计算该范围一致），
+        全部完成后一次载入 series_store；期间请求仍读取旧数据。
+
+        Returns:
+            dict: 各项的预热耗时（秒），失败的项为 None
+        """
+        timings = {}
+        frames = {}
+        for days in CACHE_WARM_DAYS:
+            key = f'historical_{days}d'
+            start = time.perf_counter()
+            try:
+                # 已有数据时只对新增数据点增量计算技术指标
+                frames[days] = refresh_historical_frame(days, previous=series_store.frame(days))
+                timings[key] = round(time.perf_counter() - start, 3)
+                if frames[days] is None:
+                    logger.warning(f"⚠️ 预热缓存 {key}: 无可用数据")
+                else:
+                    logger.info(f"🔥 预热缓存 {key}: {len(frames[days])} 条，耗时 {timings[key]:.3f}s")
+            except Exception as e:
+                logger.error(f"❌ 预热缓存失败: {key}: {e}")
+                timings[key] = None
+
+        start = time.perf_counter()
+        try:
+            series_store.load(frames)
+            timings['series_store'] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            logger.error(f"❌ 载入紧凑序列存储失败: {e}")
+            timings['series_store'] = None
+
+        # 各周期的重采样结果：只追加新收盘的 K 线
+        for interval in RESAMPLE_INTERVALS:
+            key = f'resample_{interval}'
+            start = time.perf_counter()
+            try:
+                resample_store.frame(interval, DATA_RETENTION_DAYS)
+                timings[key] = round(time.perf_counter() - start, 3)
+            except Exception as e:
+                logger.error(f"❌ 预热重采样失败: {interval}: {e}")
+                timings[key] = None
+
+        self.last_warmup = {'time': datetime.now().isoformat(), 'timings': timings}
+        return timings
+    
+    def apply_retention(self):
+        """定时执行数据保留策略（整分区删除过期数据）"""
+        try:
+            logger.info(f"🗑️ 开始执行数据保留策略（保留 {DATA_RETENTION_DAYS} 天）")
+            deleted_count = self.db_manager.apply_retention()
+            logger.info(f"✅ 数据保留策略执行完成，DELETE 清理 {deleted_count} 条")
+        except Exception as e:
+            logger.error(f"❌ 执行数据保留策略失败: {e}")
+    
     def start(self):
         """启动调度器"""
         if self.is_running:
@@ -110,14 +157,27 @@ class DataUpdateScheduler:
                 replace_existing=True
             )
             
+            # 添加定时任务：每天 00:20 执行数据保留策略（与写入路径解耦）
+            self.scheduler.add_job(
+                func=self.apply_retention,
+                trigger=CronTrigger(hour=0, minute=20),
+                id='apply_retention',
+                name='清理过期历史数据',
+                replace_existing=True
+            )
+            
             # 启动调度器
             self.scheduler.start()
             self.is_running = True
-            logger.info("✅ 定时任务调度器已启动 - 每小时第5分钟更新数据")
+            logger.info("✅ 定时任务调度器已启动 - 每小时第5分钟更新数据，每天 00:20 清理过期数据")
             
             # 立即执行一次更新
             logger.info("🚀 执行初始数据更新...")
             self.update_historical_data()
+            # 数据库已是最新时 update_historical_data 不会预热，启动时补做一次
+            if self.last_warmup is None:
+                self.warm_caches()
+            self.apply_retention()
             
         except Exception as e:
             logger.error(f"❌ 启动调度器失败: {e}")
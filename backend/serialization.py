@@ -0,0 +1,203 @@
+"""
+缓存序列化模块
+将 DataFrame / dict 编码为带版本头的压缩二进制格式，存入 technical_cache 的 BLOB 列
+
+格式:
+    MAGIC(4) | VERSION(1) | KIND(1) | CODEC(1) | RESERVED(1) | 压缩后的负载
+
+DataFrame 负载为 JSON 清单（列名、dtype、字节数）+ 按列连续排列的原始数组字节，
+datetime64 / float64 等数值列按原 dtype 精确还原；带时区的时间列按 UTC 保存，
+时区名写入清单，解码时换算回原时区。数值列在压缩前做字节重排
+（各元素的第 i 个字节放在一起），相邻数值的高位字节相同，压缩率和速度都更好。
+
+不压缩、不重排时，decode(copy=False) 可直接在 mmap 上构造只读数组视图（跨进程共享缓存使用）。
+"""
+import json
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+MAGIC = b'BTCF'
+FORMAT_VERSION = 1
+
+# 负载类型
+KIND_DATAFRAME = 0
+KIND_JSON = 1
+KIND_BYTES = 2
+
+# 压缩算法（仅使用标准库 zlib，保留字节以便后续扩展）
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+
+HEADER = struct.Struct('<4sBBBx')
+
+# 默认压缩级别：缓存读写频繁，优先速度
+ZLIB_LEVEL = 1
+
+
+def is_binary_payload(data):
+    """判断数据库中的值是否为本模块编码的二进制格式"""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+
+def encode(data, codec=CODEC_ZLIB, shuffle=True):
+    """
+    将 DataFrame 或可 JSON 序列化的对象编码为二进制
+
+    Args:
+        data: DataFrame / dict / list / bytes（如已编码的响应体）
+        codec: 压缩算法
+        shuffle: 数值列是否做字节重排
+
+    Returns:
+        bytes: 带版本头的二进制数据
+    """
+    if isinstance(data, pd.DataFrame):
+        kind, payload = KIND_DATAFRAME, _encode_frame(data, shuffle)
+    elif isinstance(data, (bytes, bytearray)):
+        kind, payload = KIND_BYTES, bytes(data)
+    else:
+        kind, payload = KIND_JSON, json.dumps(data, default=str).encode('utf-8')
+
+    if codec == CODEC_ZLIB:
+        payload = zlib.compress(payload, ZLIB_LEVEL)
+    elif codec != CODEC_NONE:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    return HEADER.pack(MAGIC, FORMAT_VERSION, kind, codec) + payload
+
+
+def decode(blob, copy=True):
+    """
+    解码 encode 生成的二进制数据
+
+    Args:
+        blob: bytes / memoryview / mmap
+        copy: 为 False 且未压缩、未重排时，数值列直接引用 blob 的内存（只读）
+
+    Raises:
+        ValueError: 格式头无效或版本不受支持
+    """
+    blob = memoryview(blob)
+    magic, version, kind, codec = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a binary cache payload")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache format version: {version}")
+
+    payload = blob[HEADER.size:]
+    if codec == CODEC_ZLIB:
+        payload = zlib.decompress(payload)
+    elif codec != CODEC_NONE:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    if kind == KIND_DATAFRAME:
+        return _decode_frame(memoryview(payload), copy)
+    if kind == KIND_JSON:
+        return json.loads(bytes(payload))
+    if kind == KIND_BYTES:
+        return bytes(payload)
+    raise ValueError(f"Unknown payload kind: {kind}")
+
+
+def _encode_frame(df, shuffle=True):
+    """DataFrame -> 清单 + 列字节"""
+    columns = []
+    buffers = []
+    for name in df.columns:
+        series = df[name]
+        if series.dtype.kind in 'biufcmM':
+            # 数值 / 时间列：写入（字节重排后的）原始数组字节；
+            # 带时区的时间列 to_numpy() 为 Timestamp 对象数组，先换算为 UTC 的 datetime64
+            tz = _tz_name(series.dtype)
+            if tz is not None:
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            array = np.ascontiguousarray(series.to_numpy())
+            buffer = _shuffle(array) if shuffle else array.tobytes()
+            columns.append({
+                'name': name, 'dtype': array.dtype.str, 'nbytes': len(buffer), 'shuffle': shuffle, 'tz': tz
+            })
+        else:
+            # 其他类型（字符串等）退回到 JSON
+            buffer = json.dumps(series.tolist(), default=str).encode('utf-8')
+            columns.append({'name': name, 'dtype': 'json', 'nbytes': len(buffer)})
+        buffers.append(buffer)
+
+    manifest = json.dumps({
+        'columns': columns,
+        'rows': len(df),
+        # 非默认索引（如 DatetimeIndex）另存一份
+        'index': None if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        else _encode_index(df.index)
+    }).encode('utf-8')
+    return struct.pack('<I', len(manifest)) + manifest + b''.join(buffers)
+
+
+def _tz_name(dtype):
+    """带时区的时间类型返回时区名，其他类型返回 None"""
+    tz = getattr(dtype, 'tz', None)
+    return None if tz is None else str(tz)
+
+
+def _localize(values, tz):
+    """UTC 的 datetime64 数组 / DatetimeIndex -> tz 时区（tz 为 None 时原样返回）"""
+    if tz is None:
+        return values
+    return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(tz)
+
+
+def _shuffle(array):
+    """字节重排：(n, itemsize) 字节矩阵转置后输出"""
+    return array.view(np.uint8).reshape(-1, array.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(chunk, dtype):
+    """字节重排的逆操作，返回新的可写数组"""
+    matrix = np.frombuffer(chunk, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(matrix.T).view(dtype).ravel()
+
+
+def _encode_index(index):
+    if index.dtype.kind == 'M':
+        # asi8 为 UTC 纳秒，带时区时另存时区名
+        return {'dtype': index.dtype.str, 'values': index.asi8.tolist(), 'name': index.name,
+                'tz': _tz_name(index.dtype)}
+    return {'dtype': 'json', 'values': [str(v) if not isinstance(v, (int, float)) else v for v in index],
+            'name': index.name}
+
+
+def _decode_frame(payload, copy=True):
+    """清单 + 列字节 -> DataFrame"""
+    (manifest_size,) = struct.unpack_from('<I', payload)
+    manifest = json.loads(bytes(payload[4:4 + manifest_size]))
+    offset = 4 + manifest_size
+
+    data = {}
+    for column in manifest['columns']:
+        chunk = payload[offset:offset + column['nbytes']]
+        offset += column['nbytes']
+        if column['dtype'] == 'json':
+            # 按对象数组还原，空列不会被推断为 float64
+            data[column['name']] = pd.Series(json.loads(bytes(chunk)), dtype=object).to_numpy()
+        elif column.get('shuffle', True):
+            data[column['name']] = _unshuffle(chunk, np.dtype(column['dtype']))
+        else:
+            array = np.frombuffer(chunk, dtype=np.dtype(column['dtype']))
+            data[column['name']] = array.copy() if copy else array
+        if column.get('tz') is not None:
+            data[column['name']] = _localize(data[column['name']], column['tz'])
+
+    df = pd.DataFrame(data, columns=[column['name'] for column in manifest['columns']], copy=False)
+    index = manifest['index']
+    if index is not None:
+        if index['dtype'] == 'json':
+            df.index = pd.Index(index['values'], name=index['name'])
+        else:
+            df.index = _localize(pd.DatetimeIndex(
+                np.array(index['values'], dtype=np.int64).view(np.dtype(index['dtype'])),
+                name=index['name']
+            ), index.get('tz'))
+    return df
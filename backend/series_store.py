@@ -0,0 +1,133 @@
+"""
+紧凑序列存储模块
+含技术指标的历史数据按列保存为连续数组：int64 纪元时间（纳秒）与各数值列，
+成交量与指标列使用 float32（价格保留 float64），不再为每个范围分别缓存完整的 float64 DataFrame。
+
+各范围（如 7/30/90/365 天）的技术指标按该范围自身的数据计算，与未预热时单独计算该范围的结果一致；
+较短范围的时间、价格、成交量为最长范围的后缀时，直接使用最长范围数组的视图，只单独保存指标列。
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_COLUMNS
+
+
+# 数值列 -> 存储类型
+VALUE_DTYPES = {
+    'price': np.float64,
+    'volume': np.float32,
+    **{name: np.float32 for name in INDICATOR_COLUMNS}
+}
+
+# 各范围之间可共享的原始数据列（技术指标列与范围起点有关，不共享）
+SHARED_COLUMNS = ('timestamp', 'price', 'volume')
+
+# 按范围缓存的 DataFrame 每行的列数：timestamp、datetime 与各数值列（均为 8 字节）
+PER_KEY_COLUMNS = 2 + len(VALUE_DTYPES)
+
+
+class CompactSeriesStore:
+    """
+    紧凑序列存储
+
+    load() 一次替换各范围的数据（旧数组仍被已发出的视图引用时由其持有），frame() 返回只读视图。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ranges = {}
+        self.loaded_at = None
+
+    def load(self, frames):
+        """
+        替换各范围的数据
+
+        Args:
+            frames: 天数 -> 含技术指标的 DataFrame（按时间升序）；值为 None 的范围保留原有数据
+        """
+        ranges = {}
+        base = None
+        # 最长的范围先保存，较短的范围与其比较后复用原始数据列
+        for days in sorted(frames, reverse=True):
+            if frames[days] is None:
+                continue
+            ranges[days] = self._pack(frames[days], base)
+            if base is None:
+                base = ranges[days]
+
+        with self._lock:
+            self._ranges = {**self._ranges, **ranges}
+            self.loaded_at = datetime.now()
+
+    @staticmethod
+    def _pack(df, base):
+        # 复制为自有的连续数组，不引用 DataFrame 的数据块
+        columns = {'timestamp': np.array(df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64))}
+        columns.update({name: np.array(df[name].to_numpy(dtype=dtype)) for name, dtype in VALUE_DTYPES.items()})
+
+        rows = len(columns['timestamp'])
+        if base is not None and 0 < rows <= len(base['timestamp']):
+            suffix = {name: base[name][len(base[name]) - rows:] for name in SHARED_COLUMNS}
+            if all(np.array_equal(suffix[name], columns[name]) for name in SHARED_COLUMNS):
+                columns.update(suffix)
+
+        for array in columns.values():
+            array.flags.writeable = False
+        return columns
+
+    def frame(self, days, min_points=1):
+        """
+        days 天范围的数据（定时任务预热时的结果）
+
+        Args:
+            days: 天数，未预热的范围返回 None
+            min_points: 范围内少于该数据点数时返回 None（由调用方按原有逻辑加载）
+
+        Returns:
+            DataFrame: datetime / price / volume / 技术指标列，各列为存储数组的只读视图
+        """
+        with self._lock:
+            columns = self._ranges.get(days)
+        if columns is None or len(columns['timestamp']) < max(min_points, 1):
+            return None
+
+        data = {'datetime': columns['timestamp'].view('datetime64[ns]')}
+        data.update({name: columns[name] for name in VALUE_DTYPES})
+        return pd.DataFrame(data, copy=False)
+
+    def memory_report(self, ranges):
+        """
+        存储占用与按范围分别缓存 float64 DataFrame（含 timestamp、datetime 两列时间）的对比
+
+        Args:
+            ranges: 查询范围（天）列表，如 CACHE_WARM_DAYS
+
+        Returns:
+            dict: 各范围行数、紧凑存储字节数、按范围缓存的字节数及比例
+        """
+        with self._lock:
+            stored = dict(self._ranges)
+
+        rows = {f'{days}d': len(stored[days]['timestamp']) if days in stored else 0 for days in ranges}
+        # 共享的数组只计算一次（视图的 base 为持有数据的数组）
+        owners = {}
+        for columns in stored.values():
+            for array in columns.values():
+                owner = array if array.base is None else array.base
+                owners[id(owner)] = owner.nbytes
+        compact = sum(owners.values())
+        per_key = sum(rows.values()) * PER_KEY_COLUMNS * 8
+        return {
+            'rows': rows,
+            'compact_bytes': compact,
+            'per_key_frame_bytes': per_key,
+            'ratio': round(compact / per_key, 3) if per_key else None,
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+
+# 全局紧凑序列存储
+series_store = CompactSeriesStore()
@@ -0,0 +1,395 @@
+"""
+数据服务模块
+路由与定时任务共用的数据加载与计算逻辑（不涉及缓存与 HTTP 响应）
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from api import BitcoinAPI
+from database import db_manager
+from downsample import downsample_indices
+from indicators import IndicatorEngine, INDICATOR_COLUMNS, MIN_POINTS, rebase_frame
+from ohlcv import aggregate_ohlcv
+from resample import bars_frame
+from series_store import VALUE_DTYPES
+from utils import (
+    calculate_technical_indicators,
+    prepare_prediction_features,
+    calculate_risk_alerts
+)
+
+
+def load_historical_frame(days, with_indicators=True):
+    """
+    加载 days 天历史数据并计算技术指标
+
+    优先使用数据库中的小时级数据，数据不足时再调用 CoinGecko API。
+
+    Args:
+        days: 天数
+        with_indicators: 为 False 时只返回原始数据（datetime、price、volume），指标按需计算
+
+    Returns:
+        DataFrame: 含技术指标的数据，无可用数据时返回 None
+    """
+    # 对于30天以上的查询，优先使用数据库（小时级数据）
+    # 避免使用CoinGecko API返回的日级数据
+    if days >= 30:
+        print(f"📊 查询{days}天，优先从数据库获取小时级数据")
+        df = db_manager.get_historical_data(days=days)
+
+        # 如果数据库数据不足，才考虑API（但会得到不同粒度的数据）
+        if df is None or df.empty:
+            print("⚠️ 数据库无数据，尝试API获取")
+            df = BitcoinAPI.fetch_historical_data(days)
+    else:
+        # 30天以内，优先从数据库获取
+        print(f"📊 从数据库获取{days}天历史数据")
+        df = db_manager.get_historical_data(days=days)
+
+        # 如果数据库没有足够数据，再尝试API
+        if df is None or df.empty or len(df) < days * 12:  # 每天至少12个数据点
+            print("⚠️ 数据库数据不足，尝试API获取")
+            df_api = BitcoinAPI.fetch_historical_data(days)
+            if df_api is not None and not df_api.empty:
+                df = df_api
+            elif df is not None and not df.empty:
+                # API失败，使用数据库的数据（即使不足）
+                print("⚠️ API失败，使用数据库现有数据")
+
+    if df is None or df.empty:
+        return None
+    if not with_indicators:
+        return df
+
+    # 计算技术指标
+    df = calculate_technical_indicators(df)
+    print(f"✅ 计算{days}天技术指标（{len(df)}条记录）")
+    return df
+
+
+def min_historical_points(days):
+    """数据库中 days 天的数据至少应有的数据点数，不足时改用 load_historical_frame 的原有逻辑"""
+    return max(MIN_POINTS, days * 12) if days < 30 else MIN_POINTS
+
+
+# 各范围的增量指标引擎（缓存 key -> IndicatorEngine），与上一次返回的指标帧对应；
+# 只在定时任务的预热线程中更新
+_indicator_engines = {}
+
+
+def refresh_historical_frame(days, previous=None):
+    """
+    增量刷新 days 天含技术指标的历史数据（定时任务预热缓存时调用）
+
+    已有上一版结果与对应的指标引擎时，只对数据库中新增的数据点做 O(1) 更新
+    （窗口起点后移时先用 rebase_frame 修正保留的数据点，结果与全量计算一致）；
+    进程重启后先从 technical_cache 恢复上一版结果与引擎状态。
+    数据库数据不足或已有数据被改写（如回填了更早的数据）时退回全量计算。
+
+    Args:
+        days: 天数
+        previous: 上一版结果（如紧凑序列存储的视图），可为 None
+
+    Returns:
+        DataFrame: 含技术指标的数据，无可用数据时返回 None
+    """
+    key = f'historical_{days}d'
+    df = db_manager.get_historical_data(days=days)
+    if df is None or len(df) < min_historical_points(days):
+        # 数据不足时沿用原有逻辑（可能改用 API 数据），不维护增量状态
+        _indicator_engines.pop(key, None)
+        return load_historical_frame(days)
+
+    engine = _indicator_engines.get(key)
+    if previous is None or engine is None:
+        previous, engine = _restore_indicator_state(key)
+
+    result = _extend_frame(previous, engine, df) if engine is not None else None
+    if result is None:
+        result = calculate_technical_indicators(df)
+        engine = IndicatorEngine.from_frame(result)
+        print(f"✅ 计算{days}天技术指标（{len(result)}条记录）")
+
+    _indicator_engines[key] = engine
+    db_manager.save_cache(f'indicator_frame_{key}', result)
+    db_manager.save_cache(f'indicator_state_{key}', engine.to_state())
+    return result
+
+
+def _restore_indicator_state(key):
+    """从 technical_cache 恢复上一版指标帧与引擎状态，缺失时返回 (None, None)"""
+    frame = db_manager.get_cache(f'indicator_frame_{key}')
+    state = db_manager.get_cache(f'indicator_state_{key}')
+    if frame is None or state is None:
+        return None, None
+    try:
+        return frame, IndicatorEngine.from_state(state)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"⚠️ 指标引擎状态无效，将全量计算: {e}")
+        return None, None
+
+
+def _extend_frame(previous, engine, df):
+    """
+    将数据库新增的数据点追加到上一版指标帧
+
+    只有 df 在上一版末尾之前的部分与上一版完全一致（同样的时间点与价格）时才能增量计算，
+    否则返回 None。
+    """
+    if previous is None or previous.empty or engine.last_timestamp is None:
+        return None
+    if not set(INDICATOR_COLUMNS) <= set(previous.columns) <= set(df.columns) | set(INDICATOR_COLUMNS):
+        return None
+    if pd.Timestamp(previous['datetime'].iloc[-1]) != engine.last_timestamp:
+        return None
+
+    old = previous[previous['datetime'] >= df['datetime'].iloc[0]]
+    if old.empty or len(old) > len(df):
+        return None
+    head = df.iloc[:len(old)]
+    unchanged = (
+        np.array_equal(head['datetime'].to_numpy(), old['datetime'].to_numpy())
+        and np.array_equal(head['price'].to_numpy(), old['price'].to_numpy())
+    )
+    if not unchanged:
+        return None
+
+    if len(old) < len(previous):
+        # 窗口起点后移：保留的数据点不足以修正时全量计算
+        if len(old) < MIN_POINTS:
+            return None
+        old = rebase_frame(old, engine)
+
+    new = df.iloc[len(old):].reset_index(drop=True)
+    if new.empty:
+        return old.reset_index(drop=True)
+    rows = engine.update_many(new['price'].to_numpy(), new['datetime'].tolist())
+    appended = pd.concat([new, rows], axis=1)[previous.columns]
+    return pd.concat([old, appended], ignore_index=True)
+
+
+# /api/historical 的字段 -> (DataFrame 列, 保留小数位)
+HISTORICAL_FIELDS = {
+    'timestamps': ('datetime', None),
+    'prices': ('price', 2),
+    'volumes': ('volume', 0),
+    'ma_5': ('ma_5', 2),
+    'ma_10': ('ma_10', 2),
+    'ma_20': ('ma_20', 2),
+    'rsi': ('rsi', 2),
+    'macd': ('macd', 2),
+    'macd_signal': ('macd_signal', 2),
+    'bb_upper': ('bb_upper', 2),
+    'bb_middle': ('bb_middle', 2),
+    'bb_lower': ('bb_lower', 2),
+    'volatility': ('volatility', 2)
+}
+
+
+def format_minutes(series):
+    """将时间列格式化为 'YYYY-MM-DD HH:MM' 字符串列表（向量化，避免逐行 strftime）"""
+    if series.dt.tz is not None:
+        return series.dt.strftime('%Y-%m-%d %H:%M').tolist()
+    labels = np.datetime_as_string(series.to_numpy(dtype='datetime64[m]'), unit='m')
+    return np.char.replace(labels, 'T', ' ').tolist()
+
+
+def format_historical(df, fields=None):
+    """
+    将含技术指标的 DataFrame 转换为 /api/historical 的 data 字段（各序列为列表）
+
+    Args:
+        df: 至少包含 fields 对应的列
+        fields: 需要的字段（HISTORICAL_FIELDS 的 key），None 表示全部
+    """
+    data = {}
+    for field in fields or HISTORICAL_FIELDS:
+        column, decimals = HISTORICAL_FIELDS[field]
+        if decimals is None:
+            data[field] = format_minutes(df[column])
+        else:
+            # 先转为紧凑序列存储的类型（与数据来自预热结果还是单独计算无关），
+            # 再转为 float64 取整，避免输出 58701.44921875 这类值
+            values = df[column].to_numpy(dtype=VALUE_DTYPES.get(column, np.float64))
+            data[field] = np.round(values.astype(np.float64), decimals).tolist()
+    return data
+
+
+def historical_arrays(df, fields=None):
+    """
+    format_historical 的数组版本（列式二进制响应使用）：直接返回各列的 NumPy 数组，不取整、不生成列表
+
+    数值列统一为紧凑序列存储的类型（价格 float64，其余 float32），与数据来自哪条路径无关。
+
+    Returns:
+        dict: 字段 -> np.ndarray，timestamps 为纪元毫秒（float64）
+    """
+    arrays = {}
+    for field in fields or HISTORICAL_FIELDS:
+        column, decimals = HISTORICAL_FIELDS[field]
+        if decimals is None:
+            values = df[column].to_numpy(dtype='datetime64[ms]').astype(np.int64).astype(np.float64)
+        else:
+            values = df[column].to_numpy(dtype=VALUE_DTYPES[column])
+        arrays[field] = values
+    return arrays
+
+
+# 降采样时使用最小 / 最大值保留的列（其余折线以价格的 LTTB 结果为准）
+ENVELOPE_COLUMNS = ('volume', 'volatility')
+
+# max_points 允许的最小值
+MIN_DOWNSAMPLE_POINTS = 10
+
+
+def downsample_historical(df, max_points, fields=None):
+    """
+    按 max_points 降采样历史数据（各序列共用时间轴，返回选中的原始行）
+
+    Args:
+        df: 按时间升序、含 fields 对应列的 DataFrame
+        max_points: 最多返回的数据点数
+        fields: 返回的字段（HISTORICAL_FIELDS 的 key），None 表示全部
+
+    Returns:
+        DataFrame: 选中的行；数据点不超过 max_points 时原样返回
+    """
+    if len(df) <= max_points:
+        return df
+    columns = [HISTORICAL_FIELDS[field][0] for field in fields or HISTORICAL_FIELDS if field != 'timestamps']
+    envelopes = [column for column in columns if column in ENVELOPE_COLUMNS]
+    # 主折线优先使用价格，只请求包络列时不再单独选点
+    lines = [column for column in columns if column not in ENVELOPE_COLUMNS][:1]
+    if 'price' in columns:
+        lines = ['price']
+
+    x = df['datetime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    indices = downsample_indices(
+        x,
+        [df[column].to_numpy() for column in lines],
+        [df[column].to_numpy() for column in envelopes],
+        max_points
+    )
+    return df.take(indices)
+
+
+def format_candlestick(bars, interval='1d'):
+    """将 K 线 DataFrame 转换为 /api/candlestick 的 data 字段（日K 的时间只保留日期）"""
+    return {
+        'dates': bars['datetime'].dt.strftime('%Y-%m-%d').tolist() if interval == '1d' else format_minutes(bars['datetime']),
+        'data': bars[['open', 'close', 'low', 'high']].round(2).values.tolist(),
+        'volumes': bars['volume'].round(0).tolist()
+    }
+
+
+def aggregate_candlestick(df, interval='1d'):
+    """
+    由原始价格数据按整数纪元时间分桶聚合 K 线（只读取列数组，不修改 df）
+
+    Args:
+        df: 按时间升序的 datetime / price / volume 数据
+        interval: K 线周期
+
+    Returns:
+        DataFrame: datetime / open / high / low / close / price / volume / count
+    """
+    return bars_frame(aggregate_ohlcv(
+        df['datetime'].to_numpy(), df['price'].to_numpy(), df['volume'].to_numpy(), interval
+    ))
+
+
+def compute_statistics(days=7, df=None):
+    """计算统计数据，获取数据失败时返回 None（df 为已加载的 days 天数据时直接使用）"""
+    if df is None:
+        df = BitcoinAPI.fetch_historical_data(days)
+    if df is None or df.empty:
+        return None
+
+    # 计算24小时数据
+    data_24h = df.tail(min(288, len(df)))
+
+    return {
+        'current_price': float(df['price'].iloc[-1]),
+        'high_24h': float(data_24h['price'].max()),
+        'low_24h': float(data_24h['price'].min()),
+        'avg_price': float(df['price'].mean()),
+        'total_volume': float(df['volume'].sum()),
+        'avg_volume': float(df['volume'].mean()),
+        'price_change_24h': float(
+            ((df['price'].iloc[-1] - data_24h['price'].iloc[0]) /
+             data_24h['price'].iloc[0] * 100)
+        ) if len(data_24h) > 0 else 0,
+        'volatility': float(df['price'].std()),
+        'max_price': float(df['price'].max()),
+        'min_price': float(df['price'].min())
+    }
+
+
+def compute_prediction(df=None):
+    """价格预测，数据不足时返回 None（df 为已加载的 7 天数据时直接使用）"""
+    if df is None:
+        df = BitcoinAPI.fetch_historical_data(days=7)
+    if df is None or df.empty or len(df) < 20:
+        return None
+
+    # 特征工程
+    df = prepare_prediction_features(df)
+
+    # 准备训练数据
+    feature_cols = ['price', 'volume', 'hour', 'day_of_week', 'returns', 'ma_5', 'ma_10']
+
+    if len(df) < 15:
+        # 数据太少，使用简单预测
+        current_price = float(df['price'].iloc[-1])
+        trend = df['price'].tail(5).pct_change().mean()
+        prediction = current_price * (1 + trend)
+    else:
+        X = df[feature_cols].iloc[:-5]
+        y = df['price'].iloc[5:]
+
+        if len(X) < 10:
+            current_price = float(df['price'].iloc[-1])
+            prediction = current_price
+        else:
+            # 训练模型
+            model = RandomForestRegressor(n_estimators=30, max_depth=10, random_state=42)
+            model.fit(X[:min(len(X), 100)], y[:min(len(y), 100)])
+
+            # 预测 - 保持 DataFrame 格式以避免警告
+            last_features = df[feature_cols].iloc[-1:]
+            prediction = float(model.predict(last_features)[0])
+
+    current_price = float(df['price'].iloc[-1])
+    change_pct = ((prediction - current_price) / current_price) * 100
+
+    return {
+        'current_price': round(current_price, 2),
+        'predicted_price': round(prediction, 2),
+        'change_percent': round(change_pct, 2),
+        'direction': 'up' if change_pct > 0 else 'down',
+        'confidence': 'medium',
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def compute_risk_alerts(days=7, recent=50, limit=10):
+    """
+    计算风险警报，获取数据失败时返回空列表
+
+    优先使用数据库数据（结果与数据版本对应，可按版本缓存），数据库无数据时调用 API。
+
+    Args:
+        days: 数据范围（天）
+        recent: 只检查最近 N 个数据点，None 表示整个范围（历史警报回顾）
+        limit: 最多返回的警报数，None 表示全部
+    """
+    df = db_manager.get_historical_data(days=days)
+    if df is None or df.empty:
+        df = BitcoinAPI.fetch_historical_data(days)
+    if df is None or df.empty:
+        return []
+    return calculate_risk_alerts(df, recent=recent, limit=limit)
@@ -0,0 +1,263 @@
+"""
+跨进程共享缓存模块
+同一主机上的多个 WSGI worker 共用一份缓存：条目以文件形式存放在共享目录（默认 /dev/shm），
+读取时通过 mmap 构造只读数组视图，各进程共享同一份物理内存页。
+
+- 条目写入临时文件后 os.replace，读取方不会看到半写的数据
+- 创建 / 过期时间使用墙上时间：共享目录可能跨重启保留（tempfile 目录或持久化存储），
+  CLOCK_MONOTONIC 在重启后从零开始，不能写入文件
+- 请求频率计数与按 key 的计算互斥使用 fcntl 文件锁
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import serialization
+from cache import CacheManager
+from config import CACHE_SHARED_DIR
+
+
+# 条目文件头: created | expires_at（NaN 表示不过期）| 写入时间，均为墙上时间（time.time()）；
+# 布局与旧版本相同，旧版本写入的 monotonic 时间远早于当前墙上时间，读取时视为已过期
+ENTRY_HEADER = struct.Struct('<ddd')
+# expires_at 在文件中的偏移，invalidate 原地改写
+EXPIRES_OFFSET = 8
+
+# 请求频率计数文件: 窗口起点（墙上时间）| 计数
+RATE_STATE = struct.Struct('<dq')
+
+
+class SharedCacheManager(CacheManager):
+    """
+    跨进程共享的缓存管理器
+
+    与 CacheManager 接口相同（get_cache / set_cache / is_cache_valid / get_or_compute ...），
+    进程内只保留每个条目解码后的 mmap 视图，文件变化时重新映射。
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        super().__init__(max_bytes=max_bytes)
+        self.directory = directory or CACHE_SHARED_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+        # 进程内的解码结果：key -> (文件标识, 数据)
+        self._views = {}
+        self._views_lock = threading.Lock()
+
+    # ---------- 文件布局 ----------
+
+    def _path(self, key, suffix='.bin'):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        safe = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in key)[:64]
+        return os.path.join(self.directory, f'{safe}-{digest}{suffix}')
+
+    @contextmanager
+    def _file_lock(self, name, blocking=True):
+        """基于 fcntl.flock 的跨进程锁，非阻塞获取失败时 yield False"""
+        with open(os.path.join(self.directory, name), 'a+b') as handle:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(handle, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_header(self, path):
+        try:
+            with open(path, 'rb') as handle:
+                return ENTRY_HEADER.unpack(handle.read(ENTRY_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return None
+
+    def _load(self, key):
+        """返回条目数据（mmap 视图，按文件 inode/mtime 复用进程内解码结果）"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._views_lock:
+                self._views.pop(key, None)
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._views_lock:
+            cached = self._views.get(key)
+            if cached is not None and cached[0] == identity:
+                return cached[1]
+
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        data = serialization.decode(memoryview(mapped)[ENTRY_HEADER.size:], copy=False)
+
+        with self._views_lock:
+            self._views[key] = (identity, data)
+        return data
+
+    # ---------- CacheManager 接口 ----------
+
+    def get_cache(self, key):
+        header = self._read_header(self._path(key))
+        if header is None:
+            return {'last_update': None, 'data': None}
+        data = self._load(key)
+        return {'last_update': datetime.fromtimestamp(header[2]), 'data': data}
+
+    def set_cache(self, key, data, ttl=None):
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else math.nan
+        # 不压缩、不重排，读取方可直接在 mmap 上构造视图
+        blob = serialization.encode(data, codec=serialization.CODEC_NONE, shuffle=False)
+
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(ENTRY_HEADER.pack(now, expires_at, now))
+            handle.write(blob)
+        os.replace(tmp_path, path)
+        self._evict_files(keep=path)
+
+    def is_cache_valid(self, key, max_age_seconds=3600):
+        header = self._read_header(self._path(key))
+        now = time.time()
+        # 时钟回拨导致条目"来自未来"时同样视为失效
+        valid = (
+            header is not None
+            and (math.isnan(header[1]) or now < header[1])
+            and 0 <= now - header[0] < max_age_seconds
+        )
+        with self._lock:
+            self._stats['hits' if valid else 'misses'] += 1
+        return valid
+
+    def invalidate(self, key):
+        try:
+            with open(self._path(key), 'r+b') as handle:
+                handle.seek(EXPIRES_OFFSET)
+                handle.write(struct.pack('<d', time.time()))
+        except FileNotFoundError:
+            pass
+
+    def get_or_compute(self, key, compute, max_age_seconds=3600, ttl=None,
+                       stale_while_revalidate=False):
+        if self.is_cache_valid(key, max_age_seconds=max_age_seconds):
+            return self.get_cache(key)['data']
+
+        stale = self.get_cache(key)['data']
+
+        def refresh(blocking=True):
+            # 跨进程互斥：同一时刻只有一个 worker 计算该 key，其余 worker 等待后直接读取
+            with self._file_lock(os.path.basename(self._path(key, '.lock')), blocking=blocking) as acquired:
+                if not acquired:
+                    return stale
+                if self.is_cache_valid(key, max_age_seconds=max_age_seconds):
+                    return self.get_cache(key)['data']
+                result = compute()
+                if result is not None:
+                    self.set_cache(key, result, ttl=ttl)
+                return result
+
+        if stale_while_revalidate and stale is not None:
+            with self._lock:
+                self._stats['stale_served'] += 1
+            # 其他 worker 已在刷新时不等待
+            self._revalidate_in_background(key, lambda: refresh(blocking=False))
+            return stale
+
+        return self.single_flight(key, refresh)
+
+    def clear_cache(self, key):
+        try:
+            os.remove(self._path(key))
+            print(f"🗑️ 清除缓存: {key}")
+        except FileNotFoundError:
+            pass
+
+    def clear_all_cache(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        print("🗑️ 清除所有缓存")
+
+    def _entry_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def _evict_files(self, keep=None):
+        """共享目录超出内存预算时，按写入时间从旧到新删除条目文件"""
+        files = sorted(self._entry_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats['evictions'] += 1
+
+    # ---------- 跨进程的请求频率限制 ----------
+
+    def _update_rate_state(self, window, increment):
+        with self._file_lock('rate_limit.lock'):
+            path = os.path.join(self.directory, 'rate_limit.state')
+            try:
+                with open(path, 'rb') as handle:
+                    last_reset, count = RATE_STATE.unpack(handle.read(RATE_STATE.size))
+            except (FileNotFoundError, struct.error):
+                last_reset, count = time.time(), 0
+
+            now = time.time()
+            if window is not None and not 0 <= now - last_reset <= window:
+                last_reset, count = now, 0
+            count += increment
+
+            with open(path, 'wb') as handle:
+                handle.write(RATE_STATE.pack(last_reset, count))
+            return count
+
+    def check_rate_limit(self, limit=10, window=60):
+        return self._update_rate_state(window, 0) < limit
+
+    def increment_request_count(self):
+        self._update_rate_state(None, 1)
+
+    def stats(self):
+        files = self._entry_files()
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(files),
+                'bytes': sum(size for _, size, _ in files),
+                'max_bytes': self.max_bytes,
+                'backend': 'shared',
+                'directory': self.directory
+            }
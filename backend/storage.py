@@ -0,0 +1,353 @@
+"""
+存储后端模块
+封装与具体数据库相关的部分（连接、建表语句、方言差异），
+DatabaseManager 通过统一接口访问 MySQL 或嵌入式 SQLite
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+from config import DATA_RETENTION_DAYS, DB_BACKEND, DB_PARTITION_PRECREATE_DAYS, SQLITE_PATH
+from ohlcv import ROLLUP_INTERVALS
+
+
+def rollup_table(interval):
+    """K 线汇总表名，如 price_ohlcv_1h"""
+    return f'price_ohlcv_{interval}'
+
+
+def day_partition_definitions(start_day, end_day):
+    """[start_day, end_day] 每天一个 RANGE 分区的定义，分区名为 pYYYYMMDD"""
+    definitions = []
+    day = start_day
+    while day <= end_day:
+        upper = day + timedelta(days=1)
+        definitions.append(
+            f"PARTITION p{day:%Y%m%d} VALUES LESS THAN ('{upper:%Y-%m-%d %H:%M:%S}')"
+        )
+        day = upper
+    return definitions
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    # 用于日志输出的后端名称
+    label = 'Storage'
+    # 是否支持按时间分区（不支持时数据保留只能逐行 DELETE）
+    supports_partitions = False
+
+    def create_engine(self):
+        """创建 SQLAlchemy 引擎"""
+        raise NotImplementedError
+
+    def schema_statements(self):
+        """返回建表语句列表"""
+        raise NotImplementedError
+
+    def insert_ignore_sql(self, table, columns):
+        """返回忽略重复键的 INSERT 语句"""
+        raise NotImplementedError
+
+    def upgrade_schema(self, conn):
+        """升级旧版本创建的表结构"""
+
+    def replace_sql(self, table, columns):
+        """返回插入或覆盖的语句"""
+        placeholders = ', '.join(f':{col}' for col in columns)
+        return f"REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def list_partitions(self, conn, table):
+        """
+        返回表的时间分区列表 [(分区名, 上界 datetime 或 None)]
+
+        不支持或未分区时返回 None，由调用方退回到 DELETE 清理。
+        """
+        return None
+
+    def ensure_partitions(self, conn, table, start_day, end_day):
+        """确保 [start_day, end_day] 的每一天都有独立分区"""
+
+    def drop_partitions(self, conn, table, names):
+        """删除整个分区（O(1)，不逐行删除）"""
+        raise NotImplementedError
+
+
+class MySQLBackend(StorageBackend):
+    """MySQL 存储后端"""
+
+    label = 'MySQL'
+    supports_partitions = True
+
+    def __init__(self):
+        # 数据库连接配置
+        self.db_config = {
+            'host': os.getenv('MYSQL_HOST', 'localhost'),
+            'port': int(os.getenv('MYSQL_PORT', 3306)),
+            'user': os.getenv('MYSQL_USER', 'bitcoin_user'),
+            'password': os.getenv('MYSQL_PASSWORD', 'bitcoin123'),
+            'database': os.getenv('MYSQL_DATABASE', 'bitcoin_db'),
+            'charset': 'utf8mb4'
+        }
+
+    def create_engine(self):
+        connection_string = (
+            f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}"
+            f"@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
+            f"?charset=utf8mb4"
+        )
+        return create_engine(connection_string, pool_pre_ping=True)
+
+    def schema_statements(self):
+        return [
+            # 历史价格数据表：按天 RANGE 分区，过期数据整分区删除。
+            # 分区键必须包含在所有唯一键中，因此主键为 (id, timestamp)；
+            # 初始只有 p_future，具体日分区由 ensure_partitions 创建
+            '''
+            CREATE TABLE IF NOT EXISTS price_history (
+                id INT AUTO_INCREMENT,
+                timestamp DATETIME NOT NULL,
+                price DECIMAL(20, 8) NOT NULL,
+                volume DECIMAL(20, 8) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, timestamp),
+                UNIQUE KEY uk_timestamp (timestamp)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            PARTITION BY RANGE COLUMNS(timestamp) (
+                PARTITION p_future VALUES LESS THAN (MAXVALUE)
+            )
+            ''',
+            # 技术指标缓存表
+            '''
+            CREATE TABLE IF NOT EXISTS technical_cache (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                cache_key VARCHAR(255) UNIQUE NOT NULL,
+                data LONGBLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_cache_key (cache_key)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            ''',
+        ] + [
+            # K 线汇总表（每小时 / 每天一行）
+            f'''
+            CREATE TABLE IF NOT EXISTS {rollup_table(interval)} (
+                bucket_start DATETIME NOT NULL PRIMARY KEY,
+                open DECIMAL(20, 8) NOT NULL,
+                high DECIMAL(20, 8) NOT NULL,
+                low DECIMAL(20, 8) NOT NULL,
+                close DECIMAL(20, 8) NOT NULL,
+                volume DECIMAL(30, 8) NOT NULL,
+                point_count INT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            '''
+            for interval in ROLLUP_INTERVALS
+        ]
+
+    def insert_ignore_sql(self, table, columns):
+        placeholders = ', '.join(f':{col}' for col in columns)
+        return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def upgrade_schema(self, conn):
+        # technical_cache.data 由 LONGTEXT（JSON）改为 LONGBLOB（二进制格式），旧数据仍可读取
+        data_type = conn.execute(text('''
+            SELECT DATA_TYPE
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = 'technical_cache'
+              AND COLUMN_NAME = 'data'
+        ''')).scalar()
+        if data_type and data_type.lower() != 'longblob':
+            conn.execute(text('ALTER TABLE technical_cache MODIFY data LONGBLOB NOT NULL'))
+
+        self.partition_price_history(conn)
+
+    def partition_price_history(self, conn):
+        """
+        将旧版本创建的未分区 price_history 迁移为按天分区
+
+        分区列必须包含在每个唯一键中，主键由 (id) 改为 (id, timestamp)；
+        保留期内的日分区一次建好，整张表只复制一次。迁移失败时保持原表，数据保留退回到 DELETE。
+
+        Returns:
+            bool: 是否执行了迁移
+        """
+        if self.list_partitions(conn, 'price_history') is not None:
+            return False
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        definitions = day_partition_definitions(
+            today - timedelta(days=DATA_RETENTION_DAYS),
+            today + timedelta(days=DB_PARTITION_PRECREATE_DAYS)
+        )
+        definitions.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+
+        primary_key = conn.execute(text('''
+            SELECT GROUP_CONCAT(COLUMN_NAME ORDER BY ORDINAL_POSITION)
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = 'price_history'
+              AND CONSTRAINT_NAME = 'PRIMARY'
+        ''')).scalar()
+        alter = '' if primary_key == 'id,timestamp' else 'DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp) '
+
+        print("🔧 price_history 尚未分区，正在迁移为按天分区（整表复制一次，数据量大时耗时较长）...")
+        try:
+            conn.execute(text(
+                f"ALTER TABLE price_history {alter}"
+                f"PARTITION BY RANGE COLUMNS(timestamp) ({', '.join(definitions)})"
+            ))
+        except Exception as e:
+            print(f"⚠️ price_history 分区迁移失败，过期数据将逐行 DELETE 清理: {e}")
+            return False
+        print(f"✅ price_history 已迁移为按天分区（{len(definitions)} 个分区）")
+        return True
+
+    def list_partitions(self, conn, table):
+        rows = conn.execute(text('''
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = :table
+              AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        '''), {'table': table}).fetchall()
+        if not rows:
+            # 旧版本创建的表没有分区
+            return None
+
+        partitions = []
+        for name, description in rows:
+            bound = description.strip("'")
+            partitions.append((name, None if bound == 'MAXVALUE' else datetime.fromisoformat(bound)))
+        return partitions
+
+    def ensure_partitions(self, conn, table, start_day, end_day):
+        partitions = self.list_partitions(conn, table)
+        if partitions is None:
+            return
+
+        bounds = [bound for _, bound in partitions if bound is not None]
+        # 新分区从已有最后一个上界（或 start_day）开始，每天一个；
+        # 停机太久时不补建保留期之前的分区
+        definitions = day_partition_definitions(max(bounds + [start_day]), end_day)
+        if not definitions:
+            return
+
+        definitions.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+        # p_future 通常为空，拆分它只需修改元数据
+        conn.execute(text(
+            f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})"
+        ))
+
+    def drop_partitions(self, conn, table, names):
+        if names:
+            conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}"))
+
+
+class SQLiteBackend(StorageBackend):
+    """嵌入式 SQLite 存储后端（WAL 模式），适用于开发、CI 和单机部署"""
+
+    label = 'SQLite'
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+
+    def create_engine(self):
+        # Python 3.12 起 sqlite3 默认的 datetime 适配器已弃用，显式注册；
+        # 与 MySQL DATETIME 一致只保留到秒，保证 UNIQUE(timestamp) 去重语义相同
+        sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' ', timespec='seconds'))
+
+        if self.path == ':memory:':
+            # 内存库只存在于单个连接中，所有线程共享同一连接
+            engine = create_engine(
+                'sqlite://',
+                connect_args={'check_same_thread': False},
+                poolclass=StaticPool
+            )
+        else:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            engine = create_engine(
+                f'sqlite:///{self.path}',
+                connect_args={'check_same_thread': False, 'timeout': 30}
+            )
+
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.close()
+
+        return engine
+
+    def schema_statements(self):
+        return [
+            # 历史价格数据表（UNIQUE 约束自带索引）
+            '''
+            CREATE TABLE IF NOT EXISTS price_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL UNIQUE,
+                price REAL NOT NULL,
+                volume REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            # 技术指标缓存表
+            '''
+            CREATE TABLE IF NOT EXISTS technical_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cache_key TEXT UNIQUE NOT NULL,
+                data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+        ] + [
+            # K 线汇总表（每小时 / 每天一行）
+            f'''
+            CREATE TABLE IF NOT EXISTS {rollup_table(interval)} (
+                bucket_start DATETIME NOT NULL PRIMARY KEY,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                point_count INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            '''
+            for interval in ROLLUP_INTERVALS
+        ]
+
+    def insert_ignore_sql(self, table, columns):
+        placeholders = ', '.join(f':{col}' for col in columns)
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+# 可选的存储后端
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def create_backend(name=None):
+    """
+    根据配置创建存储后端
+
+    Args:
+        name: 后端名称（mysql / sqlite），默认读取 config.DB_BACKEND
+
+    Returns:
+        StorageBackend: 存储后端实例
+    """
+    name = (name or DB_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name} (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
@@ -0,0 +1,213 @@
+"""
+实时推送模块（Server-Sent Events）
+单个后台轮询线程定期读取各面板数据，计算与上一次的差异后广播给所有订阅者：
+后端负载与打开的仪表板数量无关。
+
+事件:
+    snapshot  新连接或积压后重新同步时发送的完整数据
+    delta     仅包含变化的面板；历史数据与K线只包含新增 / 更新的数据点，
+              更早的数据点有变化时整体替换（since 为 None）
+"""
+import json
+import queue
+import threading
+import time
+from bisect import bisect_left
+
+from config import STREAM_POLL_INTERVAL, STREAM_HEARTBEAT, STREAM_QUEUE_SIZE
+from dashboard import collect_panels
+
+
+# 整体替换的面板，及按时间键增量更新的序列面板
+SCALAR_PANELS = ('statistics', 'prediction', 'risk_alerts')
+SERIES_PANELS = {'historical': 'timestamps', 'candlestick': 'dates'}
+
+
+def series_delta(previous, current, key):
+    """
+    计算序列面板的增量
+
+    Returns:
+        dict: since（从该时间键起替换，None 表示整体替换）、window_start（客户端丢弃更早的点）、rows；
+        无变化时返回 None
+    """
+    if current is None or not current[key]:
+        return None
+    if previous is None or not previous[key]:
+        return {'since': None, 'window_start': current[key][0], 'rows': current}
+
+    # 上次发送的最后一个点可能被更新，从它开始重新发送
+    last = previous[key][-1]
+    start = bisect_left(current[key], last)
+    if start >= len(current[key]):
+        # 数据整体早于上次发送的内容（如数据被重建），整体替换
+        return {'since': None, 'window_start': current[key][0], 'rows': current}
+
+    # 窗口内更早的点（及列）必须与上次发送的一致，否则客户端无法只替换尾部，整体替换
+    overlap = bisect_left(previous[key], current[key][0])
+    changed = current.keys() != previous.keys() or any(
+        values[:start] != previous[name][overlap:-1] for name, values in current.items()
+    )
+    if changed:
+        return {'since': None, 'window_start': current[key][0], 'rows': current}
+
+    rows = {name: values[start:] for name, values in current.items()}
+
+    unchanged = (
+        len(rows[key]) == 1
+        and current[key][0] == previous[key][0]
+        and all(rows[name] == previous[name][-1:] for name in rows)
+    )
+    if unchanged:
+        return None
+    return {'since': last, 'window_start': current[key][0], 'rows': rows}
+
+
+def diff_panels(previous, current):
+    """计算两次面板数据的差异，只包含发生变化的面板"""
+    delta = {}
+    for name in SCALAR_PANELS:
+        if current.get(name) is not None and current[name] != previous.get(name):
+            delta[name] = current[name]
+    for name, key in SERIES_PANELS.items():
+        change = series_delta(previous.get(name), current.get(name), key)
+        if change is not None:
+            delta[name] = change
+    return delta
+
+
+def format_event(event, data, event_id=None):
+    """编码为 SSE 消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """一个 SSE 连接：有界消息队列，积压时丢弃并改发完整快照"""
+
+    def __init__(self, max_size):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.resyncs = 0
+
+
+class StreamHub:
+    """
+    推送中心
+
+    后台线程每 poll_interval 秒读取一次面板数据，编码一次后放入所有订阅者的队列；
+    没有订阅者时线程退出。
+    """
+
+    def __init__(self, poll_interval=None, heartbeat=None, queue_size=None):
+        self.poll_interval = poll_interval or STREAM_POLL_INTERVAL
+        self.heartbeat = heartbeat or STREAM_HEARTBEAT
+        self.queue_size = queue_size or STREAM_QUEUE_SIZE
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # 最近一次面板数据；快照事件在需要时才编码，同一序号只编码一次
+        self._panels = None
+        self._sequence = 0
+        self._snapshot = (None, None)
+        self._stats = {'polls': 0, 'deltas': 0, 'resyncs': 0}
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._panels is not None:
+                subscriber.queue.put_nowait(self._snapshot_locked())
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stream-poller', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def events(self, subscriber):
+        """SSE 响应体生成器，空闲时发送心跳注释以便及时发现断开的连接"""
+        try:
+            while True:
+                try:
+                    yield subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    def poll_once(self):
+        """读取一次面板数据并广播差异"""
+        panels = collect_panels()
+        with self._lock:
+            previous = self._panels or {}
+            # 读取失败的面板保留上一次的数据
+            for name, value in previous.items():
+                if panels.get(name) is None:
+                    panels[name] = value
+            delta = diff_panels(previous, panels)
+            self._panels = panels
+            self._stats['polls'] += 1
+            if not delta and previous:
+                return None
+
+            self._sequence += 1
+            # 首次轮询时没有差异基准，只发送快照
+            event = format_event('delta', delta, self._sequence) if previous else self._snapshot_locked()
+            self._stats['deltas'] += 1
+            self._broadcast_locked(event)
+            return delta
+
+    def _snapshot_locked(self):
+        sequence, event = self._snapshot
+        if sequence != self._sequence:
+            event = format_event('snapshot', self._panels, self._sequence)
+            self._snapshot = (self._sequence, event)
+        return event
+
+    def _broadcast_locked(self, event):
+        for subscriber in self._subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+            except queue.Full:
+                # 慢客户端：丢弃积压的消息，改为发送完整快照，客户端据此重新同步
+                self._drain(subscriber.queue)
+                subscriber.queue.put_nowait(self._snapshot_locked())
+                subscriber.resyncs += 1
+                self._stats['resyncs'] += 1
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"❌ 推送轮询失败: {e}")
+            time.sleep(max(self.poll_interval - (time.monotonic() - started), 0))
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'subscribers': len(self._subscribers), 'poll_interval': self.poll_interval}
+
+
+# 全局推送中心
+stream_hub = StreamHub()
@@ -0,0 +1,67 @@
+"""
+测试公共配置
+在导入后端模块之前改用临时 SQLite 数据库，测试不会连接或写入应用数据库。
+"""
+import os
+import tempfile
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='btc-tests-'), 'test.db')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_history(hours, seed=7, end=None, freq='h'):
+    """以 end（默认当前整点）结尾、按 freq 间隔的随机游走价格数据"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().floor('h')
+    return pd.DataFrame({
+        'datetime': pd.date_range(end=end, periods=hours, freq=freq),
+        'price': 60000 * np.exp(np.cumsum(rng.normal(0, 0.01, hours))),
+        'volume': rng.uniform(1e8, 1e9, hours).round()
+    })
+
+
+@pytest.fixture
+def client():
+    """只注册路由的 Flask 测试客户端（不启动调度器与网络探测）"""
+    from flask import Flask
+    from routes import register_routes
+
+    app = Flask(__name__)
+    register_routes(app)
+    return app.test_client()
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """清空数据库与各级缓存，返回写入价格数据的函数"""
+    from sqlalchemy import text
+
+    import response_cache
+    import services
+    from cache import cache_manager
+    from database import db_manager
+    from ohlcv import ROLLUP_INTERVALS
+    from resample import resample_store
+    from series_store import series_store
+    from storage import rollup_table
+
+    with db_manager.engine.begin() as conn:
+        for table in ['price_history', 'technical_cache', *map(rollup_table, ROLLUP_INTERVALS)]:
+            conn.execute(text(f'DELETE FROM {table}'))
+    db_manager._tail.reset()
+    cache_manager.clear_all_cache()
+    response_cache.reset_version()
+    services._indicator_engines.clear()
+    monkeypatch.setattr(series_store, '_ranges', {})
+    monkeypatch.setattr(resample_store, '_frames', {})
+
+    def write(df):
+        db_manager.save_historical_data(df)
+        response_cache.reset_version()
+        return df
+
+    return write
@@ -0,0 +1,100 @@
+"""
+历史数据回填测试
+检查点的区间合并、区间网格对齐，以及对本地 mock 服务中途失败后重新运行的续传。
+"""
+import threading
+import time
+
+from sqlalchemy import text
+
+import backfill
+import mock_coingecko
+from backfill import DAY_SECONDS, Checkpoint, plan_chunks, run_backfill
+from database import db_manager
+
+
+def test_checkpoint_merges_overlapping_and_adjacent_intervals(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = Checkpoint(path)
+    checkpoint.mark_done(100, 200, 5)
+    checkpoint.mark_done(300, 400, 5)
+    checkpoint.mark_done(200, 250, 1)   # 相邻
+    checkpoint.mark_done(240, 310, 1)   # 重叠，连接两段
+    checkpoint.mark_done(500, 600, 2)
+    assert checkpoint.covered == [(100, 400), (500, 600)]
+
+    assert checkpoint.is_done(150, 350)
+    assert not checkpoint.is_done(350, 550)
+
+    # 重新加载后进度不变
+    restored = Checkpoint(path)
+    assert restored.covered == [(100, 400), (500, 600)]
+    assert restored.rows == 14
+
+
+def test_plan_chunks_is_aligned_to_grid():
+    width = 10 * DAY_SECONDS
+    start = 1_700_000_123
+    end = start + 45 * DAY_SECONDS
+    chunks = plan_chunks(start, end, 10)
+
+    # 最新的区间在前，首尾被 start / end 截断，中间的边界都在网格上
+    ordered = chunks[::-1]
+    assert ordered[0][0] == start and ordered[-1][1] == end
+    assert all(left[1] == right[0] for left, right in zip(ordered, ordered[1:]))
+    assert all(chunk_start % width == 0 for chunk_start, _ in ordered[1:])
+    assert all(chunk_end - chunk_start <= width for chunk_start, chunk_end in chunks)
+
+    # 结束时间不同的两次运行，中间的区间完全相同（检查点可以复用）
+    later = plan_chunks(start, end + 3 * DAY_SECONDS, 10)
+    assert set(ordered[1:-1]) <= set(later)
+
+
+def test_resume_after_failed_chunks_fetches_each_chunk_once(history, tmp_path, monkeypatch):
+    server, base_url = mock_coingecko.start_in_background()
+    try:
+        end = int(time.time()) // 3600 * 3600
+        start = end - 60 * DAY_SECONDS
+        chunks = plan_chunks(start, end, 10)
+        failing = set(chunks[1::2])
+        fetched = []
+        lock = threading.Lock()
+        original = backfill.fetch_chunk
+
+        def fetch_chunk(client, limiter, chunk_start, chunk_end):
+            with lock:
+                fetched.append((chunk_start, chunk_end))
+            if (chunk_start, chunk_end) in failing:
+                raise RuntimeError('injected failure')
+            return original(client, limiter, chunk_start, chunk_end)
+
+        monkeypatch.setattr(backfill, 'fetch_chunk', fetch_chunk)
+        options = dict(chunk_days=10, workers=3, rate_per_minute=6000,
+                       checkpoint_path=str(tmp_path / 'checkpoint.json'), base_url=base_url)
+
+        first = run_backfill(start, end, **options)
+        assert first['failed'] == len(failing)
+        first_fetched = list(fetched)
+
+        failing.clear()
+        fetched.clear()
+        second = run_backfill(start, end, **options)
+        assert second['failed'] == 0
+
+        # 已完成的区间不会再次拉取，每个区间只成功拉取一次
+        assert sorted(fetched) == sorted(set(chunks[1::2]))
+        assert sorted(first_fetched + fetched) == sorted(chunks + chunks[1::2])
+        assert Checkpoint(options['checkpoint_path']).covered == [(start, end)]
+
+        # 第三次运行没有待回填的区间
+        fetched.clear()
+        assert run_backfill(start, end, **options)['chunks'] == 0
+        assert fetched == []
+
+        with db_manager.engine.connect() as conn:
+            stored = conn.execute(text('SELECT COUNT(*) FROM price_history')).scalar()
+        assert stored == first['rows'] + second['rows'] == Checkpoint(options['checkpoint_path']).rows
+        assert stored == 60 * 24
+    finally:
+        server.shutdown()
+        server.server_close()
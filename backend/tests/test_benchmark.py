@@ -0,0 +1,36 @@
+"""
+基准测试脚本的数据库选择测试
+基准测试会清空 price_history，任何配置下都不能指向应用数据库。
+"""
+import os
+
+import pytest
+
+import benchmark
+from config import SQLITE_PATH
+from storage import SQLiteBackend
+
+
+def test_sqlite_always_uses_a_temporary_database(monkeypatch):
+    monkeypatch.setattr(benchmark, 'DB_BACKEND', 'sqlite')
+    for name in (None, 'sqlite'):
+        db = benchmark.make_db_manager(name)
+        assert os.path.abspath(db.backend.path) != os.path.abspath(SQLITE_PATH)
+        assert not benchmark.is_app_database(db.backend)
+
+
+def test_app_database_is_refused_without_flag(monkeypatch):
+    monkeypatch.setattr(benchmark, 'create_backend', lambda name: SQLiteBackend(SQLITE_PATH))
+    assert benchmark.is_app_database(SQLiteBackend(SQLITE_PATH))
+    with pytest.raises(SystemExit):
+        benchmark.make_db_manager('mysql')
+    assert benchmark.make_db_manager('mysql', allow_app_database=True).backend.path == SQLITE_PATH
+
+
+def test_mysql_app_database_is_detected():
+    class FakeMySQL:
+        db_config = {'database': benchmark.APP_MYSQL_DATABASE}
+
+    assert benchmark.is_app_database(FakeMySQL())
+    FakeMySQL.db_config = {'database': benchmark.BENCH_MYSQL_DATABASE}
+    assert not benchmark.is_app_database(FakeMySQL())
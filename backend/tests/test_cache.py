@@ -0,0 +1,120 @@
+"""
+进程内缓存测试
+并发未命中的请求合并（single-flight）、过期后先返回旧值（stale-while-revalidate）与 LRU 淘汰。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cache import CacheManager
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met before timeout')
+        time.sleep(0.005)
+
+
+def blocking_compute(value):
+    """返回 (compute, release, calls)：compute 阻塞到 release.set()"""
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return value
+
+    return compute, release, calls
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = CacheManager()
+    compute, release, calls = blocking_compute({'value': 1})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get_or_compute, 'key', compute) for _ in range(8)]
+        wait_until(lambda: cache.stats()['coalesced'] == 7)
+        release.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert len(calls) == 1
+    assert results == [{'value': 1}] * 8
+    assert cache.get_cache('key')['data'] == {'value': 1}
+
+
+def test_flight_errors_reach_every_waiter():
+    cache = CacheManager()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.single_flight, 'key', compute) for _ in range(4)]
+        wait_until(lambda: cache.stats()['coalesced'] == 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+
+    # 失败的计算不会留下进行中的状态
+    assert cache.single_flight('key', lambda: 'ok') == 'ok'
+
+
+def test_leader_rechecks_cache_written_by_previous_flight(monkeypatch):
+    cache = CacheManager()
+    calls = []
+    single_flight = cache.single_flight
+
+    def late_arrival(key, refresh):
+        # 调用方判断未命中之后、成为计算者之前，上一次计算完成并写回
+        cache.set_cache(key, 'fresh')
+        return single_flight(key, refresh)
+
+    monkeypatch.setattr(cache, 'single_flight', late_arrival)
+    assert cache.get_or_compute('key', lambda: calls.append(1) or 'recomputed') == 'fresh'
+    assert calls == []
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = CacheManager()
+    cache.set_cache('key', 'old')
+    cache.invalidate('key')
+    compute, release, calls = blocking_compute('new')
+
+    results = [cache.get_or_compute('key', compute, stale_while_revalidate=True) for _ in range(5)]
+    assert results == ['old'] * 5
+    assert cache.stats()['stale_served'] == 5
+
+    wait_until(lambda: len(calls) == 1)
+    release.set()
+    wait_until(lambda: cache.get_cache('key')['data'] == 'new')
+    assert len(calls) == 1
+    assert cache.get_or_compute('key', compute, stale_while_revalidate=True) == 'new'
+
+
+def test_missing_value_without_stale_blocks_for_result():
+    cache = CacheManager()
+    assert cache.get_or_compute('key', lambda: 'value', stale_while_revalidate=True) == 'value'
+    assert cache.stats()['stale_served'] == 0
+
+
+def test_lru_eviction_keeps_budget():
+    cache = CacheManager(max_bytes=3500)
+    for index in range(5):
+        cache.set_cache(f'key{index}', b'x' * 1000)
+    cache.get_cache('key2')  # 最近使用，不会优先淘汰
+    cache.set_cache('key5', b'x' * 1000)
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 3500
+    assert stats['evictions'] >= 3
+    assert cache.get_cache('key5')['data'] is not None
+    assert cache.get_cache('key2')['data'] is not None
+    assert cache.get_cache('key0')['data'] is None
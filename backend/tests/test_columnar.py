@@ -0,0 +1,107 @@
+"""
+列式二进制格式测试
+encode / decode 往返、8 字节对齐与错误处理，以及 /api/historical 按 Accept 协商响应格式。
+"""
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import columnar
+from conftest import make_history
+
+
+def test_round_trip_keeps_values_and_dtypes():
+    rng = np.random.default_rng(1)
+    arrays = {
+        'timestamps': np.arange(7, dtype=np.float64) * 3.6e6,
+        'prices': rng.uniform(50000, 70000, 7),
+        'volumes': rng.uniform(1e8, 1e9, 7).astype(np.float32),
+        'counts': np.arange(7, dtype=np.int32) - 3,
+        'flags': np.arange(7, dtype=np.uint32),
+    }
+    arrays['prices'][2] = np.nan
+    meta = {'success': True, 'notice': '仅保留最近 365 天'}
+
+    body = columnar.encode(arrays, meta)
+    decoded_meta, decoded = columnar.decode(body)
+
+    assert decoded_meta == meta
+    assert list(decoded) == list(arrays)
+    for name, array in arrays.items():
+        assert decoded[name].dtype == array.dtype.newbyteorder('<')
+        np.testing.assert_array_equal(decoded[name], array)
+        assert not decoded[name].flags.writeable
+        # 浏览器端 TypedArray 要求偏移按元素大小对齐
+        assert (decoded[name].ctypes.data - np.frombuffer(body, np.uint8).ctypes.data) % columnar.ALIGNMENT == 0
+
+
+def test_big_endian_input_is_stored_little_endian():
+    values = np.array([1.5, -2.25, 1e10], dtype='>f8')
+
+    _, decoded = columnar.decode(columnar.encode({'prices': values}))
+
+    assert decoded['prices'].dtype.str == '<f8'
+    np.testing.assert_array_equal(decoded['prices'], values)
+
+
+def test_empty_columns():
+    meta, decoded = columnar.decode(columnar.encode({'prices': np.empty(0), 'volumes': np.empty(0, np.float32)}))
+    assert meta == {}
+    assert [len(array) for array in decoded.values()] == [0, 0]
+
+    meta, decoded = columnar.decode(columnar.encode({}, {'success': False}))
+    assert meta == {'success': False}
+    assert decoded == {}
+
+
+def test_rejects_invalid_input():
+    with pytest.raises(ValueError, match='Unsupported column dtype'):
+        columnar.encode({'counts': np.arange(3, dtype=np.int64)})
+    with pytest.raises(ValueError, match='Column length mismatch'):
+        columnar.encode({'a': np.zeros(3), 'b': np.zeros(4)})
+
+    body = bytearray(columnar.encode({'a': np.zeros(3)}))
+    with pytest.raises(ValueError, match='Unsupported columnar format version'):
+        columnar.decode(bytes(body[:4]) + struct.pack('<B', 99) + bytes(body[5:]))
+    with pytest.raises(ValueError, match='Not a columnar payload'):
+        columnar.decode(b'XXXX' + bytes(body[4:]))
+
+
+@pytest.mark.parametrize('accept, binary', [
+    (columnar.MEDIA_TYPE, True),
+    (f'application/json;q=0.5, {columnar.MEDIA_TYPE}', True),
+    ('application/json', False),
+    ('*/*', False),
+    ('text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8', False),
+    (None, False),
+])
+def test_accept_negotiation(client, history, accept, binary):
+    history(make_history(10 * 24))
+
+    response = client.get('/api/historical?days=7', headers={'Accept': accept} if accept else {})
+
+    assert response.status_code == 200
+    assert response.mimetype == (columnar.MEDIA_TYPE if binary else 'application/json')
+
+
+@pytest.mark.parametrize('query', ['days=7', 'days=7&fields=prices,rsi', 'days=7&max_points=50'])
+def test_binary_response_matches_json(client, history, query):
+    history(make_history(10 * 24))
+
+    data = client.get(f'/api/historical?{query}').get_json()['data']
+    meta, arrays = columnar.decode(client.get(f'/api/historical?{query}', headers={'Accept': columnar.MEDIA_TYPE}).data)
+
+    assert meta['success'] is True
+    assert set(arrays) == set(data)
+    np.testing.assert_array_equal(
+        pd.to_datetime(arrays['timestamps'], unit='ms').strftime('%Y-%m-%d %H:%M'),
+        pd.to_datetime(data['timestamps']).strftime('%Y-%m-%d %H:%M')
+    )
+    assert arrays['prices'].dtype == np.float64
+    np.testing.assert_allclose(arrays['prices'], data['prices'], atol=0.005)
+    for name in set(arrays) - {'timestamps', 'prices'}:
+        assert arrays[name].dtype == np.float32
+        expected = np.array([np.nan if value is None else value for value in data[name]], dtype=np.float64)
+        np.testing.assert_allclose(arrays[name], expected, rtol=1e-6, atol=0.5 if name == 'volumes' else 0.005)
@@ -0,0 +1,104 @@
+"""
+熔断器测试
+closed -> open -> half-open -> closed / open 的状态转换与冷却时间，时钟由测试控制。
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import connectivity
+from connectivity import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(connectivity, 'time', SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3, cooldown=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    # 成功后重新计数
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_after_cooldown_allows_single_trial(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, cooldown=30)
+    open_breaker(breaker)
+
+    clock.advance(29.9)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    clock.advance(0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    # 试探请求尚未完成时拒绝其他请求
+    assert not breaker.allow_request()
+    assert breaker.stats()['state'] == CircuitBreaker.HALF_OPEN
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, cooldown=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    assert breaker.allow_request()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()['failures'] == 0
+    assert breaker.allow_request()
+    # 关闭后需要重新累计到阈值才会打开
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens_and_restarts_cooldown(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, cooldown=30)
+    open_breaker(breaker)
+    clock.advance(30)
+    assert breaker.allow_request()
+
+    clock.advance(5)
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    # 冷却时间从试探失败时重新计算
+    clock.advance(29)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.advance(1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
@@ -0,0 +1,69 @@
+"""
+仪表板接口测试
+/api/dashboard 的 K 线面板优先读取日K汇总表，汇总表为空时退回到 API 数据、再退回到数据库数据按日聚合。
+"""
+import pytest
+from sqlalchemy import text
+
+import dashboard
+from conftest import make_history
+from database import db_manager
+from services import aggregate_candlestick, format_candlestick
+from storage import rollup_table
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """替换 CoinGecko 数据源，返回可修改的 {days: DataFrame 或 None}"""
+    frames = {}
+    monkeypatch.setattr(dashboard.BitcoinAPI, 'fetch_historical_data', lambda days=7: frames.get(days))
+    # 预测面板需要训练模型，与 K 线无关
+    monkeypatch.setattr(dashboard, 'compute_prediction', lambda df=None: None)
+    return frames
+
+
+def get_panels(client):
+    response = client.get('/api/dashboard')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is True
+    assert set(body['data']) == set(dashboard.PANELS)
+    return body['data']
+
+
+def clear_daily_rollup():
+    with db_manager.engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {rollup_table('1d')}"))
+
+
+def test_candlestick_reads_daily_rollup(client, history, api):
+    df = history(make_history(40 * 24))
+    api[30] = make_history(30 * 24, seed=99)
+
+    candlestick = get_panels(client)['candlestick']
+
+    assert candlestick == format_candlestick(db_manager.get_ohlcv('1d', days=30))
+    assert candlestick['dates'][-1] == df['datetime'].iloc[-1].strftime('%Y-%m-%d')
+
+
+def test_candlestick_falls_back_to_api_frame(client, history, api):
+    history(make_history(40 * 24))
+    clear_daily_rollup()
+    api[30] = make_history(30 * 24, seed=99)
+
+    assert get_panels(client)['candlestick'] == format_candlestick(aggregate_candlestick(api[30]))
+
+
+def test_candlestick_falls_back_to_database_when_offline(client, history, api):
+    history(make_history(40 * 24))
+    clear_daily_rollup()
+
+    expected = format_candlestick(aggregate_candlestick(db_manager.get_historical_data(days=30)))
+    assert get_panels(client)['candlestick'] == expected
+
+
+def test_candlestick_is_empty_without_any_data(client, history, api):
+    panels = get_panels(client)
+
+    assert panels['candlestick'] is None
+    assert panels['historical'] is None
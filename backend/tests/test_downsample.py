@@ -0,0 +1,109 @@
+"""
+降采样测试
+LTTB 保留首尾两点、恰好返回 max_points 个点、短序列原样返回，并与逐点实现的 LTTB 一致；
+最小 / 最大值包络保留每个分桶的极值。
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_history
+from downsample import bucket_edges, downsample_indices, lttb_indices, minmax_indices
+from services import downsample_historical
+from utils import calculate_technical_indicators
+
+
+def reference_lttb(x, y, threshold):
+    """逐点实现的 LTTB（Steinarsson 原始算法）"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    anchor = 0
+    for i in range(threshold - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[anchor] - avg_x) * (y[j] - y[anchor]) - (x[anchor] - x[j]) * (avg_y - y[anchor]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        anchor = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64) * 60, 60000 + np.cumsum(rng.normal(0, 50, n))
+
+
+@pytest.mark.parametrize('n, max_points', [(1000, 100), (1001, 37), (5000, 999), (12, 10), (100, 3)])
+def test_lttb_keeps_endpoints_and_returns_max_points(n, max_points):
+    x, y = random_walk(n)
+
+    indices = downsample_indices(x, [y], [], max_points)
+
+    assert len(indices) == max_points
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize('n, max_points', [(1000, 100), (777, 50), (30, 12)])
+def test_lttb_matches_reference_implementation(n, max_points):
+    x, y = random_walk(n, seed=n)
+
+    edges = bucket_edges(n, max_points - 2)
+    np.testing.assert_array_equal(lttb_indices(x, y, edges), reference_lttb(x.tolist(), y.tolist(), max_points))
+
+
+def test_lttb_keeps_isolated_spike():
+    x, y = random_walk(2000)
+    y[1234] += 5000
+
+    assert 1234 in downsample_indices(x, [y], [], 50)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 100])
+def test_short_input_passes_through(n):
+    x, y = random_walk(n)
+    np.testing.assert_array_equal(downsample_indices(x, [y], [], 100), np.arange(n))
+
+    df = calculate_technical_indicators(make_history(max(n, 1)))
+    assert downsample_historical(df, 100) is df
+
+
+def test_minmax_keeps_extremes_of_each_bucket():
+    rng = np.random.default_rng(3)
+    values = rng.uniform(0, 1, 1000)
+    edges = bucket_edges(len(values), 20)
+
+    indices = set(minmax_indices(values, edges).tolist())
+
+    assert {0, len(values) - 1} <= indices
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = values[start:end]
+        assert start + int(np.argmin(bucket)) in indices
+        assert start + int(np.argmax(bucket)) in indices
+
+
+def test_downsample_historical_respects_max_points():
+    df = calculate_technical_indicators(make_history(24 * 90))
+
+    for max_points in (10, 200, 1000):
+        sampled = downsample_historical(df, max_points)
+        assert len(sampled) <= max_points
+        assert sampled.index.is_monotonic_increasing
+        assert sampled['datetime'].iloc[0] == df['datetime'].iloc[0]
+        assert sampled['datetime'].iloc[-1] == df['datetime'].iloc[-1]
+
+    # 只请求价格时全部点数用于 LTTB
+    assert len(downsample_historical(df, 500, ['timestamps', 'prices'])) == 500
+    # 包络列的全局极值总会保留
+    sampled = downsample_historical(df, 200, ['volumes'])
+    assert sampled['volume'].max() == df['volume'].max()
+    assert sampled['volume'].min() == df['volume'].min()
+    pd.testing.assert_frame_equal(sampled, df.loc[sampled.index])
@@ -0,0 +1,109 @@
+"""
+上游 HTTP 客户端测试
+在随机端口启动本地 CoinGecko mock 服务：Retry-After、退避重试上限与连接复用。
+"""
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import http_client
+import mock_coingecko
+from http_client import UpstreamClient, parse_retry_after
+
+
+@pytest.fixture
+def mock_server():
+    """返回启动 mock 服务的函数，测试结束后统一停止"""
+    servers = []
+
+    def start(**options):
+        server, base_url = mock_coingecko.start_in_background(**options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录客户端的等待时间而不真正等待"""
+    delays = []
+    monkeypatch.setattr(http_client, 'time', SimpleNamespace(
+        sleep=delays.append, perf_counter=time.perf_counter, time=time.time
+    ))
+    return delays
+
+
+def mock_stats(base_url):
+    return requests.get(base_url.replace('/api/v3', '/_mock/stats')).json()
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2.5', 2.5), ('0', 0.0), ('-3', 0.0), (None, None), ('', None),
+    ('nan', None), ('inf', None), ('-inf', None), ('soon', None)
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+def test_retry_after_is_honored(mock_server, sleeps):
+    server, base_url = mock_server(rate_limit_every=2, retry_after=3)
+    client = UpstreamClient(base_url, max_retries=3, backoff_base=0.1, backoff_max=10)
+    mock_stats(base_url)  # 第 1 个请求，下一个请求返回 429
+
+    response = client.get('/ping')
+    assert response.status_code == 200
+    assert sleeps == [3.0]
+    metrics = client.stats()['endpoints']['/ping']
+    assert metrics['calls'] == 2 and metrics['errors'] == 1 and metrics['retries'] == 1
+
+
+def test_retry_after_beyond_budget_is_not_waited(mock_server, sleeps):
+    server, base_url = mock_server(rate_limit_every=1, retry_after=60)
+    client = UpstreamClient(base_url, max_retries=3, backoff_base=0.1, backoff_max=10)
+
+    assert client.get('/ping').status_code == 429
+    assert sleeps == []
+    assert server.state.requests == 1
+
+
+def test_backoff_stops_at_retry_cap(mock_server, sleeps):
+    server, base_url = mock_server(error_rate=1.0)
+    client = UpstreamClient(base_url, max_retries=4, backoff_base=0.5, backoff_max=1.5)
+
+    assert client.get('/ping').status_code == 503
+    assert server.state.requests == 5
+    assert len(sleeps) == 4
+    # full jitter：第 n 次等待在 [0, min(上限, 基数 * 2^n)] 内
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(1.5, 0.5 * 2 ** attempt)
+
+
+def test_network_errors_are_retried_then_raised(sleeps):
+    client = UpstreamClient('http://127.0.0.1:9/api/v3', max_retries=2, backoff_base=0.1, backoff_max=1)
+    with pytest.raises(requests.RequestException):
+        client.get('/ping', timeout=0.5)
+    assert len(sleeps) == 2
+    assert client.stats()['endpoints']['/ping']['errors'] == 3
+
+
+def test_session_is_reused(mock_server):
+    server, base_url = mock_server()
+    client = UpstreamClient(base_url, pool_size=2)
+
+    for _ in range(10):
+        assert client.get('/simple/price', params={'ids': 'bitcoin'}).status_code == 200
+    assert server.state.requests == 10
+    assert server.state.connections == 1
+    assert client.stats()['endpoints']['/simple/price']['calls'] == 10
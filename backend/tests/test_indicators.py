@@ -0,0 +1,144 @@
+"""
+增量技术指标测试
+IndicatorEngine 的逐点更新、状态恢复以及窗口滑动后的增量刷新，结果应与
+utils.calculate_technical_indicators 的全量计算一致。
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import INDICATOR_COLUMNS, MIN_POINTS, IndicatorEngine, fill_warmup
+from services import _extend_frame
+from utils import calculate_technical_indicators
+
+
+def make_frame(n, seed=7, start='2024-01-01'):
+    """按小时的随机游走价格"""
+    rng = np.random.default_rng(seed)
+    prices = 60000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'datetime': pd.date_range(start, periods=n, freq='h'),
+        'price': prices,
+        'volume': rng.uniform(1e8, 1e9, n)
+    })
+
+
+def full(df):
+    return calculate_technical_indicators(df.copy()).reset_index(drop=True)
+
+
+def assert_indicators_equal(actual, expected):
+    assert len(actual) == len(expected)
+    for name in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(
+            actual[name].to_numpy(dtype=float), expected[name].to_numpy(dtype=float),
+            rtol=1e-9, atol=1e-6, err_msg=name
+        )
+
+
+def test_streaming_matches_full_computation():
+    df = make_frame(300)
+    expected = full(df)
+
+    rows = IndicatorEngine().update_many(df['price'].to_numpy())
+    assert_indicators_equal(fill_warmup(rows), expected)
+
+
+def test_engine_from_frame_continues_stream():
+    df = make_frame(300)
+    expected = full(df)
+
+    engine = IndicatorEngine.from_frame(full(df.iloc[:100]))
+    rows = engine.update_many(df['price'].iloc[100:].to_numpy())
+    assert_indicators_equal(rows, expected.iloc[100:].reset_index(drop=True))
+
+
+def test_state_resumes_after_json_round_trip():
+    df = make_frame(300)
+    expected = full(df)
+
+    engine = IndicatorEngine.from_frame(full(df.iloc[:150]))
+    engine.update_many(df['price'].iloc[150:200].to_numpy(), df['datetime'].iloc[150:200].tolist())
+    restored = IndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))
+    assert restored.last_timestamp == df['datetime'].iloc[199]
+
+    rows = restored.update_many(df['price'].iloc[200:].to_numpy())
+    assert_indicators_equal(rows, expected.iloc[200:].reset_index(drop=True))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_series_match_full_computation(seed):
+    """随机长度、波动与切分点（含横盘段）：逐点计算及由前半段恢复的引擎均与全量计算一致"""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(MIN_POINTS, 2000 + 1))
+    df = make_frame(n, seed=seed)
+    prices = 60000 + np.cumsum(rng.normal(0, rng.choice([1, 50, 500]), n))
+    if n > 60:
+        prices[30:50] = prices[30]
+    df['price'] = prices
+    expected = full(df)
+
+    assert_indicators_equal(fill_warmup(IndicatorEngine().update_many(prices)), expected)
+
+    split = int(rng.integers(MIN_POINTS, n + 1))
+    state = json.loads(json.dumps(IndicatorEngine.from_frame(full(df.iloc[:split])).to_state()))
+    resumed = IndicatorEngine.from_state(state).update_many(prices[split:])
+    assert_indicators_equal(resumed, expected.iloc[split:].reset_index(drop=True))
+
+
+def test_extend_frame_appends_without_sliding():
+    df = make_frame(250)
+    previous = full(df.iloc[:200])
+    engine = IndicatorEngine.from_frame(previous)
+
+    result = _extend_frame(previous, engine, df)
+    assert_indicators_equal(result, full(df))
+
+
+@pytest.mark.parametrize('evicted, appended', [(50, 50), (1, 1), (120, 10), (200 - MIN_POINTS, 0)])
+def test_extend_frame_matches_full_computation_when_window_slides(evicted, appended):
+    df = make_frame(400)
+    previous = full(df.iloc[:200])
+    engine = IndicatorEngine.from_frame(previous)
+
+    window = df.iloc[evicted:200 + appended].reset_index(drop=True)
+    result = _extend_frame(previous, engine, window)
+    assert_indicators_equal(result, full(window))
+
+
+def test_extend_frame_keeps_matching_over_repeated_slides():
+    df = make_frame(600)
+    size, step = 200, 7
+    previous = full(df.iloc[:size])
+    engine = IndicatorEngine.from_frame(previous)
+
+    for end in range(size + step, len(df), step):
+        window = df.iloc[end - size:end].reset_index(drop=True)
+        previous = _extend_frame(previous, engine, window)
+        assert_indicators_equal(previous, full(window))
+
+    # 引擎状态同样可以恢复并继续
+    restored = IndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))
+    window = df.iloc[len(df) - size:].reset_index(drop=True)
+    assert_indicators_equal(_extend_frame(previous, restored, window), full(window))
+
+
+def test_extend_frame_falls_back_when_too_few_rows_remain():
+    df = make_frame(300)
+    previous = full(df.iloc[:200])
+    engine = IndicatorEngine.from_frame(previous)
+
+    window = df.iloc[200 - MIN_POINTS + 1:300].reset_index(drop=True)
+    assert _extend_frame(previous, engine, window) is None
+
+
+def test_extend_frame_falls_back_when_history_changes():
+    df = make_frame(250)
+    previous = full(df.iloc[:200])
+    engine = IndicatorEngine.from_frame(previous)
+
+    changed = df.copy()
+    changed.loc[100, 'price'] += 1
+    assert _extend_frame(previous, engine, changed) is None
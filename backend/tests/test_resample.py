@@ -0,0 +1,98 @@
+"""
+多周期重采样测试
+K 线与 aggregate_candlestick 对原始数据的聚合一致，空分桶按前一根收盘价补齐，
+完整结果按数据版本缓存，增量扩展与全量重建的结果相同。
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import response_cache
+from conftest import make_history
+from database import db_manager
+from ohlcv import INTERVAL_SECONDS
+from resample import TimeframeSeries, resample_store
+from services import aggregate_candlestick
+
+
+OHLCV_COLUMNS = ['datetime', 'open', 'high', 'low', 'close', 'volume', 'count']
+
+
+def expected_bars(interval, days=30):
+    raw = db_manager.get_historical_data(days=days)
+    return aggregate_candlestick(raw, interval)[OHLCV_COLUMNS]
+
+
+@pytest.mark.parametrize('interval', ['1h', '4h', '1d'])
+def test_matches_aggregate_candlestick(history, interval):
+    history(make_history(10 * 24))
+
+    bars = resample_store.frame(interval, 30)
+
+    pd.testing.assert_frame_equal(bars[OHLCV_COLUMNS], expected_bars(interval))
+
+
+@pytest.mark.parametrize('interval', ['15m', '1h'])
+def test_empty_buckets_are_filled(history, interval):
+    # 小时数据中缺少 10 小时；15 分钟周期另有每小时 3 个空分桶
+    history(make_history(10 * 24).drop(index=range(100, 110)))
+
+    bars = resample_store.frame(interval, 30)
+    expected = expected_bars(interval)
+
+    width = np.timedelta64(INTERVAL_SECONDS[interval], 's')
+    assert (np.diff(bars['datetime'].to_numpy()) == width).all()
+    assert bars['datetime'].iloc[0] == expected['datetime'].iloc[0]
+    assert bars['datetime'].iloc[-1] == expected['datetime'].iloc[-1]
+
+    filled = bars[OHLCV_COLUMNS]['count'] > 0
+    pd.testing.assert_frame_equal(bars.loc[filled, OHLCV_COLUMNS].reset_index(drop=True), expected)
+
+    empty = bars[~filled]
+    assert len(empty) == len(bars) - len(expected)
+    assert (empty['volume'] == 0).all()
+    previous_close = bars['close'].shift(1)[~filled]
+    for column in ['open', 'high', 'low', 'close', 'price']:
+        np.testing.assert_array_equal(empty[column], previous_close)
+    # 指标基于连续的网格，空分桶处同样有值
+    assert not bars['rsi'].iloc[-24:].isna().any()
+
+
+def test_frame_is_cached_per_data_version(history, monkeypatch):
+    end = pd.Timestamp.now().floor('h') - pd.Timedelta(hours=3)
+    history(make_history(10 * 24, end=end))
+
+    loads = []
+    load = db_manager.get_historical_data
+    monkeypatch.setattr(db_manager, 'get_historical_data', lambda **kwargs: loads.append(kwargs) or load(**kwargs))
+
+    first = resample_store.frame('1h', 7)
+    second = resample_store.frame('1h', 30)
+    assert len(loads) == 1
+    assert len(second) > len(first)
+
+    history(make_history(3, seed=3, end=end + pd.Timedelta(hours=3)))
+    assert response_cache.data_version() == response_cache.format_version(end + pd.Timedelta(hours=3))
+
+    latest = resample_store.frame('1h', 7)
+    assert len(loads) == 2
+    assert latest['datetime'].iloc[-1] == end + pd.Timedelta(hours=3)
+
+
+def test_incremental_extend_across_gap_matches_rebuild():
+    df = make_history(300)
+    # 之后到达的数据与已有数据之间缺少 5 小时
+    later = df.drop(index=range(281, 286))
+    initial = later.iloc[:270]
+
+    def arrays(frame):
+        return frame['datetime'].to_numpy(), frame['price'].to_numpy(), frame['volume'].to_numpy()
+
+    incremental = TimeframeSeries('1h')
+    incremental.frame(*arrays(initial))
+    extended = incremental.frame(*arrays(later))
+    assert incremental.stats == {'rebuilds': 1, 'extends': 1, 'bars_appended': len(df) - len(initial)}
+
+    rebuilt = TimeframeSeries('1h').frame(*arrays(later))
+    assert len(rebuilt) == len(df)
+    pd.testing.assert_frame_equal(extended, rebuilt, check_exact=False, rtol=1e-9)
@@ -0,0 +1,119 @@
+"""
+响应缓存测试
+/api/historical 的 ETag / 304、Vary、gzip 协商，以及写入新数据后 ETag 随数据版本变化。
+"""
+import gzip
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+import columnar
+import response_cache
+import scheduler
+from cache import cache_manager
+from conftest import make_history
+from database import db_manager
+
+
+def test_if_none_match_returns_304(client, history):
+    history(make_history(10 * 24))
+
+    first = client.get('/api/historical?days=7')
+    assert first.status_code == 200
+    etag, weak = first.get_etag()
+    assert etag and weak
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    second = client.get('/api/historical?days=7', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.get_etag() == (etag, True)
+
+    # 其他参数对应不同的响应 key
+    other = client.get('/api/historical?days=30', headers={'If-None-Match': first.headers['ETag']})
+    assert other.status_code == 200
+
+
+def test_vary_and_format_negotiation(client, history):
+    history(make_history(10 * 24))
+
+    json_response = client.get('/api/historical?days=7')
+    binary_response = client.get('/api/historical?days=7', headers={'Accept': columnar.MEDIA_TYPE})
+
+    for response in (json_response, binary_response):
+        vary = {value.strip() for value in response.headers['Vary'].split(',')}
+        assert vary == {'Accept', 'Accept-Encoding'}
+    assert json_response.mimetype == 'application/json'
+    assert binary_response.mimetype == columnar.MEDIA_TYPE
+    # 同一数据的两种格式 ETag 不同，JSON 的 ETag 不会让二进制请求得到 304
+    assert json_response.get_etag() != binary_response.get_etag()
+    revalidated = client.get('/api/historical?days=7', headers={
+        'Accept': columnar.MEDIA_TYPE, 'If-None-Match': json_response.headers['ETag']
+    })
+    assert revalidated.status_code == 200
+
+
+def test_gzip_negotiation(client, history):
+    history(make_history(10 * 24))
+
+    plain = client.get('/api/historical?days=7')
+    compressed = client.get('/api/historical?days=7', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+    # 压缩与否不影响 ETag（同一表示的不同传输编码）
+    assert compressed.get_etag() == plain.get_etag()
+
+
+@pytest.fixture
+def small_app():
+    """直接使用 cached_json 的最小应用（响应体小于 GZIP_MIN_BYTES）"""
+    app = Flask(__name__)
+
+    @app.route('/small')
+    def small():
+        return response_cache.cached_json('small', 'v1', lambda: {'success': True})
+
+    @app.route('/unversioned')
+    def unversioned():
+        return response_cache.cached_json('unversioned', None, lambda: {'success': True})
+
+    return app.test_client()
+
+
+def test_small_bodies_are_not_compressed(small_app):
+    response = small_app.get('/small', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {'success': True}
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_unversioned_responses_have_no_etag(small_app):
+    response = small_app.get('/unversioned')
+
+    assert response.get_etag() == (None, None)
+    assert 'Cache-Control' not in response.headers
+
+
+def test_etag_changes_after_new_data(client, history, monkeypatch):
+    end = pd.Timestamp.now().floor('h') - pd.Timedelta(hours=2)
+    history(make_history(10 * 24, end=end))
+    before = client.get('/api/historical?days=7')
+
+    # 与定时任务相同的路径：写入新数据、更新数据版本并重建缓存
+    latest = make_history(2, seed=11, end=end + pd.Timedelta(hours=2))
+    monkeypatch.setattr(scheduler.BitcoinAPI, 'fetch_historical_data', lambda days=7: latest)
+    scheduler.DataUpdateScheduler(db_manager, cache_manager).update_historical_data()
+
+    after = client.get('/api/historical?days=7', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_etag() != before.get_etag()
+    timestamps = after.get_json()['data']['timestamps']
+    assert pd.Timestamp(timestamps[-1]) == latest['datetime'].iloc[-1]
+
+    again = client.get('/api/historical?days=7', headers={'If-None-Match': after.headers['ETag']})
+    assert again.status_code == 304
@@ -0,0 +1,128 @@
+"""
+数据保留与分区迁移测试
+旧版本创建的未分区 price_history 在升级时迁移为按天分区；迁移失败或仍未分区时，
+apply_retention 退回到 DELETE 并输出警告。MySQL 部分使用记录 SQL 的连接替身。
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import DATA_RETENTION_DAYS, DB_PARTITION_PRECREATE_DAYS
+from conftest import make_history
+from database import DatabaseManager
+from storage import MySQLBackend, SQLiteBackend
+
+
+class Result:
+    def __init__(self, scalar=None, rows=()):
+        self._scalar = scalar
+        self._rows = list(rows)
+
+    def scalar(self):
+        return self._scalar
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeMySQLConnection:
+    """按 information_schema 查询返回预设结果，记录其余语句"""
+
+    def __init__(self, partitions=(), primary_key='id', fail_alter=False):
+        self.partitions = list(partitions)
+        self.primary_key = primary_key
+        self.fail_alter = fail_alter
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = ' '.join(str(statement).split())
+        if 'information_schema.COLUMNS' in sql:
+            return Result(scalar='longblob')
+        if 'information_schema.PARTITIONS' in sql:
+            return Result(rows=self.partitions)
+        if 'information_schema.KEY_COLUMN_USAGE' in sql:
+            return Result(scalar=self.primary_key)
+        if self.fail_alter and sql.startswith('ALTER TABLE price_history'):
+            raise RuntimeError('ALTER command denied')
+        self.statements.append(sql)
+        return Result()
+
+
+def today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_upgrade_partitions_legacy_table():
+    conn = FakeMySQLConnection()
+    MySQLBackend().upgrade_schema(conn)
+
+    assert len(conn.statements) == 1
+    sql = conn.statements[0]
+    # 主键改为包含分区列，分区定义在同一条 ALTER 中，整表只复制一次
+    assert sql.startswith('ALTER TABLE price_history DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp) ')
+    assert 'PARTITION BY RANGE COLUMNS(timestamp)' in sql
+    first = today() - timedelta(days=DATA_RETENTION_DAYS)
+    last = today() + timedelta(days=DB_PARTITION_PRECREATE_DAYS)
+    assert f'PARTITION p{first:%Y%m%d} ' in sql
+    assert f'PARTITION p{last:%Y%m%d} ' in sql
+    assert sql.count('PARTITION p') == DATA_RETENTION_DAYS + DB_PARTITION_PRECREATE_DAYS + 2
+    assert sql.endswith('PARTITION p_future VALUES LESS THAN (MAXVALUE))')
+
+
+def test_upgrade_keeps_existing_composite_primary_key():
+    conn = FakeMySQLConnection(primary_key='id,timestamp')
+    MySQLBackend().upgrade_schema(conn)
+
+    assert len(conn.statements) == 1
+    assert conn.statements[0].startswith('ALTER TABLE price_history PARTITION BY RANGE COLUMNS(timestamp)')
+
+
+def test_upgrade_skips_partitioned_table():
+    conn = FakeMySQLConnection(partitions=[('p_future', 'MAXVALUE')])
+    MySQLBackend().upgrade_schema(conn)
+
+    assert conn.statements == []
+
+
+def test_failed_migration_warns_and_keeps_table(capsys):
+    conn = FakeMySQLConnection(fail_alter=True)
+
+    assert MySQLBackend().partition_price_history(conn) is False
+    assert 'price_history 分区迁移失败' in capsys.readouterr().out
+
+
+def test_ensure_partitions_splits_future_from_last_bound():
+    upper = today() + timedelta(days=1)
+    conn = FakeMySQLConnection(partitions=[
+        (f'p{today():%Y%m%d}', f"'{upper:%Y-%m-%d %H:%M:%S}'"),
+        ('p_future', 'MAXVALUE')
+    ])
+    MySQLBackend().ensure_partitions(conn, 'price_history', today() - timedelta(days=30), upper + timedelta(days=1))
+
+    assert conn.statements == [
+        f"ALTER TABLE price_history REORGANIZE PARTITION p_future INTO ("
+        f"PARTITION p{upper:%Y%m%d} VALUES LESS THAN ('{upper + timedelta(days=1):%Y-%m-%d %H:%M:%S}'), "
+        f"PARTITION p{upper + timedelta(days=1):%Y%m%d} VALUES LESS THAN ('{upper + timedelta(days=2):%Y-%m-%d %H:%M:%S}'), "
+        f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+    ]
+
+
+class UnpartitionedBackend(SQLiteBackend):
+    """支持分区但表未分区的后端（迁移失败的旧 MySQL 表）"""
+
+    label = 'MySQL'
+    supports_partitions = True
+
+
+@pytest.mark.parametrize('backend_class, warns', [(SQLiteBackend, False), (UnpartitionedBackend, True)])
+def test_retention_falls_back_to_delete(tmp_path, capsys, backend_class, warns):
+    manager = DatabaseManager(backend_class(os.path.join(tmp_path, 'retention.db')))
+    manager.init_database()
+    manager.save_historical_data(make_history(24 * 10))
+    capsys.readouterr()
+
+    assert manager.apply_retention(keep_days=5) > 0
+    assert ('price_history 未分区' in capsys.readouterr().out) is warns
+    remaining = manager.get_historical_data(days=30)
+    assert remaining['datetime'].min() >= datetime.now() - timedelta(days=5, minutes=1)
@@ -0,0 +1,78 @@
+"""
+缓存序列化测试
+encode / decode 往返后 DataFrame 与原数据一致：带时区的时间列与索引、NaN、空表和对象列。
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import serialization
+from conftest import make_history
+
+
+# (codec, shuffle, copy)：数据库缓存使用默认参数，跨进程共享缓存不压缩、不重排并直接引用内存
+VARIANTS = [
+    (serialization.CODEC_ZLIB, True, True),
+    (serialization.CODEC_NONE, False, False),
+]
+
+
+def roundtrip(df, codec, shuffle, copy):
+    return serialization.decode(serialization.encode(df, codec=codec, shuffle=shuffle), copy=copy)
+
+
+@pytest.mark.parametrize('codec, shuffle, copy', VARIANTS)
+@pytest.mark.parametrize('tz', ['UTC', 'Asia/Shanghai'])
+def test_timezone_aware_columns_and_index(codec, shuffle, copy, tz):
+    df = make_history(48)
+    df['datetime'] = df['datetime'].dt.tz_localize(tz)
+    df.index = pd.DatetimeIndex(df['datetime'], name='ts')
+
+    result = roundtrip(df, codec, shuffle, copy)
+
+    pd.testing.assert_frame_equal(result, df)
+    assert str(result['datetime'].dt.tz) == tz
+    assert str(result.index.tz) == tz
+
+
+@pytest.mark.parametrize('codec, shuffle, copy', VARIANTS)
+def test_nan_values(codec, shuffle, copy):
+    df = make_history(24)
+    df.loc[::5, 'price'] = np.nan
+    df['volume'] = df['volume'].astype(np.float32)
+    df.loc[3, 'volume'] = np.nan
+    df.loc[4, 'datetime'] = pd.NaT
+
+    pd.testing.assert_frame_equal(roundtrip(df, codec, shuffle, copy), df)
+
+
+@pytest.mark.parametrize('codec, shuffle, copy', VARIANTS)
+def test_empty_frame(codec, shuffle, copy):
+    df = make_history(10).iloc[:0]
+    df = df.assign(label=pd.Series([], dtype=object))
+
+    result = roundtrip(df, codec, shuffle, copy)
+
+    assert list(result.columns) == list(df.columns)
+    assert len(result) == 0
+    assert result.dtypes.to_dict() == df.dtypes.to_dict()
+
+
+@pytest.mark.parametrize('codec, shuffle, copy', VARIANTS)
+def test_object_columns(codec, shuffle, copy):
+    df = pd.DataFrame({
+        'signal': ['buy', None, 'sell', '持有'],
+        'strength': [1.5, 2.0, np.nan, 0.0]
+    }, index=pd.Index(['a', 'b', 'c', 'd'], name='key'))
+
+    pd.testing.assert_frame_equal(roundtrip(df, codec, shuffle, copy), df)
+
+
+def test_uncompressed_decode_is_read_only_view():
+    df = make_history(24)
+    blob = serialization.encode(df, codec=serialization.CODEC_NONE, shuffle=False)
+
+    result = serialization.decode(blob, copy=False)
+
+    assert not result['price'].to_numpy().flags.writeable
+    pd.testing.assert_frame_equal(result, df)
@@ -0,0 +1,98 @@
+"""
+紧凑序列存储测试
+各范围的技术指标按该范围自身的数据计算：预热后的响应与未预热时单独计算的响应一致。
+"""
+import numpy as np
+import pytest
+
+from cache import cache_manager
+from conftest import make_history
+from scheduler import DataUpdateScheduler
+from database import db_manager
+from series_store import VALUE_DTYPES, CompactSeriesStore, series_store
+from utils import calculate_technical_indicators
+
+
+def test_shorter_ranges_share_raw_columns():
+    df = make_history(30 * 24)
+    frames = {
+        30: calculate_technical_indicators(df.copy()),
+        7: calculate_technical_indicators(df.iloc[-7 * 24:].reset_index(drop=True))
+    }
+    store = CompactSeriesStore()
+    store.load(frames)
+
+    short, long = store.frame(7), store.frame(30)
+    assert np.shares_memory(short['price'].to_numpy(), long['price'].to_numpy())
+    assert np.shares_memory(short['datetime'].to_numpy(), long['datetime'].to_numpy())
+    # 指标按各自范围计算，不共享
+    np.testing.assert_allclose(short['ema_26'], frames[7]['ema_26'], rtol=1e-6)
+    assert not np.allclose(short['ema_26'], long['ema_26'].iloc[-len(short):])
+
+    report = store.memory_report([7, 30])
+    assert report['rows'] == {'7d': 7 * 24, '30d': 30 * 24}
+    assert report['compact_bytes'] < report['per_key_frame_bytes']
+
+
+def test_float32_columns_stay_within_rounding_bounds():
+    df = calculate_technical_indicators(make_history(90 * 24))
+    df.loc[:20, 'rsi'] = np.nan
+    store = CompactSeriesStore()
+    store.load({90: df})
+    stored = store.frame(90)
+
+    # 时间与价格（float64）精确保存
+    np.testing.assert_array_equal(stored['datetime'].to_numpy(), df['datetime'].to_numpy())
+    np.testing.assert_array_equal(stored['price'].to_numpy(), df['price'].to_numpy())
+
+    for name, dtype in VALUE_DTYPES.items():
+        assert stored[name].dtype == dtype
+        if dtype != np.float32:
+            continue
+        original = df[name].to_numpy(dtype=np.float64)
+        actual = stored[name].to_numpy(dtype=np.float64)
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(original), err_msg=name)
+        # 舍入到最近的 float32：相对误差不超过 2^-24
+        finite = ~np.isnan(original)
+        assert (np.abs(actual - original)[finite] <= np.abs(original)[finite] * 2.0 ** -24).all(), name
+
+    # 价格量级（约 6 万）的指标误差小于响应保留的 0.01
+    for name in ('ma_20', 'bb_upper', 'bb_lower', 'ema_12'):
+        assert np.nanmax(np.abs(stored[name].to_numpy(dtype=np.float64) - df[name].to_numpy())) < 0.01, name
+
+
+def test_unwarmed_range_and_failed_range():
+    store = CompactSeriesStore()
+    store.load({7: calculate_technical_indicators(make_history(7 * 24))})
+    assert store.frame(14) is None
+    assert store.frame(7, min_points=7 * 24 + 1) is None
+
+    # 计算失败（None）的范围保留原有数据
+    previous = store.frame(7)
+    store.load({7: None})
+    assert store.frame(7)['price'].equals(previous['price'])
+
+
+@pytest.mark.parametrize('days', [7, 30])
+def test_warm_and_cold_historical_responses_are_equal(client, history, days):
+    history(make_history(40 * 24))
+
+    cold = client.get(f'/api/historical?days={days}').get_json()
+    assert series_store.frame(days) is None
+
+    DataUpdateScheduler(db_manager, cache_manager).warm_caches()
+    cache_manager.clear_all_cache()
+    assert series_store.frame(days) is not None
+
+    warm = client.get(f'/api/historical?days={days}').get_json()
+    assert cold['success'] and warm['success']
+    assert warm['data'] == cold['data']
+
+
+def test_warm_caches_reports_each_range(history):
+    history(make_history(40 * 24))
+    timings = DataUpdateScheduler(db_manager, cache_manager).warm_caches()
+    for days in (7, 30, 90, 365):
+        assert timings[f'historical_{days}d'] is not None
+        assert series_store.frame(days) is not None
+    assert timings['series_store'] is not None
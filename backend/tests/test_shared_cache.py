@@ -0,0 +1,132 @@
+"""
+跨进程共享缓存测试
+多个进程共用临时目录：文件锁保证同一 key 只计算一次、超出预算时删除最旧的条目文件、
+条目头使用墙上时间（旧版本写入的 monotonic 时间视为过期）。
+"""
+import multiprocessing
+import os
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared_cache import ENTRY_HEADER, SharedCacheManager
+
+
+# 共享缓存依赖 fcntl 与 /dev/shm，仅在 Linux 上使用，子进程直接 fork
+context = multiprocessing.get_context('fork')
+
+
+def make_frame(rows=100, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'price': rng.uniform(50000, 70000, rows)})
+
+
+def compute_once(directory, counter_path, barrier, results):
+    """等所有进程就绪后同时请求同一 key，计算函数在计数文件中追加一行"""
+    cache = SharedCacheManager(directory=directory)
+
+    def compute():
+        with open(counter_path, 'a') as handle:
+            handle.write(f'{os.getpid()}\n')
+        time.sleep(0.5)
+        return make_frame()
+
+    barrier.wait()
+    frame = cache.get_or_compute('historical_7d', compute, max_age_seconds=60)
+    results.put(float(frame['price'].sum()))
+
+
+def write_entries(directory, keys, max_bytes):
+    cache = SharedCacheManager(directory=directory, max_bytes=max_bytes)
+    for key in keys:
+        cache.set_cache(key, make_frame())
+        # 按写入时间淘汰，相邻写入的 mtime 需要可区分
+        time.sleep(0.01)
+
+
+def read_valid(directory, key, results):
+    results.put(SharedCacheManager(directory=directory).is_cache_valid(key, max_age_seconds=60))
+
+
+def run(target, *args):
+    process = context.Process(target=target, args=args)
+    process.start()
+    process.join(timeout=30)
+    assert process.exitcode == 0
+
+
+def test_file_lock_computes_once_across_processes(tmp_path):
+    counter = tmp_path / 'computed.txt'
+    workers = 4
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=compute_once, args=(str(tmp_path / 'cache'), str(counter), barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    sums = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    assert len(counter.read_text().splitlines()) == 1
+    assert sums == [pytest.approx(make_frame()['price'].sum())] * workers
+
+
+def test_eviction_removes_oldest_files_across_processes(tmp_path):
+    directory = str(tmp_path)
+    probe = SharedCacheManager(directory=directory)
+    probe.set_cache('probe', make_frame())
+    entry_bytes = probe.stats()['bytes']
+    probe.clear_all_cache()
+
+    # 预算容纳两个条目：第二个进程写入时删除第一个进程写入的最旧条目
+    budget = int(entry_bytes * 2.5)
+    run(write_entries, directory, ['a', 'b'], budget)
+    run(write_entries, directory, ['c'], budget)
+
+    cache = SharedCacheManager(directory=directory, max_bytes=budget)
+    assert cache.get_cache('a')['data'] is None
+    assert cache.get_cache('b')['data'] is not None
+    assert cache.get_cache('c')['data'] is not None
+    assert cache.stats()['bytes'] <= budget
+
+
+def test_header_uses_wall_clock_time(tmp_path):
+    directory = str(tmp_path)
+    before = time.time()
+    run(write_entries, directory, ['fresh'], None)
+
+    cache = SharedCacheManager(directory=directory)
+    with open(cache._path('fresh'), 'rb') as handle:
+        created, expires_at, written = ENTRY_HEADER.unpack(handle.read(ENTRY_HEADER.size))
+    assert before <= created <= time.time()
+    assert written == created
+
+    results = context.Queue()
+    run(read_valid, directory, 'fresh', results)
+    assert results.get(timeout=5) is True
+
+
+@pytest.mark.parametrize('created', [
+    # 旧版本写入的 monotonic 时间（开机以来的秒数）
+    time.monotonic(),
+    # 来自未来（时钟回拨）
+    time.time() + 3600,
+])
+def test_entries_with_foreign_clock_are_stale(tmp_path, created):
+    directory = str(tmp_path)
+    cache = SharedCacheManager(directory=directory)
+    cache.set_cache('entry', make_frame())
+    with open(cache._path('entry'), 'r+b') as handle:
+        handle.write(struct.pack('<d', created))
+
+    results = context.Queue()
+    run(read_valid, directory, 'entry', results)
+    assert results.get(timeout=5) is False
@@ -0,0 +1,184 @@
+"""
+实时推送测试
+按前端（App.vue applyPanels / applySeriesDelta）的方式应用 snapshot / delta 事件，
+客户端重建的数据应始终与服务端最新的面板数据一致。
+"""
+import copy
+import json
+from bisect import bisect_left
+
+import pytest
+
+import stream
+from stream import StreamHub, series_delta
+
+
+def historical(timestamps, prices):
+    return {'timestamps': list(timestamps), 'prices': list(prices)}
+
+
+def panels(timestamps, prices, statistics=None):
+    return {
+        'statistics': statistics or {'current_price': prices[-1]},
+        'prediction': None,
+        'risk_alerts': [],
+        'historical': historical(timestamps, prices),
+        'candlestick': {'dates': ['2024-01-01'], 'data': [[1, 2, 0, 3]], 'volumes': [10]},
+    }
+
+
+def parse_event(message):
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class Client:
+    """前端应用推送事件的逻辑"""
+
+    def __init__(self):
+        self.panels = {}
+
+    def apply(self, message):
+        event, data = parse_event(message)
+        for name, value in data.items():
+            if name not in stream.SERIES_PANELS:
+                self.panels[name] = value
+                continue
+            key = stream.SERIES_PANELS[name]
+            delta = {'since': None, 'rows': value} if event == 'snapshot' else value
+            self.panels[name] = self._apply_series(self.panels.get(name, {}), key, delta)
+
+    @staticmethod
+    def _apply_series(target, key, delta):
+        rows = delta['rows']
+        keys = target.get(key, [])
+        start = 0 if delta['since'] is None else bisect_left(keys, delta['since'])
+        merged = keys[:start] + rows[key]
+        drop = bisect_left(merged, delta['window_start']) if delta.get('window_start') else 0
+        return {name: (target.get(name, [])[:start] + values)[drop:] for name, values in rows.items()}
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    """不启动后台轮询线程的推送中心，面板数据由测试按顺序提供"""
+    script = []
+    monkeypatch.setattr(stream, 'collect_panels', lambda: copy.deepcopy(script.pop(0)))
+    hub = StreamHub(poll_interval=3600, heartbeat=1, queue_size=4)
+    monkeypatch.setattr(hub, '_run', lambda: None)
+    hub.script = script
+    return hub
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+def poll(hub, value):
+    hub.script.append(value)
+    return hub.poll_once()
+
+
+def test_series_delta_append_only():
+    previous = historical([1, 2, 3], [10, 20, 30])
+    current = historical([1, 2, 3, 4], [10, 20, 31, 40])
+    assert series_delta(previous, current, 'timestamps') == {
+        'since': 3, 'window_start': 1, 'rows': historical([3, 4], [31, 40])
+    }
+    assert series_delta(previous, copy.deepcopy(previous), 'timestamps') is None
+
+
+def test_series_delta_replaces_when_earlier_point_changes():
+    previous = historical([1, 2, 3], [10, 20, 30])
+    for current in (historical([1, 2, 3, 4], [10, 21, 30, 40]),   # 修改
+                    historical([1, 3, 4], [10, 30, 40]),           # 删除
+                    historical([0, 1, 2, 3], [0, 10, 20, 30])):    # 向前扩展
+        delta = series_delta(previous, current, 'timestamps')
+        assert delta['since'] is None and delta['rows'] == current
+
+
+def test_deltas_keep_client_in_sync(hub):
+    subscriber = hub.subscribe()
+    client = Client()
+
+    steps = [
+        panels([1, 2, 3], [10, 20, 30]),
+        panels([1, 2, 3, 4], [10, 20, 30, 40]),          # 追加
+        panels([2, 3, 4, 5], [20, 30, 41, 50]),          # 窗口滑动，最后一点更新
+        panels([2, 3, 4, 5, 6], [20, 33, 41, 50, 60]),   # 较早的点被修正
+    ]
+    events = []
+    for step in steps:
+        poll(hub, step)
+        for message in drain(subscriber):
+            events.append(parse_event(message))
+            client.apply(message)
+        assert client.panels == step
+
+    kinds = [(event, data.get('historical', {}).get('since', 'n/a')) for event, data in events]
+    assert kinds == [('snapshot', 'n/a'), ('delta', 3), ('delta', 4), ('delta', None)]
+    # 增量只包含变化的面板
+    assert set(events[1][1]) == {'statistics', 'historical'}
+
+
+def test_unchanged_poll_sends_nothing(hub):
+    subscriber = hub.subscribe()
+    poll(hub, panels([1, 2], [10, 20]))
+    drain(subscriber)
+    assert poll(hub, panels([1, 2], [10, 20])) is None
+    assert drain(subscriber) == []
+
+
+def test_failed_panel_keeps_previous_value(hub):
+    subscriber = hub.subscribe()
+    client = Client()
+    first = panels([1, 2], [10, 20])
+    poll(hub, first)
+    failed = {**panels([1, 2, 3], [10, 20, 30]), 'candlestick': None}
+    poll(hub, failed)
+    for message in drain(subscriber):
+        client.apply(message)
+    assert client.panels['candlestick'] == first['candlestick']
+    assert client.panels['historical'] == failed['historical']
+
+
+def test_subscriber_joining_mid_stream_gets_current_snapshot(hub):
+    early = hub.subscribe()
+    early_client = Client()
+    for step in (panels([1, 2], [10, 20]), panels([1, 2, 3], [10, 20, 30])):
+        poll(hub, step)
+    for message in drain(early):
+        early_client.apply(message)
+
+    late = hub.subscribe()
+    late_client = Client()
+    [message] = drain(late)
+    assert parse_event(message)[0] == 'snapshot'
+    late_client.apply(message)
+    assert late_client.panels == early_client.panels
+
+    # 之后的增量对两个客户端同样适用
+    latest = panels([2, 3, 4], [20, 31, 40])
+    poll(hub, latest)
+    for subscriber, client in ((early, early_client), (late, late_client)):
+        for message in drain(subscriber):
+            client.apply(message)
+        assert client.panels == latest
+
+
+def test_slow_subscriber_is_resynced_with_snapshot(hub):
+    subscriber = hub.subscribe()
+    prices = [10]
+    for index in range(2, 9):
+        prices.append(index * 10)
+        poll(hub, panels(range(1, index + 1), prices))
+
+    messages = drain(subscriber)
+    assert subscriber.resyncs > 0
+    assert parse_event(messages[0])[0] == 'snapshot'
+    client = Client()
+    for message in messages:
+        client.apply(message)
+    assert client.panels == panels(range(1, 9), prices)
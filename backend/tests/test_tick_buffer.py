@@ -0,0 +1,142 @@
+"""
+实时行情写缓冲测试
+只写入已结束的分桶、写入失败后按时间重新排队，以及补写的数据合并进 price_history 尾部缓存。
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from conftest import make_history
+from database import DatabaseManager, db_manager
+from tick_buffer import TickWriteBuffer
+
+
+class RecordingDB:
+    """记录写入内容的数据库替身，fail=True 时模拟写入失败"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def save_historical_data(self, df):
+        if self.fail:
+            return 0
+        self.batches.append(df)
+        return len(df)
+
+
+def make_buffer(db, **options):
+    buffer = TickWriteBuffer(db, **{'max_size': 10, 'batch_size': 100, 'flush_interval': 3600,
+                                    'bucket_seconds': 60, **options})
+    buffer._stop.set()  # 不启动后台线程，由测试手动写入
+    return buffer
+
+
+def minutes_ago(minutes):
+    return datetime.now() - timedelta(minutes=minutes)
+
+
+def pending_prices(buffer):
+    return [price for price, _ in buffer._pending.values()]
+
+
+def test_only_closed_buckets_are_flushed():
+    db = RecordingDB()
+    buffer = make_buffer(db)
+    buffer.put(100, 1)
+    buffer.put(50, 1, timestamp=minutes_ago(3))
+
+    assert buffer.flush() == 1
+    assert db.batches[0]['price'].tolist() == [50]
+
+    # 当前分桶保持未写入，之后的行情覆盖之前的值
+    buffer.put(200, 1)
+    assert buffer.flush() == 0
+    assert pending_prices(buffer) == [200]
+
+    # 退出时写入全部分桶
+    assert buffer.flush(include_open=True) == 1
+    assert db.batches[1]['price'].tolist() == [200]
+    assert buffer.stats()['pending'] == 0
+
+
+def test_failed_flush_requeues_in_time_order():
+    db = RecordingDB(fail=True)
+    buffer = make_buffer(db, max_size=3)
+    buffer.put(5, 1, timestamp=minutes_ago(5))
+    buffer.put(4, 1, timestamp=minutes_ago(4))
+    assert buffer.flush() == 0
+
+    # 写入失败期间到达的行情：更新的分桶排在后面，同一分桶以新行情为准
+    buffer.put(2, 1, timestamp=minutes_ago(2))
+    buffer.put(1, 1, timestamp=minutes_ago(1))
+    assert pending_prices(buffer) == [4, 2, 1]
+    assert list(buffer._pending) == sorted(buffer._pending)
+    assert buffer.stats()['dropped'] == 1
+
+    # 缓冲区满时丢弃最旧的分桶
+    buffer.put(9, 1)
+    assert pending_prices(buffer) == [2, 1, 9]
+
+    db.fail = False
+    assert buffer.flush() == 2
+    assert db.batches[0]['price'].tolist() == [2, 1]
+
+
+def test_failed_flush_keeps_newer_tick_for_same_bucket():
+    db = RecordingDB(fail=True)
+    buffer = make_buffer(db)
+    timestamp = minutes_ago(2)
+    buffer.put(10, 1, timestamp=timestamp)
+    buffer.flush()
+    buffer.put(11, 1, timestamp=timestamp)
+    buffer.flush()
+    assert pending_prices(buffer) == [11]
+    assert buffer.stats()['failures'] == 2
+
+
+def tail_arrays(manager, days=7):
+    df = manager.get_historical_data(days=days)
+    return df['datetime'].to_numpy(), df['price'].to_numpy(), df['volume'].to_numpy()
+
+
+def test_late_rows_are_merged_into_tail_without_reload(history):
+    df = make_history(48)
+    gap = df.index[10:13]
+    history(df.drop(gap))
+    tail_arrays(db_manager)
+    loaded_at = db_manager._tail.loaded_at
+
+    # 补写缺失的行，并重复写入一个已有时间点（INSERT IGNORE 保留原值）
+    late = pd.concat([df.loc[gap], df.loc[[20]].assign(price=1.0)])
+    db_manager.save_historical_data(late)
+    assert db_manager._tail.loaded_at == loaded_at
+
+    timestamps, prices, volumes = tail_arrays(db_manager)
+    np.testing.assert_array_equal(timestamps, df['datetime'].to_numpy())
+    assert prices[20] == df['price'].iloc[20]
+
+    # 与重新从数据库全量读取的结果一致
+    fresh = DatabaseManager(db_manager.backend)
+    for cached, loaded in zip((timestamps, prices, volumes), tail_arrays(fresh)):
+        np.testing.assert_array_equal(cached, loaded)
+
+
+def test_requeued_tick_bucket_keeps_tail(history):
+    df = make_history(48, end=pd.Timestamp.now().floor('min') - pd.Timedelta(minutes=30))
+    history(df)
+    tail_arrays(db_manager)
+    loaded_at = db_manager._tail.loaded_at
+
+    # 早于高水位的分桶（如写入失败后重新排队的分桶）
+    buffer = make_buffer(db_manager)
+    late = df['datetime'].iloc[-1] - pd.Timedelta(minutes=17)
+    buffer.put(12345.0, 1.0, timestamp=late)
+    assert buffer.flush() == 1
+
+    assert db_manager._tail.loaded_at == loaded_at
+    timestamps, prices, _ = tail_arrays(db_manager)
+    assert len(timestamps) == len(df) + 1
+    assert np.all(np.diff(timestamps) > np.timedelta64(0))
+    assert prices[np.searchsorted(timestamps, np.datetime64(late.floor('min'), 'ns'))] == 12345.0
@@ -0,0 +1,145 @@
+"""
+实时行情写缓冲模块
+/api/realtime 获取的价格先放入内存中的有界缓冲，由后台线程按数量或时间阈值批量写入数据库，
+请求路径上不再有数据库写入
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from config import TICK_BUFFER_MAX_SIZE, TICK_FLUSH_BATCH_SIZE, TICK_FLUSH_INTERVAL, TICK_BUCKET_SECONDS
+from database import db_manager
+
+
+class TickWriteBuffer:
+    """
+    实时行情写缓冲（write-behind）
+
+    同一时间分桶内的多次行情只保留最后一次；缓冲区满时丢弃最旧的分桶。
+    后台只写入已结束的分桶：数据库写入忽略重复键，尚未结束的分桶若提前写入，之后的行情会被丢弃。
+    """
+
+    def __init__(self, db_manager, max_size=None, batch_size=None, flush_interval=None, bucket_seconds=None):
+        """
+        Args:
+            db_manager: DatabaseManager 实例
+            max_size: 缓冲区最多保留的分桶数
+            batch_size: 缓冲分桶数达到该值时立即写入
+            flush_interval: 最长写入间隔（秒）
+            bucket_seconds: 去重分桶宽度（秒）
+        """
+        self.db_manager = db_manager
+        self.max_size = max_size or TICK_BUFFER_MAX_SIZE
+        self.batch_size = batch_size or TICK_FLUSH_BATCH_SIZE
+        self.flush_interval = flush_interval or TICK_FLUSH_INTERVAL
+        self.bucket_seconds = bucket_seconds or TICK_BUCKET_SECONDS
+
+        # 分桶起点 -> (price, volume)，按首次写入顺序排列
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # 串行化 flush，避免后台线程与 stop() 同时写入
+        self._flush_lock = threading.Lock()
+
+        self._stats = {'received': 0, 'deduplicated': 0, 'dropped': 0, 'flushed': 0, 'flushes': 0, 'failures': 0}
+
+    def put(self, price, volume, timestamp=None):
+        """放入一条行情（非阻塞）"""
+        bucket = self._bucket(timestamp or datetime.now())
+        with self._lock:
+            self._stats['received'] += 1
+            if bucket in self._pending:
+                self._stats['deduplicated'] += 1
+            elif len(self._pending) >= self.max_size:
+                self._pending.popitem(last=False)
+                self._stats['dropped'] += 1
+            self._pending[bucket] = (float(price), float(volume))
+            full = len(self._pending) >= self.batch_size
+
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def _bucket(self, timestamp):
+        seconds = int(pd.Timestamp(timestamp).timestamp())
+        return pd.Timestamp(seconds - seconds % self.bucket_seconds, unit='s').to_pydatetime()
+
+    def flush(self, include_open=False):
+        """
+        将缓冲中的行情批量写入数据库，返回写入条数
+
+        Args:
+            include_open: 是否同时写入当前（尚未结束的）分桶，仅在退出时使用
+        """
+        with self._flush_lock:
+            with self._lock:
+                current = None if include_open else self._bucket(datetime.now())
+                batch = OrderedDict(
+                    (bucket, tick) for bucket, tick in self._pending.items()
+                    if current is None or bucket < current
+                )
+                if not batch:
+                    return 0
+                for bucket in batch:
+                    del self._pending[bucket]
+
+            df = pd.DataFrame({
+                'datetime': pd.to_datetime(list(batch.keys())),
+                'price': [price for price, _ in batch.values()],
+                'volume': [volume for _, volume in batch.values()]
+            })
+            saved = self.db_manager.save_historical_data(df)
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                if saved:
+                    self._stats['flushed'] += saved
+                    return saved
+
+                # 写入失败：放回缓冲等待下次重试（同一分桶以期间到达的新行情为准），
+                # 按时间重新排序，缓冲区满时仍从最旧的分桶开始丢弃
+                self._stats['failures'] += 1
+                self._pending = OrderedDict(sorted({**batch, **self._pending}.items()))
+                while len(self._pending) > self.max_size:
+                    self._pending.popitem(last=False)
+                    self._stats['dropped'] += 1
+                return 0
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='tick-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ 实时行情批量写入失败: {e}")
+
+    def stop(self):
+        """停止后台线程并写入剩余行情（应用退出时调用）"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        count = self.flush(include_open=True)
+        if count:
+            print(f"💾 退出前写入 {count} 条实时行情")
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending)}
+
+
+# 全局实时行情写缓冲
+tick_buffer = TickWriteBuffer(db_manager)
@@ -1,9 +1,12 @@
 """
 工具函数模块
 """
+import numpy as np
 import pandas as pd
 import traceback
 
+from config import RISK_PRICE_MOVE_PCT, RISK_PRICE_MOVE_HIGH_PCT, RISK_VOLUME_SURGE_PCT
+
 
 def calculate_technical_indicators(df):
     """计算技术指标"""
@@ -52,8 +55,9 @@ def calculate_technical_indicators(df):
 
 
 def prepare_prediction_features(df):
-    """准备预测特征"""
+    """准备预测特征（返回新的 DataFrame，不修改传入的数据）"""
     try:
+        df = df.copy()
         df['hour'] = df['datetime'].dt.hour
         df['day_of_week'] = df['datetime'].dt.dayofweek
         df['returns'] = df['price'].pct_change()
@@ -68,50 +72,74 @@ def prepare_prediction_features(df):
         return df
 
 
-def calculate_risk_alerts(df):
-    """计算风险警报"""
+def calculate_risk_alerts(df, price_move_pct=RISK_PRICE_MOVE_PCT, price_move_high_pct=RISK_PRICE_MOVE_HIGH_PCT,
+                          volume_surge_pct=RISK_VOLUME_SURGE_PCT, recent=50, limit=10):
+    """
+    计算风险警报
+
+    各规则在整个窗口上以布尔掩码一次求值，只为命中的数据点生成警报。
+
+    Args:
+        df: 含 datetime、price、volume 列，按时间升序
+        price_move_pct: 单点涨跌幅超过该值（%）时报警
+        price_move_high_pct: 涨跌幅超过该值（%）时为高风险
+        volume_surge_pct: 交易量高于最近 24 个点均值该比例（%）时报警
+        recent: 只检查最近 N 个数据点，None 表示检查整个窗口
+        limit: 最多返回的警报数，None 表示全部
+
+    Returns:
+        list: 警报列表，最新的在前
+    """
     try:
-        alerts = []
-        
+        n = len(df)
+        if n == 0:
+            return []
+
         # 计算指标
-        df['returns'] = df['price'].pct_change() * 100
-        df['volume_ma'] = df['volume'].rolling(window=min(24, len(df))).mean()
-        df['volume_change'] = ((df['volume'] - df['volume_ma']) / 
-                               (df['volume_ma'] + 1)) * 100
-        
-        # 检查最近的数据
-        recent = df.tail(min(50, len(df)))
-        
-        for i in range(len(recent)):
-            row = recent.iloc[i]
-            
-            if pd.isna(row['returns']):
-                continue
-            
+        prices = df['price'].to_numpy(dtype=float)
+        volumes = df['volume'].to_numpy(dtype=float)
+        returns = np.full(n, np.nan)
+        returns[1:] = (prices[1:] / prices[:-1] - 1) * 100
+        volume_ma = pd.Series(volumes).rolling(window=min(24, n)).mean().to_numpy()
+        volume_change = (volumes - volume_ma) / (volume_ma + 1) * 100
+
+        # 规则求值（NaN 不命中）
+        start = 0 if recent is None else max(n - recent, 0)
+        with np.errstate(invalid='ignore'):
+            price_hits = np.abs(returns[start:]) > price_move_pct
+            volume_hits = volume_change[start:] > volume_surge_pct
+
+        # 命中的数据点从新到旧排列；每个数据点至少一条警报，只需生成前 limit 个
+        rows = np.flatnonzero(price_hits | volume_hits)[::-1]
+        if limit is not None:
+            rows = rows[:limit]
+        labels = pd.DatetimeIndex(df['datetime'].to_numpy()[start + rows]).strftime('%Y-%m-%d %H:%M')
+
+        alerts = []
+        for row, label in zip(rows, labels):
             # 价格剧烈波动
-            if abs(row['returns']) > 3:
+            if price_hits[row]:
+                value = float(returns[start + row])
                 alerts.append({
                     'type': 'price_volatility',
-                    'severity': 'high' if abs(row['returns']) > 5 else 'medium',
-                    'message': f"价格波动 {row['returns']:+.2f}%",
-                    'timestamp': row['datetime'].strftime('%Y-%m-%d %H:%M'),
-                    'value': float(row['returns'])
+                    'severity': 'high' if abs(value) > price_move_high_pct else 'medium',
+                    'message': f"价格波动 {value:+.2f}%",
+                    'timestamp': label,
+                    'value': value
                 })
-            
+
             # 交易量异常
-            if not pd.isna(row['volume_change']) and row['volume_change'] > 150:
+            if volume_hits[row]:
+                value = float(volume_change[start + row])
                 alerts.append({
                     'type': 'volume_surge',
                     'severity': 'medium',
-                    'message': f"交易量暴增 {row['volume_change']:.0f}%",
-                    'timestamp': row['datetime'].strftime('%Y-%m-%d %H:%M'),
-                    'value': float(row['volume_change'])
+                    'message': f"交易量暴增 {value:.0f}%",
+                    'timestamp': label,
+                    'value': value
                 })
-        
-        # 只返回最新的10个警报
-        alerts = sorted(alerts, key=lambda x: x['timestamp'], reverse=True)[:10]
-        
-        return alerts
+
+        return alerts if limit is None else alerts[:limit]
     except Exception as e:
         print(f"Error calculating risk alerts: {e}")
         traceback.print_exc()